@@ -0,0 +1,135 @@
+"""
+Message activity accumulator
+- Per-message XP, coins and counters are summed in memory
+- Flushed periodically as one bulk write per batch of users
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any
+
+if TYPE_CHECKING:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityAccumulator:
+    """Coalesces per-message XP and activity into periodic bulk writes"""
+    
+    def __init__(self, manager: "DatabaseManager"):
+        self.manager = manager
+        self.flush_interval = float(os.getenv('XP_FLUSH_INTERVAL', 5))
+        self.max_cached_users = 50000
+        
+        # user_id -> pending deltas since the last flush
+        self.pending: Dict[int, Dict[str, Any]] = {}
+        # user_id -> {"xp", "level", "next_min_xp"}, least recently active first
+        self.levels: "OrderedDict[int, Dict[str, int]]" = OrderedDict()
+        
+        self.messages_recorded = 0
+        self.flushes = 0
+        self.documents_flushed = 0
+    
+    async def _load_level_state(self, user_id: int) -> Dict[str, int]:
+        """Return the cached XP/level for a user, seeding it on first use"""
+        state = self.levels.get(user_id)
+        if state is None:
+            user_data = await self.manager.get_user_data(user_id)
+            # Unflushed XP is not in the stored document yet
+            xp = user_data.get("xp", 0) + self.pending.get(user_id, {}).get("xp", 0)
+            level = max(user_data.get("level", 1), self.pending.get(user_id, {}).get("level") or 1)
+            state = self.levels.get(user_id) or {
+                "xp": xp,
+                "level": level,
+                "next_min_xp": self.manager.get_level_thresholds(level)["next_min_xp"]
+            }
+            self.levels[user_id] = state
+        
+        self.levels.move_to_end(user_id)
+        while len(self.levels) > self.max_cached_users:
+            self.levels.popitem(last=False)
+        return state
+    
+    async def record(self, user_id: int, xp_gained: int) -> Dict[str, Any]:
+        """Record one message worth of XP; returns an add_xp-style result"""
+        state = await self._load_level_state(user_id)
+        
+        pending = self.pending.setdefault(user_id, {"xp": 0, "messages": 0, "coins": 0, "levels": 0, "level": None})
+        pending["xp"] += xp_gained
+        pending["messages"] += 1
+        pending["last_seen"] = datetime.now(timezone.utc)
+        pending["last_message"] = time.time()
+        self.messages_recorded += 1
+        
+        old_level = state["level"]
+        state["xp"] += xp_gained
+        
+        level_rewards = {}
+        if state["xp"] >= state["next_min_xp"]:
+            new_level = max(old_level, self.manager._calculate_level(state["xp"]))
+            if new_level > old_level:
+                level_rewards = self.manager._calculate_level_rewards(new_level, old_level)
+                pending["coins"] += level_rewards["coins"]
+                pending["levels"] += new_level - old_level
+                pending["level"] = new_level
+                state["level"] = new_level
+            state["next_min_xp"] = self.manager.get_level_thresholds(state["level"])["next_min_xp"]
+        
+        if len(self.pending) >= 5000:
+            asyncio.create_task(self.flush())
+        
+        return {
+            "success": True,
+            "xp_gained": xp_gained,
+            "total_xp": state["xp"],
+            "old_level": old_level,
+            "new_level": state["level"],
+            "leveled_up": state["level"] > old_level,
+            "level_rewards": level_rewards
+        }
+    
+    def forget(self, user_id: int):
+        """Drop the cached level state after XP was changed elsewhere"""
+        self.levels.pop(user_id, None)
+    
+    async def flush(self) -> int:
+        """Write all pending activity; returns the number of users flushed"""
+        if not self.pending:
+            return 0
+        
+        batch, self.pending = self.pending, {}
+        try:
+            unapplied = await self.manager.apply_activity_batch(batch)
+        except Exception as e:
+            logger.error(f"Failed to flush message activity for {len(batch)} users: {e}")
+            unapplied = batch
+        
+        # Merge what was not applied back so it is retried on the next flush
+        for user_id, deltas in unapplied.items():
+            pending = self.pending.setdefault(user_id, {"xp": 0, "messages": 0, "coins": 0, "levels": 0, "level": None})
+            for key in ("xp", "messages", "coins", "levels"):
+                pending[key] += deltas[key]
+            pending["level"] = max(pending["level"] or 0, deltas["level"] or 0) or None
+            pending.setdefault("last_seen", deltas["last_seen"])
+            pending.setdefault("last_message", deltas["last_message"])
+        
+        flushed = len(batch) - len(unapplied)
+        if flushed:
+            self.flushes += 1
+            self.documents_flushed += flushed
+        return flushed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for get_database_stats"""
+        return {
+            "messages_recorded": self.messages_recorded,
+            "flushes": self.flushes,
+            "documents_flushed": self.documents_flushed,
+            "pending_users": len(self.pending),
+            "cached_levels": len(self.levels)
+        }
@@ -0,0 +1,81 @@
+"""
+Running totals for stats and health checks
+- Kept current by every write, so reading them is O(1)
+- Corrected by a periodic full recompute that records the drift
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+
+class RunningAggregates:
+    """O(1) totals for stats and health checks, corrected by a periodic full recompute"""
+    
+    FIELDS = ("users", "guilds", "total_coins", "total_xp", "level_sum")
+    
+    def __init__(self):
+        self.values = dict.fromkeys(self.FIELDS, 0)
+        self.reconcile_interval = float(os.getenv('AGGREGATES_RECONCILE_INTERVAL', 3600))
+        # Memory mode: user_id -> (coins, xp, level) last counted
+        self.counted: Dict[int, tuple] = {}
+        self.recomputed_at = None
+        self.recomputes = 0
+        self.last_drift: Dict[str, int] = {}
+    
+    def add(self, **deltas):
+        for field, delta in deltas.items():
+            if delta:
+                self.values[field] += delta
+    
+    def user_delta(self, before: Optional[Dict[str, Any]], after: Dict[str, Any], default_coins: int):
+        """Account for a user write given the pre-image (None = document created)"""
+        previous = before or {}
+        self.add(
+            users=1 if before is None else 0,
+            total_coins=after.get("coins", previous.get("coins", default_coins)) - previous.get("coins", default_coins),
+            total_xp=after.get("xp", previous.get("xp", 0)) - previous.get("xp", 0),
+            level_sum=after.get("level", previous.get("level", 1)) - previous.get("level", 1)
+        )
+    
+    def observe(self, user_id: int, document: Dict[str, Any]):
+        """Memory mode: re-count one user's current document"""
+        current = (document.get("coins", 0), document.get("xp", 0), document.get("level", 1))
+        previous = self.counted.get(user_id)
+        self.counted[user_id] = current
+        if previous is None:
+            previous = (0, 0, 0)
+            self.values["users"] += 1
+        self.add(
+            total_coins=current[0] - previous[0],
+            total_xp=current[1] - previous[1],
+            level_sum=current[2] - previous[2]
+        )
+    
+    def seen(self, user_id: int, document: Dict[str, Any]):
+        """Memory mode: note a document loaded from disk that the totals already include"""
+        self.counted[user_id] = (document.get("coins", 0), document.get("xp", 0), document.get("level", 1))
+    
+    def reset(self, values: Dict[str, int]):
+        """Replace running values with a full recompute"""
+        self.last_drift = {field: self.values[field] - values.get(field, 0) for field in self.FIELDS}
+        self.values = {field: values.get(field, 0) for field in self.FIELDS}
+        self.recomputed_at = datetime.now(timezone.utc)
+        self.recomputes += 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        users = self.values["users"]
+        return {
+            "users": users,
+            "guilds": self.values["guilds"],
+            "total_coins": self.values["total_coins"],
+            "total_xp": self.values["total_xp"],
+            "avg_level": round(self.values["level_sum"] / users, 2) if users else 1
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "recomputed_at": self.recomputed_at.isoformat() if self.recomputed_at else None,
+            "recomputes": self.recomputes,
+            "last_drift": self.last_drift
+        }
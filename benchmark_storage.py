@@ -0,0 +1,128 @@
+"""
+Storage backend benchmark
+Runs the same DatabaseManager workload against memory, SQLite and (when
+MONGODB_URI is set) MongoDB, prints operations per second per backend and
+a side-by-side comparison at the end.
+
+    python benchmark_storage.py [users] [rounds]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+import database
+
+
+BASE = 10 ** 12  # keep benchmark users away from real ids
+
+
+def report(results: dict, label: str, count: int, elapsed: float):
+    results[label] = count / elapsed
+    print(f"  {label:<28} {count / elapsed:>12,.0f} ops/s  ({elapsed * 1000:,.1f} ms)")
+
+
+async def timed(results: dict, label: str, count: int, operation):
+    """Run operation() count times and record the throughput"""
+    start = time.perf_counter()
+    for i in range(count):
+        await operation(i)
+    report(results, label, count, time.perf_counter() - start)
+
+
+async def timed_concurrent(results: dict, label: str, count: int, operation, concurrency: int = 100):
+    """Like timed(), but with up to `concurrency` operations in flight"""
+    start = time.perf_counter()
+    for offset in range(0, count, concurrency):
+        await asyncio.gather(*(operation(i) for i in range(offset, min(count, offset + concurrency))))
+    report(results, label, count, time.perf_counter() - start)
+
+
+async def run_workload(db: database.DatabaseManager, users: int, rounds: int) -> dict:
+    results = {}
+    base = BASE
+
+    await timed(results, "update_user_data", users, lambda i: db.update_user_data(base + i, {"settings.privacy": "public"}))
+    await timed(results, "add_coins", users * rounds, lambda i: db.add_coins(base + i % users, 10))
+    await timed_concurrent(results, "add_coins (concurrent)", users * rounds, lambda i: db.add_coins(base + i % users, 10))
+    await timed(results, "remove_coins", users, lambda i: db.remove_coins(base + i, 5))
+    await timed(results, "add_xp", users * rounds, lambda i: db.add_xp(base + i % users, 15))
+    await timed(results, "get_user_data", users * rounds, lambda i: db.get_user_data(base + i % users))
+    await timed(results, "add_user_item (purchases)", users, lambda i: db.add_user_item(
+        "temporary_purchases", base + i, {"item_type": "bench", "expires_at": time.time() - 1}))
+    await timed(results, "leaderboard page (xp)", 200, lambda i: db.get_paginated_leaderboard("xp", page=1 + i % 20))
+    await timed(results, "leaderboard rank (coins)", 200, lambda i: db.get_leaderboard_rank("coins", base + i % users))
+    await timed(results, "cleanup_expired_data", 1, lambda i: db.cleanup_expired_data())
+    await timed(results, "flush_pending_writes", 1, lambda i: db.flush_pending_writes())
+    return results
+
+
+async def bench_cold_reads(results: dict, users: int):
+    """First-use reads after a restart: rows are loaded from SQLite on demand"""
+    db = database.DatabaseManager()
+    await db.initialize()
+    await timed(results, "get_user_data (cold)", users, lambda i: db.get_user_data(BASE + i))
+    db.close()
+
+
+def print_comparison(columns: dict):
+    """One row per operation, one column of ops/s per backend"""
+    operations = list(next(iter(columns.values())))
+    for results in columns.values():
+        operations += [label for label in results if label not in operations]
+    print("\n📊 Comparison (ops/s)")
+    print(f"  {'':<28}" + "".join(f"{name:>16}" for name in columns))
+    for label in operations:
+        cells = [f"{results[label]:>16,.0f}" if label in results else f"{'-':>16}" for results in columns.values()]
+        print(f"  {label:<28}" + "".join(cells))
+
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    workdir = tempfile.mkdtemp(prefix="blackops-bench-")
+
+    print(f"👥 {users} users, {rounds} rounds per user")
+
+    columns = {}
+
+    print("\n🧠 Memory (no local store)")
+    os.environ.update(STORAGE_BACKEND="memory", LOCAL_STORE="false")
+    db = database.DatabaseManager()
+    columns["memory"] = await run_workload(db, users, rounds)
+    db.close()
+
+    print("\n📝 Memory + journal")
+    os.environ.update(STORAGE_BACKEND="memory", LOCAL_STORE="true", LOCAL_STORE_DIR=os.path.join(workdir, "journal"))
+    db = database.DatabaseManager()
+    db.local_store.recover()
+    columns["journal"] = await run_workload(db, users, rounds)
+    db.close()
+
+    print("\n🗄️ SQLite")
+    os.environ.update(STORAGE_BACKEND="sqlite", SQLITE_PATH=os.path.join(workdir, "bench.db"))
+    db = database.DatabaseManager()
+    await db.initialize()
+    columns["sqlite"] = await run_workload(db, users, rounds)
+    db.close()
+    await bench_cold_reads(columns["sqlite"], users)
+
+    if os.getenv("MONGODB_URI") and database.MONGODB_AVAILABLE:
+        print("\n🍃 MongoDB")
+        os.environ.update(STORAGE_BACKEND="mongodb", LOCAL_STORE="false",
+                          MONGODB_DATABASE=os.getenv("BENCH_MONGODB_DATABASE", "blackops-bench"))
+        db = database.DatabaseManager()
+        if await db._attempt_mongodb_connection():
+            columns["mongodb"] = await run_workload(db, users, rounds)
+            await db.mongodb_client.drop_database(os.environ["MONGODB_DATABASE"])
+        db.close()
+    else:
+        print("\n🍃 MongoDB skipped (set MONGODB_URI to include it)")
+
+    print_comparison(columns)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
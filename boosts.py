@@ -0,0 +1,141 @@
+"""
+Shop boosts kept in memory
+- Loaded once from temporary_purchases, then kept current by purchases and
+  boost_expiry timers, so /work, XP gain and gambling read a dict
+"""
+
+import time
+import heapq
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, List, Any, Tuple
+
+if TYPE_CHECKING:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class BoostEngine:
+    """Active shop boosts per user and their merged effects, expired lazily from a heap"""
+    
+    # Effects with no boost active
+    DEFAULTS = {
+        "xp": 1.0,
+        "coins": 1.0,
+        "work_cooldown": 3600,
+        "win_chance": 0.50,
+        "gamble_payout": 1.0
+    }
+    
+    # What each shop item grants; premium_boost grants all of them
+    EFFECTS = {
+        "xp_boost": {"xp": 2.0},
+        "money_magnet": {"coins": 1.5},
+        "work_energizer": {"work_cooldown": 0},
+        "gambling_luck": {"win_chance": 0.52, "gamble_payout": 1.2}
+    }
+    EFFECTS["premium_boost"] = {
+        **EFFECTS["xp_boost"], **EFFECTS["money_magnet"],
+        **EFFECTS["work_energizer"], **EFFECTS["gambling_luck"]
+    }
+    
+    # Overlapping boosts do not stack: the strongest value wins
+    STRONGEST = {"work_cooldown": min}
+    
+    def __init__(self, manager: "DatabaseManager"):
+        self.manager = manager
+        # user_id -> {item_type: expires_at}, only users with a live boost
+        self.active: Dict[int, Dict[str, float]] = {}
+        # user_id -> merged effects, for the same users
+        self.effects: Dict[int, Dict[str, float]] = {}
+        # (expires_at, user_id), earliest first; stale entries are skipped
+        self.expiry_heap: List[Tuple[float, int]] = []
+        self.loaded = False
+        self.load_lock = asyncio.Lock()
+        self.lookups = 0
+        self.expired = 0
+    
+    def _rebuild(self, user_id: int):
+        """Recompute one user's effects from their active boosts"""
+        boosts = self.active.get(user_id)
+        if not boosts:
+            self.active.pop(user_id, None)
+            self.effects.pop(user_id, None)
+            return
+        effects = dict(self.DEFAULTS)
+        for item_type in boosts:
+            for effect, value in self.EFFECTS.get(item_type, {}).items():
+                effects[effect] = self.STRONGEST.get(effect, max)(effects[effect], value)
+        self.effects[user_id] = effects
+    
+    def _expire_due(self, now: float):
+        """Drop every boost whose expiry has passed"""
+        while self.expiry_heap and self.expiry_heap[0][0] <= now:
+            _, user_id = heapq.heappop(self.expiry_heap)
+            boosts = self.active.get(user_id)
+            if not boosts:
+                continue
+            lapsed = [item_type for item_type, expires_at in boosts.items() if expires_at <= now]
+            for item_type in lapsed:
+                del boosts[item_type]
+            if lapsed:
+                self.expired += len(lapsed)
+                self._rebuild(user_id)
+    
+    def add(self, user_id: int, item_type: str, expires_at: float):
+        """Record a purchase (stacked purchases only move expires_at later)"""
+        if expires_at <= time.time():
+            return
+        boosts = self.active.setdefault(user_id, {})
+        boosts[item_type] = max(boosts.get(item_type, 0), expires_at)
+        heapq.heappush(self.expiry_heap, (boosts[item_type], user_id))
+        self._rebuild(user_id)
+    
+    def expire(self, user_id: int, item_type: str):
+        """Drop a boost once storage has removed it, unless it was extended meanwhile"""
+        boosts = self.active.get(user_id)
+        if boosts and boosts.get(item_type, 0) <= time.time():
+            if boosts.pop(item_type, None) is not None:
+                self.expired += 1
+            self._rebuild(user_id)
+    
+    def lookup(self, user_id: int) -> Dict[str, float]:
+        """Effects for a user; callers must not modify the returned dict"""
+        self.lookups += 1
+        self._expire_due(time.time())
+        return self.effects.get(user_id, self.DEFAULTS)
+    
+    def active_boosts(self, user_id: int) -> Dict[str, float]:
+        """item_type -> expires_at for a user's live boosts"""
+        self._expire_due(time.time())
+        return dict(self.active.get(user_id, {}))
+    
+    async def load(self, reload: bool = True):
+        """Merge every unexpired purchase into the index (one indexed scan)"""
+        async with self.load_lock:
+            if self.loaded and not reload:
+                return
+            purchases = await self.manager.find_items(
+                "temporary_purchases", {"expires_at": {"$gt": time.time()}}
+            )
+            for purchase in purchases:
+                self.add(purchase["user_id"], purchase.get("item_type"), purchase.get("expires_at", 0))
+            self.loaded = True
+            logger.info(f"⚡ Loaded {len(purchases)} active boosts for {len(self.active)} users")
+    
+    async def get(self, user_id: int) -> Dict[str, float]:
+        """Effects for a user, loading the index on first use"""
+        if not self.loaded:
+            await self.load(reload=False)
+        return self.lookup(user_id)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for get_database_stats"""
+        return {
+            "loaded": self.loaded,
+            "users": len(self.active),
+            "boosts": sum(len(boosts) for boosts in self.active.values()),
+            "lookups": self.lookups,
+            "expired": self.expired
+        }
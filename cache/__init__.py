@@ -0,0 +1,6 @@
+"""Cache tiers: the per-process user cache and the Redis tier shared between processes"""
+
+from cache.shared_cache import SharedCache
+from cache.user_cache import UserCache
+
+__all__ = ["SharedCache", "UserCache"]
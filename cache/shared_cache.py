@@ -0,0 +1,294 @@
+"""
+Shared Redis cache tier
+- Compact JSON documents, zlib-compressed past a few hundred bytes
+- Writes DEL the key and publish it so other processes drop their copies
+"""
+
+import os
+import uuid
+import zlib
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any, Optional
+
+from storage import codec
+
+if TYPE_CHECKING:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class SharedCache:
+    """Optional Redis L2 cache (REDIS_URL) shared by every process, with pub/sub invalidation"""
+    
+    COMPRESS_OVER = 256
+    MAX_TRACKED_KEYS = 10000
+    
+    def __init__(self, manager: "DatabaseManager"):
+        self.manager = manager
+        self.url = os.getenv('REDIS_URL')
+        self.enabled = REDIS_AVAILABLE and bool(self.url)
+        self.ttl = int(os.getenv('REDIS_CACHE_TTL', 600))
+        self.prefix = os.getenv('REDIS_PREFIX', 'blackops')
+        self.channel = f"{self.prefix}:invalidate"
+        # Identifies our own messages on the channel
+        self.origin = uuid.uuid4().hex
+        
+        self.client = None
+        self.connected = False
+        self.resubscribe = False
+        self.task = None
+        self.publisher = None
+        
+        # (collection, key or None) waiting to be DELeted and published
+        self.pending_invalidations: set = set()
+        self.wake = asyncio.Event()
+        
+        # Invalidation sequence: a load that overlapped a write must not be stored
+        self.seq = 0
+        self.invalidated_at: "OrderedDict[tuple, int]" = OrderedDict()
+        self.forgotten_seq = 0
+        # Keys this process SET: another process's invalidation may have DELeted before our SET landed
+        self.stored_keys: "OrderedDict[tuple, int]" = OrderedDict()
+        self.pending_deletes: set = set()
+        
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped_stores = 0
+        self.errors = 0
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+        self.stale_deletes = 0
+        self.bytes_stored = 0
+    
+    # ---- serialisation ----
+    
+    def encode(self, document: Dict[str, Any]) -> bytes:
+        data = codec.dumps(document).encode()
+        if len(data) > self.COMPRESS_OVER:
+            return b"z" + zlib.compress(data, 1)
+        return b"j" + data
+    
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        body = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+        return codec.loads(body)
+    
+    def _key(self, collection: str, key: int) -> str:
+        return f"{self.prefix}:{collection}:{key}"
+    
+    # ---- lifecycle ----
+    
+    def start(self):
+        """Connect and subscribe in the background (never blocks startup)"""
+        if self.enabled and (self.task is None or self.task.done()):
+            self.task = asyncio.create_task(self._run())
+    
+    async def _run(self):
+        """Keep a subscription open, reconnecting with backoff"""
+        delay = 1.0
+        while True:
+            try:
+                if self.client is not None:
+                    await self._close_client()
+                self.client = aioredis.from_url(
+                    self.url, socket_connect_timeout=2, socket_timeout=2, health_check_interval=30
+                )
+                await self.client.ping()
+                pubsub = self.client.pubsub()
+                await pubsub.subscribe(self.channel)
+                
+                # Messages may have been missed while disconnected
+                if self.resubscribe:
+                    self.manager._on_shared_invalidation("users", None)
+                    self.manager._on_shared_invalidation("guilds", None)
+                self.connected = True
+                self.resubscribe = True
+                delay = 1.0
+                if self.publisher is None or self.publisher.done():
+                    self.publisher = asyncio.create_task(self._publish_loop())
+                logger.info("✅ Redis shared cache connected")
+                
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    self._receive(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.connected:
+                    logger.warning(f"⚠️ Redis shared cache disconnected: {e}")
+                elif delay == 1.0:
+                    logger.warning(f"⚠️ Redis shared cache unavailable: {e}")
+                self.connected = False
+                self.errors += 1
+                await asyncio.sleep(delay)
+                delay = min(60.0, delay * 2)
+    
+    def _receive(self, data: bytes):
+        origin, *keys = data.decode().split(" ")
+        if origin == self.origin:
+            return
+        for entry in keys:
+            collection, key = entry.split(":", 1)
+            key = None if key == "*" else int(key)
+            self._mark(collection, key)
+            self._forget_stored(collection, key)
+            self.invalidations_received += 1
+            self.manager._on_shared_invalidation(collection, key)
+    
+    def close(self):
+        """Stop the subscriber and publisher"""
+        for task in (self.task, self.publisher):
+            if task:
+                task.cancel()
+        if self.client is not None:
+            try:
+                asyncio.get_running_loop().create_task(self._close_client())
+            except RuntimeError:
+                pass
+        self.connected = False
+    
+    async def _close_client(self):
+        client, self.client = self.client, None
+        closer = getattr(client, "aclose", None) or client.close
+        try:
+            await closer()
+        except Exception as e:
+            logger.debug(f"Error closing Redis client: {e}")
+    
+    # ---- reads and writes ----
+    
+    async def get(self, collection: str, key: int) -> Optional[Dict[str, Any]]:
+        """Shared copy of a document, or None (miss, disabled or Redis down)"""
+        if not self.connected:
+            return None
+        try:
+            data = await self.client.get(self._key(collection, key))
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"Redis get failed for {collection}:{key}: {e}")
+            return None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.decode(data)
+    
+    async def put(self, collection: str, key: int, document: Dict[str, Any], loaded_seq: int):
+        """Store a document loaded from MongoDB unless it was written since ``loaded_seq``"""
+        if not self.connected:
+            return
+        if self._invalidated_since(collection, key, loaded_seq):
+            self.skipped_stores += 1
+            return
+        try:
+            data = self.encode(document)
+            self.stored_keys[(collection, key)] = loaded_seq
+            self.stored_keys.move_to_end((collection, key))
+            while len(self.stored_keys) > self.MAX_TRACKED_KEYS:
+                self.stored_keys.popitem(last=False)
+            await self.client.set(self._key(collection, key), data, ex=self.ttl)
+            self.stores += 1
+            self.bytes_stored += len(data)
+            if self._invalidated_since(collection, key, loaded_seq):
+                # Invalidated while the SET was in flight
+                self.stored_keys.pop((collection, key), None)
+                await self.client.delete(self._key(collection, key))
+                self.stale_deletes += 1
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"Redis set failed for {collection}:{key}: {e}")
+    
+    def _invalidated_since(self, collection: str, key: int, loaded_seq: int) -> bool:
+        return max(self.invalidated_at.get((collection, key), self.forgotten_seq),
+                   self.invalidated_at.get((collection, None), 0)) > loaded_seq
+    
+    def _forget_stored(self, collection: str, key: Optional[int]):
+        """Queue a DEL for copies we SET that a remote invalidation may have missed"""
+        if key is None:
+            stored = [entry for entry in self.stored_keys if entry[0] == collection]
+        else:
+            stored = [(collection, key)] if (collection, key) in self.stored_keys else []
+        for entry in stored:
+            del self.stored_keys[entry]
+            self.pending_deletes.add(entry)
+        if stored:
+            self.wake.set()
+    
+    def _mark(self, collection: str, key: Optional[int]):
+        self.seq += 1
+        self.invalidated_at[(collection, key)] = self.seq
+        self.invalidated_at.move_to_end((collection, key))
+        while len(self.invalidated_at) > self.MAX_TRACKED_KEYS:
+            _, seq = self.invalidated_at.popitem(last=False)
+            self.forgotten_seq = max(self.forgotten_seq, seq)
+    
+    def invalidate(self, collection: str, key: Optional[int]):
+        """A document changed here (key None: the whole collection); evict it everywhere"""
+        if not self.enabled:
+            return
+        self._mark(collection, key)
+        self.pending_invalidations.add((collection, key))
+        self.wake.set()
+    
+    async def _publish_loop(self):
+        """DEL changed keys and publish them in batches"""
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            batch, self.pending_invalidations = self.pending_invalidations, set()
+            deletes, self.pending_deletes = self.pending_deletes, set()
+            if not batch and not deletes:
+                continue
+            try:
+                async with self.client.pipeline(transaction=False) as pipe:
+                    keys = [self._key(collection, key) for collection, key in batch | deletes if key is not None]
+                    if keys:
+                        pipe.delete(*keys)
+                    if batch:
+                        message = " ".join(
+                            f"{collection}:{'*' if key is None else key}" for collection, key in batch
+                        )
+                        pipe.publish(self.channel, f"{self.origin} {message}")
+                    await pipe.execute()
+                for collection in {collection for collection, key in batch if key is None}:
+                    async for name in self.client.scan_iter(match=f"{self.prefix}:{collection}:*", count=1000):
+                        await self.client.delete(name)
+                self.invalidations_sent += len(batch)
+                self.stale_deletes += len(deletes)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"⚠️ Redis invalidation of {len(batch) + len(deletes)} keys failed, retrying: {e}")
+                self.pending_invalidations |= batch
+                self.pending_deletes |= deletes
+                await asyncio.sleep(1)
+                self.wake.set()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for get_database_stats"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "connected": bool(self.connected),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "skipped_stores": self.skipped_stores,
+            "bytes_stored": self.bytes_stored,
+            "invalidations_sent": self.invalidations_sent,
+            "invalidations_received": self.invalidations_received,
+            "stale_deletes": self.stale_deletes,
+            "pending_invalidations": len(self.pending_invalidations),
+            "errors": self.errors
+        }
@@ -0,0 +1,144 @@
+"""
+Per-process user document cache
+- LRU with a TTL, private copies handed to callers
+- Concurrent misses for one user share a single load
+"""
+
+import copy
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+
+class UserCache:
+    """Size-bounded LRU/TTL read-through cache of user documents with single-flight misses"""
+    
+    def __init__(self, max_size: int = 10000, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        
+        # user_id -> Future of the query currently loading that user
+        self.inflight: Dict[int, asyncio.Future] = {}
+        # users written while a load was in flight; that load must not be cached
+        self.stale_loads: set = set()
+        # Called with the user_id (None: everyone) on every write, e.g. SharedCache
+        self.on_write = None
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+    
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Return a private copy of a fresh cached document, or None"""
+        entry = self.entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        document, loaded_at = entry
+        if time.monotonic() - loaded_at > self.ttl:
+            del self.entries[user_id]
+            self.misses += 1
+            return None
+        
+        self.entries.move_to_end(user_id)
+        self.hits += 1
+        return copy.deepcopy(document)
+    
+    def put(self, user_id: int, document: Dict[str, Any]):
+        """Cache a document, evicting the least recently used entries"""
+        self.entries[user_id] = (copy.deepcopy(document), time.monotonic())
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+    
+    def apply(self, user_id: int, mutate):
+        """Run ``mutate`` on the cached document (if any) after a write"""
+        if self.on_write:
+            self.on_write(user_id)
+        if user_id in self.inflight:
+            self.stale_loads.add(user_id)
+        entry = self.entries.get(user_id)
+        if entry is not None:
+            mutate(entry[0])
+    
+    def patch(self, user_id: int, fields: Dict[str, Any], unset: List[str] = ()):
+        """Apply written (dot-notation) fields and removed paths to a cached document"""
+        def set_fields(document):
+            for field, value in fields.items():
+                keys = field.split('.')
+                current = document
+                for k in keys[:-1]:
+                    current = current.setdefault(k, {})
+                current[keys[-1]] = copy.deepcopy(value)
+            for field in unset:
+                keys = field.split('.')
+                current = document
+                for k in keys[:-1]:
+                    current = current.get(k)
+                    if not isinstance(current, dict):
+                        break
+                else:
+                    current.pop(keys[-1], None)
+        self.apply(user_id, set_fields)
+    
+    def invalidate(self, user_id: int, notify: bool = True):
+        """Drop a user so the next read goes to the database"""
+        if notify and self.on_write:
+            self.on_write(user_id)
+        if user_id in self.inflight:
+            self.stale_loads.add(user_id)
+        self.entries.pop(user_id, None)
+    
+    def clear(self, notify: bool = True):
+        """Drop every entry (e.g. after a collection-wide update)"""
+        if notify and self.on_write:
+            self.on_write(None)
+        self.stale_loads.update(self.inflight)
+        self.entries.clear()
+    
+    async def load(self, user_id: int, loader) -> Dict[str, Any]:
+        """Read-through: serve from cache or run ``loader`` once per user"""
+        document = self.get(user_id)
+        if document is not None:
+            return document
+        
+        future = self.inflight.get(user_id)
+        if future is not None:
+            self.coalesced += 1
+            return copy.deepcopy(await asyncio.shield(future))
+        
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[user_id] = future
+        try:
+            document = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures are not logged as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(document)
+            if user_id not in self.stale_loads:
+                self.put(user_id, document)
+            return copy.deepcopy(document)
+        finally:
+            self.inflight.pop(user_id, None)
+            self.stale_loads.discard(user_id)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for get_database_stats"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced_loads": self.coalesced,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -19,7 +19,7 @@ class Admin(commands.Cog):
             return
             
         try:
-            result = database.db.add_xp(user.id, amount)
+            result = await database.db.add_xp(user.id, amount)
             if result.get("leveled_up"):  # Use .get() to avoid KeyError
                 embed = discord.Embed(title="⭐ XP Updated", description=f"Added **{amount:,}** XP to {user.mention}. Now level **{result['new_level']}**.", color=discord.Color.green())
                 await interaction.response.send_message(embed=embed)
@@ -40,7 +40,7 @@ class Admin(commands.Cog):
             
         try:
             # FIXED: Use negative amount properly and handle level down
-            result = database.db.add_xp(user.id, -amount)
+            result = await database.db.add_xp(user.id, -amount)
             
             # Check if user leveled down
             if result.get("leveled_down") or result.get("level_changed"):
@@ -62,7 +62,7 @@ class Admin(commands.Cog):
             return
             
         try:
-            database.db.add_coins(user.id, amount)
+            await database.db.add_coins(user.id, amount)
             embed = discord.Embed(title="💰 Coins Updated", description=f"Added **{amount:,}** coins to {user.mention}.", color=discord.Color.green())
             await interaction.response.send_message(embed=embed)
         except Exception as e:
@@ -78,7 +78,7 @@ class Admin(commands.Cog):
             return
             
         try:
-            if database.db.remove_coins(user.id, amount):
+            if await database.db.remove_coins(user.id, amount):
                 embed = discord.Embed(title="💰 Coins Updated", description=f"Removed **{amount:,}** coins from {user.mention}.", color=discord.Color.orange())
                 await interaction.response.send_message(embed=embed)
             else:
@@ -95,7 +95,7 @@ class Admin(commands.Cog):
         
         try:
             # Get user data from database
-            user_data = database.db.get_user_data(user.id)  # Assuming this method exists
+            user_data = await database.db.get_user_data(user.id)  # Assuming this method exists
             
             # Example role update logic (you'll need to implement based on your requirements)
             level = user_data.get("level", 0)
@@ -152,7 +152,7 @@ class Admin(commands.Cog):
     @discord.app_commands.default_permissions(administrator=True)
     async def db_health(self, interaction: discord.Interaction):
         try:
-            health = database.db.get_database_health()
+            health = await database.db.get_database_health()
             if health.get("connected"):  # FIXED: Use .get() to avoid KeyError
                 status_msg = "Database status: **Connected** ✅"
                 if "db_type" in health:
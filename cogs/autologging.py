@@ -4,6 +4,8 @@ import database
 from datetime import datetime
 import asyncio
 import logging
+import os
+from message_cache import CachedMessage, MessageRingBuffer
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -11,26 +13,21 @@ logger = logging.getLogger(__name__)
 class AutoLogging(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Cache for before/after message states
-        self.message_cache = {}
+        # Per-guild recent messages for before/after states
+        self.message_buffers = {}
+        self.message_cache_budget = int(os.getenv("MESSAGE_CACHE_BYTES_PER_GUILD", 2 * 1024 * 1024))
+        self.message_cache_hits = 0
+        self.message_cache_misses = 0
 
-    def get_log_channel(self, guild_id: int, log_type: str) -> discord.TextChannel:
+    async def get_log_channel(self, guild_id: int, log_type: str) -> discord.TextChannel:
         """Get appropriate log channel based on type"""
         try:
-            guild_data = database.db.get_guild_data(guild_id)
-            settings = guild_data.get("settings", {})
-            
-            if not settings.get("logging_enabled"):
+            # Cached settings: no database round trip per event
+            settings = database.db.get_guild_settings(guild_id)
+            if not settings or not settings.logging_enabled:
                 return None
             
-            channel_mapping = {
-                "moderation": "modlog_channel",
-                "member": "join_leave_channel", 
-                "message": "message_log_channel",
-                "general": "modlog_channel"  # Fallback
-            }
-            
-            channel_id = settings.get(channel_mapping.get(log_type, "modlog_channel"))
+            channel_id = settings.log_channel(log_type)
             if channel_id:
                 return self.bot.get_channel(channel_id)
             return None
@@ -44,18 +41,17 @@ class AutoLogging(commands.Cog):
     async def on_member_join(self, member: discord.Member):
         """Handle member joins with welcome message and logging"""
         try:
-            guild_data = database.db.get_guild_data(member.guild.id)
-            settings = guild_data.get("settings", {})
+            settings = database.db.get_guild_settings(member.guild.id)
             
             # Store join data in database
-            database.db.update_user_data(member.id, {
+            await database.db.update_user_data(member.id, {
                 "guild_join_date": datetime.now(datetime.UTC).timestamp(),
                 "guild_id": member.guild.id
             })
             
             # Welcome Message (simplified in channel, detailed DM)
-            if settings.get("welcome_enabled"):
-                welcome_channel_id = settings.get("welcome_channel")
+            if settings.welcome_enabled:
+                welcome_channel_id = settings.welcome_channel
                 if welcome_channel_id:
                     welcome_channel = self.bot.get_channel(welcome_channel_id)
                     if welcome_channel:
@@ -73,7 +69,7 @@ class AutoLogging(commands.Cog):
                             logger.error(f"Error sending simplified welcome message: {e}")
                 # DM detailed welcome
                 try:
-                    welcome_message = settings.get("welcome_message", "Welcome {user} to {server}!")
+                    welcome_message = settings.welcome_message
                     message_content = welcome_message.format(
                         user=member.mention,
                         server=member.guild.name,
@@ -91,7 +87,7 @@ class AutoLogging(commands.Cog):
                     pass
             
             # Join Logging
-            log_channel = self.get_log_channel(member.guild.id, "member")
+            log_channel = await self.get_log_channel(member.guild.id, "member")
             if log_channel:
                 embed = discord.Embed(
                     title="📥 Member Joined",
@@ -117,9 +113,8 @@ class AutoLogging(commands.Cog):
     async def on_member_remove(self, member: discord.Member):
         """Handle member leaves with goodbye message and logging"""
         try:
-            guild_data = database.db.get_guild_data(member.guild.id)
-            settings = guild_data.get("settings", {})
-            user_data = database.db.get_user_data(member.id)
+            settings = database.db.get_guild_settings(member.guild.id)
+            user_data = await database.db.get_user_data(member.id)
             
             # Calculate days in server
             join_date = user_data.get("guild_join_date")
@@ -128,8 +123,8 @@ class AutoLogging(commands.Cog):
                 days_in_server = int((datetime.now(datetime.UTC).timestamp() - join_date) / 86400)
             
             # Leave Message (simplified in channel, DM farewell)
-            if settings.get("welcome_enabled"):
-                welcome_channel_id = settings.get("welcome_channel")
+            if settings.welcome_enabled:
+                welcome_channel_id = settings.welcome_channel
                 if welcome_channel_id:
                     welcome_channel = self.bot.get_channel(welcome_channel_id)
                     if welcome_channel:
@@ -146,7 +141,7 @@ class AutoLogging(commands.Cog):
                             logger.error(f"Error sending simplified leave message: {e}")
                 # DM farewell (best-effort; user may have DMs closed)
                 try:
-                    leave_message = settings.get("leave_message", "Goodbye {user}! They were with us for {days} days.")
+                    leave_message = settings.leave_message
                     message_content = leave_message.format(
                         user=member.display_name,
                         server=member.guild.name,
@@ -163,7 +158,7 @@ class AutoLogging(commands.Cog):
                     pass
             
             # Leave Logging
-            log_channel = self.get_log_channel(member.guild.id, "member")
+            log_channel = await self.get_log_channel(member.guild.id, "member")
             if log_channel:
                 embed = discord.Embed(
                     title="📤 Member Left",
@@ -199,53 +194,80 @@ class AutoLogging(commands.Cog):
             return
         
         try:
-            # Cache message for potential edit/delete logging
-            self.message_cache[message.id] = {
-                "content": message.content,
-                "author": message.author,
-                "channel": message.channel,
-                "attachments": [att.url for att in message.attachments],
-                "timestamp": datetime.now(datetime.UTC)
-            }
-            
-            # Keep cache size manageable
-            if len(self.message_cache) > 1000:
-                # Remove oldest entries
-                oldest_keys = list(self.message_cache.keys())[:200]
-                for key in oldest_keys:
-                    del self.message_cache[key]
+            buffer = self.message_buffers.get(message.guild.id)
+            if buffer is None:
+                buffer = self.message_buffers[message.guild.id] = MessageRingBuffer(self.message_cache_budget)
+            buffer.put(CachedMessage.from_message(message))
         except Exception as e:
             logger.error(f"Error caching message: {e}")
 
+    def _cached_message(self, guild_id: int, message_id: int, fallback, remove: bool = False):
+        """Look a message up in the guild's buffer, then in discord.py's own cache"""
+        buffer = self.message_buffers.get(guild_id)
+        record = None
+        if buffer is not None:
+            record = buffer.pop(message_id) if remove else buffer.get(message_id)
+        if record is not None:
+            self.message_cache_hits += 1
+            return record
+        self.message_cache_misses += 1
+        if fallback is not None and not fallback.author.bot:
+            return CachedMessage.from_message(fallback)
+        return None
+
+    def _set_message_author(self, embed: discord.Embed, guild: discord.Guild, record: CachedMessage):
+        member = guild.get_member(record.author_id) if guild else None
+        if member:
+            embed.set_author(name=str(member), icon_url=member.display_avatar.url)
+        embed.add_field(name="👤 Author", value=f"<@{record.author_id}> ({record.author_id})", inline=True)
+        embed.add_field(name="📺 Channel", value=f"<#{record.channel_id}>", inline=True)
+
+    def get_message_cache_stats(self) -> dict:
+        """Size and hit rate of the edit/delete message buffers"""
+        lookups = self.message_cache_hits + self.message_cache_misses
+        return {
+            "guilds": len(self.message_buffers),
+            "messages": sum(len(buffer.records) for buffer in self.message_buffers.values()),
+            "bytes": sum(buffer.bytes for buffer in self.message_buffers.values()),
+            "budget_per_guild": self.message_cache_budget,
+            "evicted": sum(buffer.evicted for buffer in self.message_buffers.values()),
+            "hits": self.message_cache_hits,
+            "misses": self.message_cache_misses,
+            "hit_rate": round(self.message_cache_hits / lookups, 3) if lookups else 0.0
+        }
+
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        """Log deleted messages"""
-        if message.author.bot or not message.guild:
+    async def on_raw_message_delete(self, payload):
+        """Log deleted messages, including ones discord.py no longer caches"""
+        if not payload.guild_id:
             return
         
         try:
-            log_channel = self.get_log_channel(message.guild.id, "message")
+            record = self._cached_message(payload.guild_id, payload.message_id, payload.cached_message, remove=True)
+            if record is None:
+                return
+            
+            log_channel = await self.get_log_channel(payload.guild_id, "message")
             if not log_channel:
                 return
             
             embed = discord.Embed(
                 title="🗑️ Message Deleted",
                 color=discord.Color.red(),
-                timestamp=datetime.now(datetime.UTC)
+                timestamp=discord.utils.utcnow()
             )
             
-            embed.set_author(name=str(message.author), icon_url=message.author.display_avatar.url)
-            embed.add_field(name="👤 Author", value=f"{message.author.mention} ({message.author.id})", inline=True)
-            embed.add_field(name="📺 Channel", value=message.channel.mention, inline=True)
-            embed.add_field(name="🆔 Message ID", value=f"`{message.id}`", inline=True)
+            self._set_message_author(embed, self.bot.get_guild(payload.guild_id), record)
+            embed.add_field(name="🆔 Message ID", value=f"`{record.message_id}`", inline=True)
+            embed.add_field(name="🕒 Sent", value=f"<t:{int(record.created_at)}:R>", inline=True)
             
-            if message.content:
-                content = message.content[:1000] + "..." if len(message.content) > 1000 else message.content
+            if record.content:
+                content = record.content[:1000] + "..." if len(record.content) > 1000 else record.content
                 embed.add_field(name="📝 Content", value=f"```{content}```", inline=False)
             
-            if message.attachments:
-                attachments = "\n".join([f"• {att.filename}" for att in message.attachments[:5]])
-                embed.add_field(name="📎 Attachments", value=attachments, inline=False)
+            if record.attachments:
+                attachments = "\n".join([f"• {url}" for url in record.attachments[:5]])
+                embed.add_field(name="📎 Attachments", value=attachments[:1024], inline=False)
             
             try:
                 await log_channel.send(embed=embed)
@@ -254,37 +276,50 @@ class AutoLogging(commands.Cog):
             except Exception as e:
                 logger.error(f"Error sending delete log: {e}")
         except Exception as e:
-            logger.error(f"Error in on_message_delete: {e}")
+            logger.error(f"Error in on_raw_message_delete: {e}")
 
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        """Log edited messages"""
-        if before.author.bot or not before.guild or before.content == after.content:
+    async def on_raw_message_edit(self, payload):
+        """Log edited messages, including ones discord.py no longer caches"""
+        # Embed unfurls arrive as edits without content
+        if not payload.guild_id or "content" not in payload.data:
             return
         
         try:
-            log_channel = self.get_log_channel(before.guild.id, "message")
+            record = self._cached_message(payload.guild_id, payload.message_id, payload.cached_message)
+            new_content = payload.data["content"]
+            if record is None or record.content == new_content:
+                return
+            
+            # The next edit is logged against this content
+            before_content = record.content
+            record = CachedMessage(record.message_id, record.channel_id, record.author_id,
+                                   new_content, record.attachments, record.created_at)
+            buffer = self.message_buffers.get(payload.guild_id)
+            if buffer is not None:
+                buffer.put(record)
+            
+            log_channel = await self.get_log_channel(payload.guild_id, "message")
             if not log_channel:
                 return
             
             embed = discord.Embed(
                 title="✏️ Message Edited",
                 color=discord.Color.yellow(),
-                timestamp=datetime.now(datetime.UTC)
+                timestamp=discord.utils.utcnow()
             )
             
-            embed.set_author(name=str(before.author), icon_url=before.author.display_avatar.url)
-            embed.add_field(name="👤 Author", value=f"{before.author.mention} ({before.author.id})", inline=True)
-            embed.add_field(name="📺 Channel", value=before.channel.mention, inline=True)
-            embed.add_field(name="🔗 Jump to Message", value=f"[Click Here]({after.jump_url})", inline=True)
+            self._set_message_author(embed, self.bot.get_guild(payload.guild_id), record)
+            jump_url = f"https://discord.com/channels/{payload.guild_id}/{record.channel_id}/{record.message_id}"
+            embed.add_field(name="🔗 Jump to Message", value=f"[Click Here]({jump_url})", inline=True)
             
             # Show before and after content
-            if before.content:
-                before_content = before.content[:500] + "..." if len(before.content) > 500 else before.content
+            if before_content:
+                before_content = before_content[:500] + "..." if len(before_content) > 500 else before_content
                 embed.add_field(name="📝 Before", value=f"```{before_content}```", inline=False)
             
-            if after.content:
-                after_content = after.content[:500] + "..." if len(after.content) > 500 else after.content
+            if new_content:
+                after_content = new_content[:500] + "..." if len(new_content) > 500 else new_content
                 embed.add_field(name="📝 After", value=f"```{after_content}```", inline=False)
             
             try:
@@ -294,7 +329,11 @@ class AutoLogging(commands.Cog):
             except Exception as e:
                 logger.error(f"Error sending edit log: {e}")
         except Exception as e:
-            logger.error(f"Error in on_message_edit: {e}")
+            logger.error(f"Error in on_raw_message_edit: {e}")
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.message_buffers.pop(guild.id, None)
 
     # ==================== ROLE EVENTS ====================
     
@@ -305,7 +344,7 @@ class AutoLogging(commands.Cog):
             return
         
         try:
-            log_channel = self.get_log_channel(before.guild.id, "moderation")
+            log_channel = await self.get_log_channel(before.guild.id, "moderation")
             if not log_channel:
                 return
             
@@ -365,7 +404,7 @@ class AutoLogging(commands.Cog):
     async def on_guild_channel_create(self, channel):
         """Log channel creation"""
         try:
-            log_channel = self.get_log_channel(channel.guild.id, "moderation")
+            log_channel = await self.get_log_channel(channel.guild.id, "moderation")
             if not log_channel:
                 return
             
@@ -394,7 +433,7 @@ class AutoLogging(commands.Cog):
     async def on_guild_channel_delete(self, channel):
         """Log channel deletion"""
         try:
-            log_channel = self.get_log_channel(channel.guild.id, "moderation")
+            log_channel = await self.get_log_channel(channel.guild.id, "moderation")
             if not log_channel:
                 return
             
@@ -425,7 +464,7 @@ class AutoLogging(commands.Cog):
             return
         
         try:
-            log_channel = self.get_log_channel(member.guild.id, "member")
+            log_channel = await self.get_log_channel(member.guild.id, "member")
             if not log_channel:
                 return
             
@@ -481,7 +520,7 @@ class AutoLogging(commands.Cog):
     async def on_member_ban(self, guild, user):
         """Log member bans"""
         try:
-            log_channel = self.get_log_channel(guild.id, "moderation")
+            log_channel = await self.get_log_channel(guild.id, "moderation")
             if not log_channel:
                 return
             
@@ -521,7 +560,7 @@ class AutoLogging(commands.Cog):
     async def on_member_unban(self, guild, user):
         """Log member unbans"""
         try:
-            log_channel = self.get_log_channel(guild.id, "moderation")
+            log_channel = await self.get_log_channel(guild.id, "moderation")
             if not log_channel:
                 return
             
@@ -563,14 +602,14 @@ class AutoLogging(commands.Cog):
     async def toggle_logging(self, ctx, system: str = None):
         """Toggle logging systems on/off"""
         try:
-            guild_data = database.db.get_guild_data(ctx.guild.id)
+            guild_data = await database.db.get_guild_data(ctx.guild.id)
             settings = guild_data.get("settings", {})
             
             if not system:
                 current_status = settings.get("logging_enabled", False)
                 new_status = not current_status
                 
-                database.db.update_guild_data(ctx.guild.id, {
+                await database.db.update_guild_data(ctx.guild.id, {
                     "settings.logging_enabled": new_status
                 })
                 
@@ -1,4 +1,5 @@
 import discord
+import time
 from discord.ext import commands
 from discord import app_commands
 import database
@@ -12,7 +13,7 @@ class Cookies(commands.Cog):
     @app_commands.describe(user="The user to add cookies to.", amount="The amount of cookies to add.")
     @permissions.is_cookies_manager()
     async def add_cookies(self, interaction: discord.Interaction, user: discord.Member, amount: int):
-        database.db.add_cookies(user.id, amount)
+        await database.db.add_cookies(user.id, amount)
         embed = discord.Embed(title="🍪 Cookies Updated", description=f"Added **{amount:,}** cookies to {user.mention}.", color=discord.Color.green())
         await interaction.response.send_message(embed=embed)
     
@@ -20,15 +21,9 @@ class Cookies(commands.Cog):
     @app_commands.describe(user="The user to remove cookies from.", amount="The amount of cookies to remove.")
     @permissions.is_cookies_manager()
     async def remove_cookies(self, interaction: discord.Interaction, user: discord.Member, amount: int):
-        user_data = database.db.get_user_data(user.id)
-        current_cookies = user_data.get("cookies", 0)
-        
-        if current_cookies < amount:
+        if not await database.db.remove_cookies(user.id, amount):
             await interaction.response.send_message("❌ User does not have enough cookies.", ephemeral=True)
             return
-            
-        new_cookies = current_cookies - amount
-        database.db.update_user_data(user.id, {"cookies": new_cookies})
         
         embed = discord.Embed(title="🍪 Cookies Updated", description=f"Removed **{amount:,}** cookies from {user.mention}.", color=discord.Color.orange())
         await interaction.response.send_message(embed=embed)
@@ -37,34 +32,52 @@ class Cookies(commands.Cog):
     @app_commands.describe(amount="The amount of cookies to give everyone.")
     @permissions.is_cookies_manager()
     async def cookies_give_all(self, interaction: discord.Interaction, amount: int):
-        guild_members = interaction.guild.members
-        users_updated = 0
+        if amount <= 0:
+            await interaction.response.send_message("❌ Amount must be positive.", ephemeral=True)
+            return
         
-        for member in guild_members:
-            if not member.bot:
-                database.db.add_cookies(member.id, amount)
-                users_updated += 1
-                
-        embed = discord.Embed(title="🍪 Mass Cookies", description=f"Gave **{amount:,}** cookies to **{users_updated}** users.", color=discord.Color.blurple())
-        await interaction.response.send_message(embed=embed)
+        embed = discord.Embed(title="🍪 Mass Cookies", color=discord.Color.blurple())
+        result = await self._mass_update(interaction, embed, amount)
+        embed.description = f"Gave **{amount:,}** cookies to **{result['users']:,}** users."
+        await interaction.edit_original_response(embed=embed)
 
     @app_commands.command(name="removecookiesall", description="Remove cookies from everyone.")
     @app_commands.describe(amount="The amount of cookies to remove from everyone.")
     @permissions.is_cookies_manager()
     async def remove_cookies_all(self, interaction: discord.Interaction, amount: int):
-        guild_members = interaction.guild.members
-        users_updated = 0
+        if amount <= 0:
+            await interaction.response.send_message("❌ Amount must be positive.", ephemeral=True)
+            return
         
-        for member in guild_members:
-            if not member.bot:
-                user_data = database.db.get_user_data(member.id)
-                current_cookies = user_data.get("cookies", 0)
-                new_cookies = max(0, current_cookies - amount)
-                database.db.update_user_data(member.id, {"cookies": new_cookies})
-                users_updated += 1
+        embed = discord.Embed(title="🍪 Mass Cookies Removal", color=discord.Color.red())
+        result = await self._mass_update(interaction, embed, -amount)
+        embed.description = f"Removed **{amount:,}** cookies from **{result['users']:,}** users."
+        await interaction.edit_original_response(embed=embed)
 
-        embed = discord.Embed(title="🍪 Mass Cookies Removal", description=f"Removed **{amount:,}** cookies from **{users_updated}** users.", color=discord.Color.red())
-        await interaction.response.send_message(embed=embed)
+    async def _mass_update(self, interaction: discord.Interaction, embed: discord.Embed, delta: int) -> dict:
+        """Apply a cookie delta to every non-bot member, editing the response with progress"""
+        await interaction.response.defer()
+        member_ids = [member.id for member in interaction.guild.members if not member.bot]
+        
+        embed.description = f"Updating **{len(member_ids):,}** users..."
+        await interaction.edit_original_response(embed=embed)
+        last_edit = time.monotonic()
+        
+        async def progress(done: int, total: int):
+            nonlocal last_edit
+            # Edits are rate limited; a couple per second is plenty
+            if done < total and time.monotonic() - last_edit >= 2:
+                last_edit = time.monotonic()
+                embed.description = f"Updating... **{done:,}/{total:,}** users ({done * 100 // total}%)"
+                try:
+                    await interaction.edit_original_response(embed=embed)
+                except discord.HTTPException:
+                    pass
+        
+        result = await database.db.bulk_inc_field(member_ids, "cookies", delta, floor=0, progress=progress)
+        if result["failed"]:
+            embed.add_field(name="⚠️ Failed", value=f"`{result['failed']:,}` users could not be updated", inline=False)
+        return result
 
 
 async def setup(bot: commands.Cog):
@@ -93,7 +93,15 @@ class EmbedBuilder:
         )
 
 class LeaderboardView(discord.ui.View):
-    """Enhanced leaderboard with pagination and filters"""
+    """Enhanced leaderboard paging through shared snapshots"""
+    
+    TYPE_INFO = {
+        "xp": {"title": "⭐ XP Leaderboard", "emoji": "⭐"},
+        "coins": {"title": "💰 Coins Leaderboard", "emoji": "💰"},
+        "cookies": {"title": "🍪 Cookies Leaderboard", "emoji": "🍪"},
+        "daily_streak": {"title": "🔥 Daily Streak Leaderboard", "emoji": "🔥"},
+        "work_count": {"title": "💼 Work Sessions Leaderboard", "emoji": "💼"}
+    }
     
     def __init__(self, bot, guild_id: int, leaderboard_type: str, user_id: int = None):
         super().__init__(timeout=300)
@@ -102,26 +110,47 @@ class LeaderboardView(discord.ui.View):
         self.leaderboard_type = leaderboard_type
         self.user_id = user_id
         self.current_page = 1
+        self.total_pages = 1
         self.items_per_page = 10
+        # Shared snapshot this view pages through until refreshed
+        self.snapshot = None
+        # (score, user_id) key of the last entry shown, used past the snapshot
+        self.last_cursor = None
+    
+    def _format_entry(self, rank: int, entry: dict, info: dict) -> str:
+        user_id = entry.get("user_id")
+        user = self.bot.get_user(user_id)
+        user_name = user.display_name if user else f"User {user_id}"
+        value = entry.get(self.leaderboard_type, 0)
+        
+        # Special formatting based on type
+        if self.leaderboard_type == "xp":
+            level = entry.get("level", 1)
+            return f"`#{rank:2d}` **{user_name}** - Level {level} ({value:,} XP)\n"
+        return f"`#{rank:2d}` **{user_name}** - {info['emoji']} {value:,}\n"
         
-    async def create_leaderboard_embed(self, page: int = 1):
-        """Create leaderboard embed with current data"""
-        
-        if self.leaderboard_type == "daily_streak":
-            leaderboard_data = database.db.get_streak_leaderboard(page, self.items_per_page)
-        else:
-            leaderboard_data = database.db.get_paginated_leaderboard(self.leaderboard_type, page, self.items_per_page)
-        
-        # Type mapping for titles and emojis
-        type_info = {
-            "xp": {"title": "⭐ XP Leaderboard", "emoji": "⭐"},
-            "coins": {"title": "💰 Coins Leaderboard", "emoji": "💰"},
-            "cookies": {"title": "🍪 Cookies Leaderboard", "emoji": "🍪"},
-            "daily_streak": {"title": "🔥 Daily Streak Leaderboard", "emoji": "🔥"},
-            "work_count": {"title": "💼 Work Sessions Leaderboard", "emoji": "💼"}
-        }
+    @staticmethod
+    def _format_age(seconds: float) -> str:
+        if seconds < 5:
+            return "just now"
+        if seconds < 60:
+            return f"{int(seconds)}s ago"
+        return f"{int(seconds // 60)}m ago"
+        
+    async def create_leaderboard_embed(self, page: int = 1, after=None, refresh: bool = False):
+        """Create leaderboard embed from the view's snapshot"""
+        if self.snapshot is None or refresh:
+            self.snapshot = await database.db.get_leaderboard_snapshot(self.leaderboard_type)
+        
+        leaderboard_data = await database.db.get_snapshot_leaderboard(
+            self.leaderboard_type, self.snapshot, page, self.items_per_page, after=after
+        )
+        self.current_page = leaderboard_data['current_page']
+        self.total_pages = leaderboard_data['total_pages']
+        if leaderboard_data['users']:
+            self.last_cursor = leaderboard_data['last_cursor']
         
-        info = type_info.get(self.leaderboard_type, {"title": "📊 Leaderboard", "emoji": "📊"})
+        info = self.TYPE_INFO.get(self.leaderboard_type, {"title": "📊 Leaderboard", "emoji": "📊"})
         
         embed = EmbedBuilder.create_embed(
             title=f"{info['title']} - Page {leaderboard_data['current_page']}/{leaderboard_data['total_pages']}",
@@ -135,30 +164,24 @@ class LeaderboardView(discord.ui.View):
         # Create leaderboard text
         leaderboard_text = ""
         for i, entry in enumerate(leaderboard_data['users']):
-            user_id = entry.get("user_id")
-            user = self.bot.get_user(user_id)
-            user_name = user.display_name if user else f"User {user_id}"
-            
             rank = (leaderboard_data['current_page'] - 1) * self.items_per_page + i + 1
-            value = entry.get(self.leaderboard_type, 0)
-            
-            # Special formatting based on type
-            if self.leaderboard_type == "xp":
-                level = entry.get("level", 1)
-                leaderboard_text += f"`#{rank:2d}` **{user_name}** - Level {level} ({value:,} XP)\n"
-            else:
-                leaderboard_text += f"`#{rank:2d}` **{user_name}** - {info['emoji']} {value:,}\n"
+            leaderboard_text += self._format_entry(rank, entry, info)
         
         embed.description = leaderboard_text
         
         # Add user's position if they have data
         if self.user_id:
-            user_data = database.db.get_user_data(self.user_id)
+            user_data = await database.db.get_user_data(self.user_id)
             user_value = user_data.get(self.leaderboard_type, 0)
             if user_value > 0:
+                if self.snapshot and self.user_id in self.snapshot.positions:
+                    rank = self.snapshot.positions[self.user_id] + 1
+                else:
+                    rank = await database.db.get_leaderboard_rank(self.leaderboard_type, self.user_id)
+                rank_text = f"**Rank:** #{rank:,} of {leaderboard_data['total_users']:,}\n" if rank else ""
                 embed.add_field(
                     name="🎯 Your Stats",
-                    value=f"**Score:** {info['emoji']} {user_value:,}",
+                    value=f"{rank_text}**Score:** {info['emoji']} {user_value:,}",
                     inline=True
                 )
         
@@ -168,51 +191,58 @@ class LeaderboardView(discord.ui.View):
             inline=True
         )
         
-        embed.set_footer(text="Updated in real-time • Use buttons to navigate")
+        snapshot_age = leaderboard_data.get('snapshot_age')
+        if snapshot_age is not None:
+            embed.set_footer(text=f"Snapshot from {self._format_age(snapshot_age)} • 🔄 for latest • Use buttons to navigate")
+        else:
+            embed.set_footer(text="Live data • Use buttons to navigate")
         return embed
     
     @discord.ui.button(emoji="⏪", style=discord.ButtonStyle.secondary)
     async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page = 1
-        embed = await self.create_leaderboard_embed(self.current_page)
+        embed = await self.create_leaderboard_embed(1)
         await interaction.response.edit_message(embed=embed, view=self)
     
     @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.primary)
     async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page = max(1, self.current_page - 1)
-        embed = await self.create_leaderboard_embed(self.current_page)
+        embed = await self.create_leaderboard_embed(max(1, self.current_page - 1))
         await interaction.response.edit_message(embed=embed, view=self)
     
     @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.primary)
     async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Get max pages from current data
-        if self.leaderboard_type == "daily_streak":
-            data = database.db.get_streak_leaderboard(1, self.items_per_page)
+        if self.current_page < self.total_pages and self.last_cursor:
+            embed = await self.create_leaderboard_embed(self.current_page + 1, after=self.last_cursor)
         else:
-            data = database.db.get_paginated_leaderboard(self.leaderboard_type, 1, self.items_per_page)
-        
-        max_pages = data['total_pages']
-        self.current_page = min(max_pages, self.current_page + 1)
-        embed = await self.create_leaderboard_embed(self.current_page)
+            embed = await self.create_leaderboard_embed(self.total_pages)
         await interaction.response.edit_message(embed=embed, view=self)
     
     @discord.ui.button(emoji="⏩", style=discord.ButtonStyle.secondary)
     async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Get max pages from current data
-        if self.leaderboard_type == "daily_streak":
-            data = database.db.get_streak_leaderboard(1, self.items_per_page)
-        else:
-            data = database.db.get_paginated_leaderboard(self.leaderboard_type, 1, self.items_per_page)
-        
-        max_pages = data['total_pages']
-        self.current_page = max_pages
-        embed = await self.create_leaderboard_embed(self.current_page)
+        # Last page is read backwards from the end of the index
+        embed = await self.create_leaderboard_embed(self.total_pages)
         await interaction.response.edit_message(embed=embed, view=self)
     
     @discord.ui.button(emoji="🔄", style=discord.ButtonStyle.success, row=1)
     async def refresh(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = await self.create_leaderboard_embed(self.current_page)
+        embed = await self.create_leaderboard_embed(self.current_page, refresh=True)
         await interaction.response.edit_message(embed=embed, view=self)
+    
+    @discord.ui.button(label="Around Me", emoji="📍", style=discord.ButtonStyle.secondary, row=1)
+    async def around_me(self, interaction: discord.Interaction, button: discord.ui.Button):
+        info = self.TYPE_INFO.get(self.leaderboard_type, {"title": "📊 Leaderboard", "emoji": "📊"})
+        nearby = await database.db.get_leaderboard_neighbours(self.leaderboard_type, interaction.user.id)
+        
+        if not nearby['rank']:
+            await interaction.response.send_message("❌ You're not on this leaderboard yet!", ephemeral=True)
+            return
+        
+        embed = EmbedBuilder.create_embed(
+            title=f"{info['title']} - Around You",
+            description="".join(self._format_entry(entry['rank'], entry, info) for entry in nearby['users']),
+            color=BotColors.PREMIUM
+        )
+        embed.set_footer(text=f"You are ranked #{nearby['rank']:,}")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 class ProfileView(discord.ui.View):
     """Interactive view for user profiles"""
@@ -227,8 +257,7 @@ class ProfileView(discord.ui.View):
             await interaction.response.send_message("❌ This is not your profile!", ephemeral=True)
             return
         
-        user_data = database.db.get_user_data(self.target_user_id)
-        achievements = user_data.get("achievements", [])
+        achievements = await database.db.get_user_items("achievements", self.target_user_id)
         
         embed = EmbedBuilder.create_embed(
             title="🏆 User Achievements",
@@ -248,7 +277,7 @@ class ProfileView(discord.ui.View):
 
     @discord.ui.button(label="📊 Detailed Stats", style=discord.ButtonStyle.primary)
     async def show_detailed_stats(self, interaction: discord.Interaction, button: discord.ui.Button):
-        user_data = database.db.get_user_data(self.target_user_id)
+        user_data = await database.db.get_user_data(self.target_user_id)
         
         embed = EmbedBuilder.create_embed(
             title="📊 Detailed Statistics",
@@ -273,7 +302,7 @@ class ProfileView(discord.ui.View):
                        inline=True)
         
         # Pet stats
-        pets = user_data.get("pets", [])
+        pets = await database.db.get_user_items("pets", self.target_user_id)
         if pets:
             total_battles = sum(pet.get("battles_total", 0) for pet in pets)
             total_wins = sum(pet.get("battles_won", 0) for pet in pets)
@@ -321,7 +350,7 @@ class CoreUserSystem(commands.Cog):
 
     @app_commands.command(name="hello", description="Get a personalized greeting with your current status.")
     async def hello(self, interaction: discord.Interaction):
-        user_data = database.db.get_user_data(interaction.user.id)
+        user_data = await database.db.get_user_data(interaction.user.id)
         level = user_data.get("level", 1)
         streak = user_data.get("daily_streak", 0)
         
@@ -372,7 +401,7 @@ class CoreUserSystem(commands.Cog):
         
         # Database health check
         try:
-            db_health = database.db.get_database_health()
+            db_health = await database.db.get_database_health()
             db_status = "🟢 Connected" if db_health["connected"] else "🟡 Memory Mode"
         except Exception as e:
             db_status = "🔴 Error"
@@ -420,7 +449,7 @@ class CoreUserSystem(commands.Cog):
         
         # Database stats
         try:
-            db_stats = database.db.get_database_stats()
+            db_stats = await database.db.get_database_stats()
             embed.add_field(name="🗄️ Database", value=f"`{db_stats['users']:,}` users\n`{db_stats['guilds']}` guilds\n{db_stats['storage_type']}", inline=True)
         except Exception as e:
             embed.add_field(name="🗄️ Database", value="Stats unavailable", inline=True)
@@ -454,7 +483,7 @@ class CoreUserSystem(commands.Cog):
     @app_commands.describe(user="The user whose profile you want to view (optional).")
     async def profile(self, interaction: discord.Interaction, user: discord.Member = None):
         target_user = user or interaction.user
-        user_data = database.db.get_user_data(target_user.id)
+        user_data = await database.db.get_user_data(target_user.id)
         
         # Basic stats
         xp = user_data.get("xp", 0)
@@ -513,7 +542,7 @@ class CoreUserSystem(commands.Cog):
             embed.add_field(name="💼 Career", value="*Unemployed*\nUse `/career` to find a job!", inline=True)
         
         # Pet information
-        pets = user_data.get("pets", [])
+        pets = await database.db.get_user_items("pets", target_user.id)
         if pets:
             pet_info = []
             for pet in pets[:3]:  # Show first 3 pets
@@ -528,12 +557,11 @@ class CoreUserSystem(commands.Cog):
         
         # Special items and achievements
         try:
-            temp_purchases = database.db.get_active_temporary_purchases(target_user.id)
-            active_boosts = len(temp_purchases)
+            active_boosts = len(database.db.boosts.active_boosts(target_user.id))
         except Exception:
             active_boosts = 0
             
-        achievements = user_data.get("achievements", [])
+        achievements = await database.db.get_user_items("achievements", target_user.id)
         
         embed.add_field(name="✨ Special", 
                        value=f"**Active Boosts:** `{active_boosts}`\n**Cookies:** `{cookies:,}` 🍪\n**Achievements:** `{len(achievements)}`", 
@@ -582,7 +610,7 @@ class CoreUserSystem(commands.Cog):
     @app_commands.command(name="myitems", description="View your active items, boosts, and temporary purchases.")
     async def myitems(self, interaction: discord.Interaction):
         try:
-            purchases = database.db.get_active_temporary_purchases(interaction.user.id)
+            purchases = await database.db.get_active_temporary_purchases(interaction.user.id)
         except Exception as e:
             purchases = []
         
@@ -731,24 +759,13 @@ class CoreUserSystem(commands.Cog):
         # Make leveling harder: reduce per-message XP
         xp_gained = random.randint(2, 6)
         try:
-            result = database.db.add_xp(message.author.id, xp_gained)
+            # XP boost multiplier comes from memory, no query per message
+            xp_gained = int(xp_gained * (await database.db.get_boost_effects(message.author.id))["xp"])
+            # XP, message count and last_seen are batched and flushed periodically
+            result = await database.db.activity.record(message.author.id, xp_gained)
         except Exception as e:
             return  # Skip if database error
         
-        # Update message count
-        try:
-            user_data = database.db.get_user_data(message.author.id)
-            stats = user_data.get("stats", {})
-            stats["messages_sent"] = stats.get("messages_sent", 0) + 1
-            stats["last_message"] = time.time()
-            
-            database.db.update_user_data(message.author.id, {
-                "stats": stats,
-                "last_seen": datetime.now(datetime.UTC)
-            })
-        except Exception as e:
-            pass  # Non-critical error
-        
         # Level up notification
         if result.get("leveled_up"):
             embed = EmbedBuilder.create_embed(
@@ -768,7 +785,7 @@ class CoreUserSystem(commands.Cog):
                 if "coins" in level_rewards:
                     coins = int(level_rewards.split(" ")[0])
                     try:
-                        database.db.add_coins(message.author.id, coins)
+                        await database.db.add_coins(message.author.id, coins, durable=False)
                     except Exception:
                         pass
             
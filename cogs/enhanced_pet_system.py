@@ -77,6 +77,10 @@ class PetBattleView(discord.ui.View):
             await interaction.response.send_message("❌ Only the challenged player can accept this battle!", ephemeral=True)
             return
         
+        if self.battle_accepted:
+            await interaction.response.send_message("❌ This battle has already started!", ephemeral=True)
+            return
+        
         self.battle_accepted = True
         await self.simulate_battle(interaction)
 
@@ -171,12 +175,14 @@ class PetBattleView(discord.ui.View):
             exp_gained = random.randint(50, 100)
             coins_won = random.randint(100, 500)
             
-            # Update winner's pet
-            self.update_pet_after_battle(winner_id, winner_pet, exp_gained, True)
-            # Update loser's pet (less exp)
-            self.update_pet_after_battle(loser_id, loser_pet, exp_gained // 2, False)
-            
-            database.db.add_coins(winner_id, coins_won)
+            # Both pet lists are read-modify-written; hold both users at once
+            async with database.db.user_txn(winner_id, loser_id):
+                # Update winner's pet
+                await self.update_pet_after_battle(winner_id, winner_pet, exp_gained, True)
+                # Update loser's pet (less exp)
+                await self.update_pet_after_battle(loser_id, loser_pet, exp_gained // 2, False)
+                
+                await database.db.add_coins(winner_id, coins_won)
             
             embed.add_field(
                 name="💰 Rewards",
@@ -209,28 +215,27 @@ class PetBattleView(discord.ui.View):
         
         return max(1, damage)  # Minimum 1 damage
 
-    def update_pet_after_battle(self, user_id: int, pet: dict, exp: int, won: bool):
+    async def update_pet_after_battle(self, user_id: int, pet: dict, exp: int, won: bool):
         """Update pet stats after battle"""
-        user_data = database.db.get_user_data(user_id)
-        pets = user_data.get("pets", [])
-        
-        for i, p in enumerate(pets):
-            if p.get("pet_id") == pet.get("pet_id"):
-                pets[i]["experience"] = pets[i].get("experience", 0) + exp
-                pets[i]["battles_won"] = pets[i].get("battles_won", 0) + (1 if won else 0)
-                pets[i]["battles_total"] = pets[i].get("battles_total", 0) + 1
-                
-                # Level up check
-                new_level = self.calculate_level(pets[i]["experience"])
-                if new_level > pets[i].get("level", 1):
-                    pets[i]["level"] = new_level
-                    # Stat boost on level up
-                    for stat in pets[i]["stats"]:
-                        pets[i]["stats"][stat] += random.randint(1, 3)
-                
-                break
-        
-        database.db.update_user_data(user_id, {"pets": pets})
+        async with database.db.user_txn(user_id):
+            pets = await database.db.get_user_items("pets", user_id)
+            
+            for i, p in enumerate(pets):
+                if p.get("pet_id") == pet.get("pet_id"):
+                    pets[i]["experience"] = pets[i].get("experience", 0) + exp
+                    pets[i]["battles_won"] = pets[i].get("battles_won", 0) + (1 if won else 0)
+                    pets[i]["battles_total"] = pets[i].get("battles_total", 0) + 1
+                    
+                    # Level up check
+                    new_level = self.calculate_level(pets[i]["experience"])
+                    if new_level > pets[i].get("level", 1):
+                        pets[i]["level"] = new_level
+                        # Stat boost on level up
+                        for stat in pets[i]["stats"]:
+                            pets[i]["stats"][stat] += random.randint(1, 3)
+                    
+                    await database.db.save_user_item("pets", user_id, pets[i])
+                    break
 
     def calculate_level(self, experience: int) -> int:
         """Calculate pet level from experience"""
@@ -328,10 +333,8 @@ class PetAdoptionView(discord.ui.View):
                 }
                 
                 # Add pet to user's collection
-                user_data = database.db.get_user_data(interaction.user.id)
-                pets = user_data.get("pets", [])
-                pets.append(new_pet)
-                database.db.update_user_data(interaction.user.id, {"pets": pets})
+                async with database.db.user_txn(interaction.user.id):
+                    await database.db.add_user_item("pets", interaction.user.id, new_pet)
                 
                 embed = discord.Embed(
                     title="🎉 Pet Adopted Successfully!",
@@ -361,8 +364,8 @@ class EnhancedPetSystem(commands.Cog):
 
     @app_commands.command(name="adopt", description="Adopt a new pet companion with advanced features.")
     async def adopt(self, interaction: discord.Interaction):
-        user_data = database.db.get_user_data(interaction.user.id)
-        pets = user_data.get("pets", [])
+        user_data = await database.db.get_user_data(interaction.user.id)
+        pets = await database.db.get_user_items("pets", interaction.user.id)
         
         # Check pet limit
         max_pets = 5 + (user_data.get("level", 1) // 10)  # More pets with higher level
@@ -370,11 +373,7 @@ class EnhancedPetSystem(commands.Cog):
             await interaction.response.send_message(f"❌ You can only have {max_pets} pets! Level up to increase your limit.", ephemeral=True)
             return
         
-        # Check adoption cost
         adoption_cost = 1000
-        if user_data.get("coins", 0) < adoption_cost:
-            await interaction.response.send_message(f"❌ Adoption costs {adoption_cost} coins. You need {adoption_cost - user_data.get('coins', 0)} more coins.", ephemeral=True)
-            return
         
         # Generate available pets based on rarity chances
         rarity_chances = {"common": 0.5, "uncommon": 0.3, "rare": 0.15, "legendary": 0.04, "mythic": 0.01}
@@ -435,8 +434,12 @@ class EnhancedPetSystem(commands.Cog):
         
         embed.set_footer(text="Each pet comes with a unique personality that affects their stats!")
         
-        # Deduct adoption fee
-        database.db.remove_coins(interaction.user.id, adoption_cost)
+        # Deduct adoption fee; the guarded debit is the balance check
+        if not await database.db.remove_coins(interaction.user.id, adoption_cost):
+            user_data = await database.db.get_user_data(interaction.user.id)
+            needed = max(1, adoption_cost - user_data.get("coins", 0))
+            await interaction.response.send_message(f"❌ Adoption costs {adoption_cost} coins. You need {needed} more coins.", ephemeral=True)
+            return
         
         view = PetAdoptionView(interaction.user.id, available_pets)
         await interaction.response.send_message(embed=embed, view=view)
@@ -455,8 +458,7 @@ class EnhancedPetSystem(commands.Cog):
         ]
     )
     async def pet_command(self, interaction: discord.Interaction, action: str = "status", pet_name: str = None):
-        user_data = database.db.get_user_data(interaction.user.id)
-        pets = user_data.get("pets", [])
+        pets = await database.db.get_user_items("pets", interaction.user.id)
         
         if not pets:
             embed = discord.Embed(
@@ -562,23 +564,17 @@ class EnhancedPetSystem(commands.Cog):
         await interaction.response.send_message(embed=embed)
 
     async def perform_pet_activity(self, interaction: discord.Interaction, pet: dict, activity: str):
-        user_data = database.db.get_user_data(interaction.user.id)
-        
         if activity not in PET_ACTIVITIES:
             await interaction.response.send_message("❌ Invalid activity.", ephemeral=True)
             return
         
         activity_data = PET_ACTIVITIES[activity]
         cost = activity_data["cost"]
-        
-        # Check if user can afford the activity
-        if user_data.get("coins", 0) < cost:
-            await interaction.response.send_message(f"❌ {activity.title()} costs {cost} coins. You need {cost - user_data.get('coins', 0)} more coins.", ephemeral=True)
-            return
+        stat_boost = activity_data["stat_boost"]
+        boost_amount = activity_data["boost_amount"]
         
         # Check cooldowns
         last_activity_key = f"last_{activity}"
-        last_activity_time = pet.get(last_activity_key, 0)
         cooldown = 3600  # 1 hour cooldown for most activities
         
         if activity == "play":
@@ -586,42 +582,46 @@ class EnhancedPetSystem(commands.Cog):
         elif activity == "feed":
             cooldown = 7200  # 2 hours for feeding
         
-        if time.time() - last_activity_time < cooldown:
-            next_time = last_activity_time + cooldown
-            await interaction.response.send_message(f"⏰ You need to wait until <t:{int(next_time)}:R> before {activity}ing {pet['name']} again.", ephemeral=True)
-            return
-        
-        # Perform activity
-        database.db.remove_coins(interaction.user.id, cost)
-        
-        # Update pet stats
-        pets = user_data.get("pets", [])
-        for i, p in enumerate(pets):
-            if p.get("pet_id") == pet.get("pet_id"):
-                # Update happiness
-                pets[i]["happiness"] = min(100, pets[i].get("happiness", 50) + activity_data["happiness"])
-                
-                # Update last activity time
-                pets[i][last_activity_key] = time.time()
-                
-                # Apply stat boost
-                stat_boost = activity_data["stat_boost"]
-                boost_amount = activity_data["boost_amount"]
-                
-                if stat_boost == "all":
-                    for stat in pets[i]["stats"]:
-                        pets[i]["stats"][stat] += boost_amount
-                elif stat_boost in pets[i]["stats"]:
-                    pets[i]["stats"][stat_boost] += boost_amount
-                
-                # Special effects for feeding
-                if activity == "feed":
-                    pets[i]["hunger"] = min(100, pets[i].get("hunger", 50) + 30)
-                    pets[i]["energy"] = min(100, pets[i].get("energy", 100) + 20)
-                
-                break
-        
-        database.db.update_user_data(interaction.user.id, {"pets": pets})
+        # Cooldown check, debit and pet update happen on one fresh copy of the pet
+        async with database.db.user_txn(interaction.user.id):
+            pets = await database.db.get_user_items("pets", interaction.user.id)
+            current = next((p for p in pets if p.get("pet_id") == pet.get("pet_id")), None)
+            if current is None:
+                await interaction.response.send_message(f"❌ You no longer have {pet['name']}.", ephemeral=True)
+                return
+            
+            last_activity_time = current.get(last_activity_key, 0)
+            if time.time() - last_activity_time < cooldown:
+                next_time = last_activity_time + cooldown
+                await interaction.response.send_message(f"⏰ You need to wait until <t:{int(next_time)}:R> before {activity}ing {pet['name']} again.", ephemeral=True)
+                return
+            
+            # Perform activity
+            if not await database.db.remove_coins(interaction.user.id, cost):
+                user_data = await database.db.get_user_data(interaction.user.id)
+                needed = max(1, cost - user_data.get("coins", 0))
+                await interaction.response.send_message(f"❌ {activity.title()} costs {cost} coins. You need {needed} more coins.", ephemeral=True)
+                return
+            
+            # Update happiness
+            current["happiness"] = min(100, current.get("happiness", 50) + activity_data["happiness"])
+            
+            # Update last activity time
+            current[last_activity_key] = time.time()
+            
+            # Apply stat boost
+            if stat_boost == "all":
+                for stat in current["stats"]:
+                    current["stats"][stat] += boost_amount
+            elif stat_boost in current["stats"]:
+                current["stats"][stat_boost] += boost_amount
+            
+            # Special effects for feeding
+            if activity == "feed":
+                current["hunger"] = min(100, current.get("hunger", 50) + 30)
+                current["energy"] = min(100, current.get("energy", 100) + 20)
+            
+            await database.db.save_user_item("pets", interaction.user.id, current)
         
         embed = discord.Embed(
             title=f"{pet['emoji']} {activity.title()} Complete!",
@@ -652,8 +652,7 @@ class EnhancedPetSystem(commands.Cog):
             return
         
         # Get challenger's pet
-        user_data = database.db.get_user_data(interaction.user.id)
-        user_pets = user_data.get("pets", [])
+        user_pets = await database.db.get_user_items("pets", interaction.user.id)
         challenger_pet = next((p for p in user_pets if p["name"].lower() == your_pet.lower()), None)
         
         if not challenger_pet:
@@ -666,8 +665,7 @@ class EnhancedPetSystem(commands.Cog):
             return
         
         # Get opponent's pet
-        opponent_data = database.db.get_user_data(opponent.id)
-        opponent_pets = opponent_data.get("pets", [])
+        opponent_pets = await database.db.get_user_items("pets", opponent.id)
         
         if not opponent_pets:
             await interaction.response.send_message(f"❌ {opponent.display_name} doesn't have any pets!", ephemeral=True)
@@ -714,8 +712,7 @@ class EnhancedPetSystem(commands.Cog):
     @app_commands.command(name="evolve", description="Evolve your pet to its next form!")
     @app_commands.describe(pet_name="Name of the pet you want to evolve")
     async def evolve_pet(self, interaction: discord.Interaction, pet_name: str):
-        user_data = database.db.get_user_data(interaction.user.id)
-        pets = user_data.get("pets", [])
+        pets = await database.db.get_user_items("pets", interaction.user.id)
         
         selected_pet = next((p for p in pets if p["name"].lower() == pet_name.lower()), None)
         if not selected_pet:
@@ -766,38 +763,41 @@ class EnhancedPetSystem(commands.Cog):
         # Evolution cost
         evolution_cost = 5000 * ({"uncommon": 1, "rare": 2, "legendary": 4, "mythic": 8}[evolution_rarity])
         
-        if user_data.get("coins", 0) < evolution_cost:
-            needed = evolution_cost - user_data.get("coins", 0)
-            await interaction.response.send_message(f"❌ Evolution costs {evolution_cost:,} coins. You need {needed:,} more coins.", ephemeral=True)
-            return
-        
-        # Perform evolution
-        database.db.remove_coins(interaction.user.id, evolution_cost)
-        
-        # Update pet
-        for i, p in enumerate(pets):
-            if p.get("pet_id") == selected_pet.get("pet_id"):
-                pets[i]["species"] = evolution_target
-                pets[i]["rarity"] = evolution_rarity
-                pets[i]["emoji"] = evolution_data["emoji"]
-                pets[i]["stats"] = evolution_data["base_stats"].copy()
-                
-                # Apply level bonuses to new base stats
-                level_bonus = current_level - 1
-                for stat in pets[i]["stats"]:
-                    pets[i]["stats"][stat] += level_bonus * random.randint(2, 4)
-                
-                # Apply personality modifiers to new stats
-                personality = pets[i].get("personality", "Gentle")
-                if personality in PET_PERSONALITIES:
-                    personality_mods = PET_PERSONALITIES[personality]
-                    for stat, multiplier in personality_mods.items():
-                        if stat in pets[i]["stats"]:
-                            pets[i]["stats"][stat] = int(pets[i]["stats"][stat] * multiplier)
-                
-                break
-        
-        database.db.update_user_data(interaction.user.id, {"pets": pets})
+        # Re-read the pet under the lock so a second /evolve cannot charge for the same evolution
+        async with database.db.user_txn(interaction.user.id):
+            pets = await database.db.get_user_items("pets", interaction.user.id)
+            current = next((p for p in pets if p.get("pet_id") == selected_pet.get("pet_id")), None)
+            if current is None or current["species"] != current_species:
+                await interaction.response.send_message(f"❌ {selected_pet['name']} has already changed; try again.", ephemeral=True)
+                return
+            
+            # Perform evolution
+            if not await database.db.remove_coins(interaction.user.id, evolution_cost):
+                user_data = await database.db.get_user_data(interaction.user.id)
+                needed = max(1, evolution_cost - user_data.get("coins", 0))
+                await interaction.response.send_message(f"❌ Evolution costs {evolution_cost:,} coins. You need {needed:,} more coins.", ephemeral=True)
+                return
+            
+            # Update pet
+            current["species"] = evolution_target
+            current["rarity"] = evolution_rarity
+            current["emoji"] = evolution_data["emoji"]
+            current["stats"] = evolution_data["base_stats"].copy()
+            
+            # Apply level bonuses to new base stats
+            level_bonus = current_level - 1
+            for stat in current["stats"]:
+                current["stats"][stat] += level_bonus * random.randint(2, 4)
+            
+            # Apply personality modifiers to new stats
+            personality = current.get("personality", "Gentle")
+            if personality in PET_PERSONALITIES:
+                personality_mods = PET_PERSONALITIES[personality]
+                for stat, multiplier in personality_mods.items():
+                    if stat in current["stats"]:
+                        current["stats"][stat] = int(current["stats"][stat] * multiplier)
+            
+            await database.db.save_user_item("pets", interaction.user.id, current)
         
         embed = discord.Embed(
             title="✨ Evolution Complete!",
@@ -823,7 +823,7 @@ class EnhancedPetSystem(commands.Cog):
         )
         
         # Show new stats
-        new_stats = pets[[p.get("pet_id") for p in pets].index(selected_pet.get("pet_id"))]["stats"]
+        new_stats = current["stats"]
         stats_text = "\n".join([f"**{stat.upper()}:** {value}" for stat, value in new_stats.items()])
         embed.add_field(name="📊 New Stats", value=stats_text, inline=False)
         
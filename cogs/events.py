@@ -2,7 +2,6 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import permissions
-import asyncio
 import time
 import database
 
@@ -175,6 +174,9 @@ class Events(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        database.db.timers.register("event_start", self._announce_event_start)
+
     @app_commands.command(name="shout", description="Create a detailed event announcement with join system.")
     @app_commands.describe(
         title="Title of the event",
@@ -257,8 +259,13 @@ class Events(commands.Cog):
 
         await interaction.response.send_message("@everyone", embed=embed, view=view)
         
-        # Schedule event start notification
-        asyncio.create_task(self._schedule_event_start(event_id, start_timestamp, interaction.channel))
+        # Schedule event start notification (persisted, survives restarts)
+        await database.db.timers.schedule("event_start", start_timestamp, {
+            "event_id": event_id,
+            "channel_id": interaction.channel_id,
+            "title": title,
+            "host_id": interaction.user.id
+        })
 
     @app_commands.command(name="gamelog", description="Log a completed game with simple details.")
     @app_commands.describe(
@@ -388,37 +395,35 @@ class Events(commands.Cog):
         
         await interaction.response.send_message("@everyone", embed=embed)
 
-    async def _schedule_event_start(self, event_id: str, start_time: float, channel):
-        """Schedule event start notification"""
-        await asyncio.sleep(start_time - time.time())
+    async def _announce_event_start(self, timer: dict):
+        """event_start timer: announce the event in its channel"""
+        event_id = timer["payload"]["event_id"]
+        # Sign-ups are in memory only; after a restart announce without them
+        event = active_events.pop(event_id, None) or {"title": timer["payload"]["title"]}
         
-        if event_id in active_events:
-            event = active_events[event_id]
-            
-            embed = discord.Embed(
-                title="🚀 EVENT STARTING NOW!",
-                description=f"**{event['title']}** is beginning!",
-                color=discord.Color.red()
+        embed = discord.Embed(
+            title="🚀 EVENT STARTING NOW!",
+            description=f"**{event['title']}** is beginning!",
+            color=discord.Color.red()
+        )
+        
+        participants = event.get("participants", {})
+        if participants:
+            participant_mentions = [f"<@{uid}>" for uid in participants.keys()]
+            embed.add_field(
+                name=f"👥 Participants ({len(participants)})",
+                value=" ".join(participant_mentions[:20]) + ("..." if len(participants) > 20 else ""),
+                inline=False
             )
-            
-            participants = event.get("participants", {})
-            if participants:
-                participant_mentions = [f"<@{uid}>" for uid in participants.keys()]
-                embed.add_field(
-                    name=f"👥 Participants ({len(participants)})",
-                    value=" ".join(participant_mentions[:20]) + ("..." if len(participants) > 20 else ""),
-                    inline=False
-                )
-            
-            embed.set_footer(text=f"Event ID: {event_id}")
-            
-            try:
+        
+        embed.set_footer(text=f"Event ID: {event_id}")
+        
+        try:
+            channel = self.bot.get_channel(timer["payload"]["channel_id"])
+            if channel:
                 await channel.send(embed=embed)
-            except Exception:
-                pass  # Channel might be deleted or bot lacks permissions
-            
-            # Remove event from active events after it starts
-            del active_events[event_id]
+        except Exception:
+            pass  # Channel might be deleted or bot lacks permissions
 
     def _get_result_color(self, result: str) -> discord.Color:
         """Get color based on game result"""
@@ -139,7 +139,7 @@ class JobApplicationView(discord.ui.View):
         starting_job = path_data["jobs"][0]
         
         # Update user's job information
-        database.db.update_user_data(self.user_id, {
+        await database.db.update_user_data(self.user_id, {
             "job.career_path": career_path,
             "job.current_level": 0,
             "job.title": starting_job["title"],
@@ -172,7 +172,7 @@ class JobSystem(commands.Cog):
 
     @app_commands.command(name="career", description="View your career progression and job information.")
     async def career(self, interaction: discord.Interaction):
-        user_data = database.db.get_user_data(interaction.user.id)
+        user_data = await database.db.get_user_data(interaction.user.id)
         job_data = user_data.get("job", {})
         
         if not job_data.get("career_path"):
@@ -260,8 +260,8 @@ class JobSystem(commands.Cog):
     async def work(self, interaction: discord.Interaction):
         user_id = interaction.user.id
         
-        if not database.db.can_work(user_id):
-            user_data = database.db.get_user_data(user_id)
+        if not await database.db.can_work(user_id):
+            user_data = await database.db.get_user_data(user_id)
             next_work = user_data.get("last_work", 0) + 3600
             embed = discord.Embed(
                 title="⏰ Still on Break!",
@@ -271,7 +271,7 @@ class JobSystem(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        user_data = database.db.get_user_data(user_id)
+        user_data = await database.db.get_user_data(user_id)
         job_data = user_data.get("job", {})
         
         # Check if user has a job
@@ -301,14 +301,16 @@ class JobSystem(commands.Cog):
         # Success chance improves with performance (from 60% to 95%)
         success_chance = min(0.95, 0.6 + (performance / 10.0))
         success = random.random() < success_chance
-        final_earnings = int(base_salary * performance_multiplier) if success else 0
+        # Money magnet / XP boost multipliers
+        boosts = await database.db.get_boost_effects(user_id)
+        final_earnings = int(base_salary * performance_multiplier * boosts["coins"]) if success else 0
         
         # Calculate XP gain (both regular XP and work XP)
         base_xp = random.randint(15, 35)
         work_xp_gain = random.randint(10, 25)
         
         # Performance affects XP gain
-        total_xp = int(base_xp * performance_multiplier)
+        total_xp = int(base_xp * performance_multiplier * boosts["xp"])
         total_work_xp = int(work_xp_gain * performance_multiplier)
         
         # Get work activity
@@ -316,7 +318,7 @@ class JobSystem(commands.Cog):
         activity = random.choice(activities)
         
         # Process the work
-        result = database.db.process_work(user_id, current_job["title"], final_earnings)
+        result = await database.db.process_work(user_id, current_job["title"], final_earnings)
         
         if not result["success"]:
             await interaction.response.send_message("❌ An error occurred while processing your work.", ephemeral=True)
@@ -331,7 +333,7 @@ class JobSystem(commands.Cog):
         # Update work count for general progression
         work_count = user_data.get("work_count", 0) + 1
         
-        database.db.update_user_data(user_id, {
+        await database.db.update_user_data(user_id, {
             "job.work_xp": new_work_xp,
             "job.performance_rating": new_performance,
             "job.total_earnings": total_earnings,
@@ -340,7 +342,7 @@ class JobSystem(commands.Cog):
         })
         
         # Add regular XP too
-        database.db.add_xp(user_id, total_xp)
+        await database.db.add_xp(user_id, total_xp)
         
         # Check if promotion is available
         next_job = None
@@ -392,7 +394,7 @@ class JobSystem(commands.Cog):
         # Performance bonus for exceptional workers
         if new_performance >= 4.5:
             bonus = int(final_earnings * 0.2)
-            database.db.add_coins(user_id, bonus)
+            await database.db.add_coins(user_id, bonus)
             embed.add_field(
                 name="🌟 Excellence Bonus!", 
                 value=f"Outstanding performance earned you an extra `{bonus:,}` coins!", 
@@ -406,7 +408,7 @@ class JobSystem(commands.Cog):
 
     @app_commands.command(name="promote", description="Apply for a promotion if eligible.")
     async def promote(self, interaction: discord.Interaction):
-        user_data = database.db.get_user_data(interaction.user.id)
+        user_data = await database.db.get_user_data(interaction.user.id)
         job_data = user_data.get("job", {})
         
         if not job_data.get("career_path"):
@@ -454,14 +456,14 @@ class JobSystem(commands.Cog):
         promotion_bonus = next_job["salary"][1] * 2  # Double max salary as bonus
         new_promotions = promotions + 1
         
-        database.db.update_user_data(interaction.user.id, {
+        await database.db.update_user_data(interaction.user.id, {
             "job.current_level": new_level,
             "job.title": next_job["title"],
             "job.performance_rating": min(5.0, performance + 0.2),  # Small performance boost
             "job.promotions": new_promotions
         })
         
-        database.db.add_coins(interaction.user.id, promotion_bonus)
+        await database.db.add_coins(interaction.user.id, promotion_bonus)
         
         embed = discord.Embed(
             title="🎉 PROMOTION!",
@@ -482,7 +484,7 @@ class JobSystem(commands.Cog):
 
     @app_commands.command(name="resign", description="Resign from your current job.")
     async def resign(self, interaction: discord.Interaction):
-        user_data = database.db.get_user_data(interaction.user.id)
+        user_data = await database.db.get_user_data(interaction.user.id)
         job_data = user_data.get("job", {})
         
         if not job_data.get("career_path"):
@@ -503,7 +505,7 @@ class JobSystem(commands.Cog):
             @discord.ui.button(label="Confirm Resignation", style=discord.ButtonStyle.red, emoji="✅")
             async def confirm_resign(self, button_interaction, button):
                 # Clear job data
-                database.db.update_user_data(interaction.user.id, {
+                await database.db.update_user_data(interaction.user.id, {
                     "job": {}
                 })
                 
@@ -2,14 +2,20 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import random
-import asyncio
+import time
 from datetime import datetime
+import database
 
 class Fun(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.active_giveaways = {}
 
+    async def cog_load(self):
+        # Giveaways are concluded by a persisted timer; the join button outlives restarts
+        self.bot.add_view(Fun.GiveawayView())
+        database.db.timers.register("giveaway_end", self._conclude_giveaway)
+
     @app_commands.command(name="flip", description="Flip a coin - heads or tails.")
     async def flip(self, interaction: discord.Interaction):
         outcome = random.choice(["Heads", "Tails"])
@@ -165,19 +171,23 @@ class Fun(commands.Cog):
 
     # ==================== GIVEAWAY ====================
     class GiveawayView(discord.ui.View):
-        def __init__(self, host_id: int, ends_at: float):
+        """Join button; entrants are stored on the giveaway's timer"""
+        def __init__(self):
             super().__init__(timeout=None)
-            self.host_id = host_id
-            self.ends_at = ends_at
-            self.participants = set()
-            self.message = None
         
-        @discord.ui.button(label="🎉 Join Giveaway", style=discord.ButtonStyle.success)
+        @discord.ui.button(label="🎉 Join Giveaway", style=discord.ButtonStyle.success, custom_id="giveaway:join")
         async def join(self, interaction: discord.Interaction, button: discord.ui.Button):
             if interaction.user.bot:
                 await interaction.response.send_message("Bots cannot join.", ephemeral=True)
                 return
-            self.participants.add(interaction.user.id)
+            timers = database.db.timers.find("giveaway_end", message_id=interaction.message.id)
+            if not timers:
+                await interaction.response.send_message("❌ This giveaway has ended.", ephemeral=True)
+                return
+            payload = dict(timers[0]["payload"])
+            if interaction.user.id not in payload["participants"]:
+                payload["participants"] = payload["participants"] + [interaction.user.id]
+                await database.db.timers.update(timers[0]["_id"], payload)
             await interaction.response.send_message("✅ You're in!", ephemeral=True)
 
     @app_commands.command(name="giveaway", description="Start a giveaway with a join button.")
@@ -186,22 +196,34 @@ class Fun(commands.Cog):
         if duration_minutes < 1 or duration_minutes > 1440:
             await interaction.response.send_message("❌ Duration must be 1-1440 minutes.", ephemeral=True)
             return
-        ends_at = asyncio.get_event_loop().time() + duration_minutes * 60
-        view = Fun.GiveawayView(interaction.user.id, ends_at)
-        embed = discord.Embed(title="🎉 Giveaway!", description=f"Prize: **{prize}**\nEnds: <t:{int(datetime.now(datetime.UTC).timestamp() + duration_minutes*60)}:R>", color=discord.Color.gold())
+        ends_at = time.time() + duration_minutes * 60
+        view = Fun.GiveawayView()
+        embed = discord.Embed(title="🎉 Giveaway!", description=f"Prize: **{prize}**\nEnds: <t:{int(ends_at)}:R>", color=discord.Color.gold())
         await interaction.response.send_message(embed=embed, view=view)
-        view.message = await interaction.original_response()
-        async def conclude():
-            await asyncio.sleep(duration_minutes * 60)
-            if not view.participants:
-                result = discord.Embed(title="🎉 Giveaway Ended", description="No valid participants.", color=discord.Color.red())
-                await view.message.edit(embed=result, view=None)
-                return
-            import random as _r
-            winner_id = _r.choice(list(view.participants))
-            result = discord.Embed(title="🎉 Giveaway Winner!", description=f"Winner: <@{winner_id}>\nPrize: **{prize}**", color=discord.Color.green())
-            await view.message.edit(embed=result, view=None)
-        self.bot.loop.create_task(conclude())
+        message = await interaction.original_response()
+        await database.db.timers.schedule("giveaway_end", ends_at, {
+            "channel_id": message.channel.id,
+            "message_id": message.id,
+            "prize": prize,
+            "participants": [],
+            "host_id": interaction.user.id
+        })
+
+    async def _conclude_giveaway(self, timer: dict):
+        """giveaway_end timer: pick a winner and close the giveaway message"""
+        payload = timer["payload"]
+        try:
+            channel = self.bot.get_channel(payload["channel_id"]) or await self.bot.fetch_channel(payload["channel_id"])
+            message = await channel.fetch_message(payload["message_id"])
+        except (discord.NotFound, discord.Forbidden):
+            return  # Giveaway message or channel is gone
+        if not payload["participants"]:
+            result = discord.Embed(title="🎉 Giveaway Ended", description="No valid participants.", color=discord.Color.red())
+            await message.edit(embed=result, view=None)
+            return
+        winner_id = random.choice(payload["participants"])
+        result = discord.Embed(title="🎉 Giveaway Winner!", description=f"Winner: <@{winner_id}>\nPrize: **{payload['prize']}**", color=discord.Color.green())
+        await message.edit(embed=result, view=None)
         
     @app_commands.command(name="trivia", description="Start a trivia game.")
     async def trivia(self, interaction: discord.Interaction):
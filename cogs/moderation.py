@@ -20,7 +20,7 @@ class Moderation(commands.Cog):
             "reason": reason,
             "timestamp": time.time()
         }
-        database.db.add_warning(user.id, warning_data)
+        await database.db.add_warning(user.id, warning_data)
         
         embed = discord.Embed(
             title="User Warned",
@@ -34,7 +34,7 @@ class Moderation(commands.Cog):
     @app_commands.command(name="warnlist", description="Check warnings for a user.")
     @app_commands.describe(user="The user whose warnings you want to check.")
     async def warnlist(self, interaction: discord.Interaction, user: discord.Member):
-        warnings = database.db.get_warnings(user.id)
+        warnings = await database.db.get_warnings(user.id)
         
         if not warnings:
             await interaction.response.send_message(f"{user.display_name} has no warnings.", ephemeral=True)
@@ -63,16 +63,14 @@ class Moderation(commands.Cog):
     @app_commands.describe(user="The user whose warnings to remove.", warning_index="The index of the warning to remove (e.g., 1 for the first warning).", reason="The reason for removing the warning.")
     @permissions.is_any_moderator()
     async def remove_warnlist(self, interaction: discord.Interaction, user: discord.Member, warning_index: int, reason: str):
-        user_data = database.db.get_user_data(user.id)
-        warnings = user_data.get("warnings", [])
+        warnings = await database.db.get_warnings(user.id)
 
         if not warnings or warning_index <= 0 or warning_index > len(warnings):
             await interaction.response.send_message("Invalid warning index.", ephemeral=True)
             return
 
-        removed_warning = warnings.pop(warning_index - 1)
-        user_data["warnings"] = warnings
-        database.db.update_user_data(user.id, user_data)
+        removed_warning = warnings[warning_index - 1]
+        await database.db.remove_warning(user.id, removed_warning["_id"])
 
         embed = discord.Embed(
             title="Warning Removed",
@@ -101,7 +99,7 @@ class Moderation(commands.Cog):
     @permissions.is_any_moderator()
     async def setlog(self, interaction: discord.Interaction, channel: discord.TextChannel):
         guild_id = interaction.guild_id
-        database.db.update_guild_data(guild_id, {"settings.modlog_channel": channel.id})
+        await database.db.update_guild_data(guild_id, {"settings.modlog_channel": channel.id})
         await interaction.response.send_message(f"✅ Moderation log channel set to {channel.mention}.", ephemeral=True)
 
 async def setup(bot: commands.Cog):
@@ -58,7 +58,7 @@ class SetupView(discord.ui.View):
                         if not all([self.parent.modlog, self.parent.joinleave, self.parent.messagelog]):
                             await interaction.response.send_message("❌ Please select all three channels.", ephemeral=True)
                             return
-                        database.db.update_guild_data(interaction.guild.id, {
+                        await database.db.update_guild_data(interaction.guild.id, {
                             "settings.modlog_channel": self.parent.modlog,
                             "settings.join_leave_channel": self.parent.joinleave,
                             "settings.message_log_channel": self.parent.messagelog,
@@ -121,7 +121,7 @@ class SetupView(discord.ui.View):
                     if not self.parent.category_id:
                         await inter.response.send_message("❌ Please select a category.", ephemeral=True)
                         return
-                    database.db.update_guild_data(interaction.guild.id, {
+                    await database.db.update_guild_data(interaction.guild.id, {
                         "settings.ticket_category": self.parent.category_id,
                         "settings.transcript_channel": self.parent.transcript_id,
                         "settings.support_role": self.parent.support_role_id,
@@ -177,7 +177,7 @@ class SetupView(discord.ui.View):
                     if not self.parent.channel_id:
                         await interaction.response.send_message("❌ Select a channel first.", ephemeral=True)
                         return
-                    database.db.update_guild_data(interaction.guild.id, {
+                    await database.db.update_guild_data(interaction.guild.id, {
                         "settings.starboard_channel": self.parent.channel_id,
                         "settings.starboard_emoji": getattr(self.parent, 'emoji', '⭐'),
                         "settings.starboard_threshold": getattr(self.parent, 'threshold', 3),
@@ -234,7 +234,7 @@ class SetupView(discord.ui.View):
                     if not self.parent.channel_id:
                         await inter.response.send_message("❌ Select a channel first.", ephemeral=True)
                         return
-                    database.db.update_guild_data(inter.guild.id, {
+                    await database.db.update_guild_data(inter.guild.id, {
                         "settings.welcome_channel": self.parent.channel_id,
                         "settings.welcome_message": getattr(self.parent, 'welcome_text', "Welcome {user} to {server}!"),
                         "settings.leave_message": getattr(self.parent, 'leave_text', "Goodbye {user}! They were with us for {days} days"),
@@ -285,7 +285,7 @@ class SetupView(discord.ui.View):
                     daily_amount = int(self.daily_bonus.value)
                     work_cd = int(self.work_cooldown.value) * 60  # Convert to seconds
                     
-                    database.db.update_guild_data(interaction.guild.id, {
+                    await database.db.update_guild_data(interaction.guild.id, {
                         "settings.levelup_channel": levelup_id,
                         "economy.daily_bonus": daily_amount,
                         "economy.work_cooldown": work_cd,
@@ -312,7 +312,7 @@ class SetupView(discord.ui.View):
 
     @discord.ui.button(label="📊 View Configuration", style=discord.ButtonStyle.gray, emoji="📊")
     async def view_config(self, interaction: discord.Interaction, button: discord.ui.Button):
-        guild_data = database.db.get_guild_data(interaction.guild.id)
+        guild_data = await database.db.get_guild_data(interaction.guild.id)
         settings = guild_data.get("settings", {})
         
         embed = discord.Embed(
@@ -448,7 +448,7 @@ class Settings(commands.Cog):
         guild_id = interaction.guild_id
         
         # Save starboard settings to the database
-        database.db.update_guild_data(guild_id, {
+        await database.db.update_guild_data(guild_id, {
             "settings.starboard_channel": channel.id,
             "settings.starboard_emoji": emoji,
             "settings.starboard_threshold": threshold,
@@ -467,7 +467,7 @@ class Settings(commands.Cog):
 
     @app_commands.command(name="viewsettings", description="View current server configuration.")
     async def view_settings(self, interaction: discord.Interaction):
-        guild_data = database.db.get_guild_data(interaction.guild_id)
+        guild_data = await database.db.get_guild_data(interaction.guild_id)
         settings = guild_data.get("settings", {})
         economy = guild_data.get("economy", {})
         
@@ -523,18 +523,14 @@ class Settings(commands.Cog):
         if payload.user_id == self.bot.user.id:
             return
         
-        guild_data = database.db.get_guild_data(payload.guild_id)
-        settings = guild_data.get("settings", {})
-        
-        if not settings.get("starboard_enabled"):
+        # Cached settings: most reactions return here without touching the database
+        settings = database.db.get_guild_settings(payload.guild_id)
+        if not settings or not settings.starboard_enabled:
             return
         
-        starboard_channel_id = settings.get("starboard_channel")
-        starboard_emoji_name = settings.get("starboard_emoji")
-        starboard_threshold = settings.get("starboard_threshold", 3)
-
-        if not all([starboard_channel_id, starboard_emoji_name, starboard_threshold]):
-            return
+        starboard_channel_id = settings.starboard_channel
+        starboard_emoji_name = settings.starboard_emoji
+        starboard_threshold = settings.starboard_threshold
         
         if str(payload.emoji) == starboard_emoji_name:
             channel = self.bot.get_channel(payload.channel_id)
@@ -552,6 +548,7 @@ class Settings(commands.Cog):
                 return
                 
             # Check existing starboard messages in database
+            guild_data = await database.db.get_guild_data(payload.guild_id)
             existing_starboard = guild_data.get("starboard_messages", {})
             if str(message.id) in existing_starboard:
                 return
@@ -588,7 +585,7 @@ class Settings(commands.Cog):
                             "created_at": datetime.now(datetime.UTC).timestamp()
                         }
                         
-                        database.db.update_guild_data(payload.guild_id, {
+                        await database.db.update_guild_data(payload.guild_id, {
                             "starboard_messages": existing_starboard
                         })
                         
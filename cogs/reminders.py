@@ -2,15 +2,27 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
+import heapq
+import logging
 import time
 import database
 
+logger = logging.getLogger(__name__)
+
 
 class Reminders(commands.Cog):
+    # Upper bound on one sleep, so wall-clock jumps are noticed
+    MAX_SLEEP = 3600
+    # Reminders sent at the same time
+    DELIVERY_CONCURRENCY = 25
+
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self._task = None
-        self._watch_users = set()
+        # (remind_at, _id, user_id, channel_id, text), earliest first
+        self._heap = []
+        self._scheduled = set()
+        self._wake = asyncio.Event()
 
     async def cog_load(self):
         try:
@@ -19,6 +31,10 @@ class Reminders(commands.Cog):
         except Exception:
             pass
 
+    async def cog_unload(self):
+        if self._task:
+            self._task.cancel()
+
     @app_commands.command(name="remind", description="Set a reminder. Example: /remind in_minutes:30 text:Drink water")
     @app_commands.describe(in_minutes="How many minutes from now", text="Reminder text")
     async def remind(self, interaction: discord.Interaction, in_minutes: int, text: str):
@@ -27,51 +43,96 @@ class Reminders(commands.Cog):
             return
         remind_at = time.time() + (in_minutes * 60)
         user_id = interaction.user.id
-        user_data = database.db.get_user_data(user_id)
-        reminders = user_data.get("reminders", [])
-        reminders.append({
+        reminder = {
             "remind_at": remind_at,
             "text": text,
             "channel_id": interaction.channel.id
-        })
-        database.db.update_user_data(user_id, {"reminders": reminders})
-        # ensure scheduler watches this user
-        self._watch_users.add(user_id)
+        }
+        reminder["_id"] = await database.db.add_user_item("reminders", user_id, reminder)
+        if reminder["_id"] is None:
+            await interaction.response.send_message("❌ Could not save your reminder, please try again.", ephemeral=True)
+            return
+        reminder["user_id"] = user_id
+        self._schedule(reminder)
         await interaction.response.send_message(f"⏰ I'll remind you in {in_minutes} minutes.")
 
+    def _schedule(self, reminder: dict):
+        """Push a stored reminder onto the heap, waking the scheduler if it is now first"""
+        if reminder["_id"] in self._scheduled:
+            return
+        self._scheduled.add(reminder["_id"])
+        entry = (reminder.get("remind_at", 0), reminder["_id"], reminder["user_id"],
+                 reminder.get("channel_id"), reminder.get("text", "(no text)"))
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wake.set()
+
+    async def _load(self):
+        """Schedule every stored reminder (one indexed scan)"""
+        reminders = await database.db.find_items("reminders", sort_field="remind_at")
+        for reminder in reminders:
+            self._schedule(reminder)
+        logger.info(f"⏰ Scheduled {len(reminders)} stored reminders")
+
+    async def _reload_when_connected(self):
+        # Reminders stored in MongoDB are only visible once it connects
+        task = database.db.connect_task
+        if task and not task.done():
+            await asyncio.shield(task)
+            await self._load()
+
     async def _scheduler(self):
         await self.bot.wait_until_ready()
-        while not self.bot.is_closed():
-            try:
+        await self._load()
+        reload_task = asyncio.create_task(self._reload_when_connected())
+        try:
+            while not self.bot.is_closed():
+                self._wake.clear()
                 now = time.time()
-                for uid in list(self._watch_users):
-                    user_data = database.db.get_user_data(uid)
-                    user_reminders = user_data.get("reminders", [])
-                    if not user_reminders:
-                        # nothing to watch for this user anymore
-                        self._watch_users.discard(uid)
-                        continue
-                    due = [r for r in user_reminders if r.get("remind_at", 0) <= now]
-                    if not due:
-                        continue
-                    remaining = [r for r in user_reminders if r not in due]
-                    database.db.update_user_data(uid, {"reminders": remaining})
-                    for r in due:
-                        try:
-                            channel = self.bot.get_channel(r.get("channel_id"))
-                            mention = f"<@{uid}>"
-                            msg = f"⏰ {mention} Reminder: {r.get('text','(no text)')}"
-                            if channel:
-                                await channel.send(msg)
-                            else:
-                                user_obj = self.bot.get_user(uid)
-                                if user_obj:
-                                    await user_obj.send(msg)
-                        except Exception:
-                            pass
-            except Exception:
-                pass
-            await asyncio.sleep(30)
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+                if due:
+                    try:
+                        await self._deliver(due)
+                    except Exception as e:
+                        logger.error(f"Error delivering reminders: {e}")
+
+                timeout = min(self.MAX_SLEEP, self._heap[0][0] - time.time()) if self._heap else self.MAX_SLEEP
+                try:
+                    await asyncio.wait_for(self._wake.wait(), max(0, timeout))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            reload_task.cancel()
+
+    async def _deliver(self, due: list):
+        """Delete a due batch, then send it concurrently"""
+        by_user = {}
+        for _, reminder_id, user_id, _, _ in due:
+            by_user.setdefault(user_id, []).append(reminder_id)
+            self._scheduled.discard(reminder_id)
+        await asyncio.gather(*(
+            database.db.remove_user_items("reminders", user_id, ids) for user_id, ids in by_user.items()
+        ))
+
+        limit = asyncio.Semaphore(self.DELIVERY_CONCURRENCY)
+
+        async def send(user_id, channel_id, text):
+            async with limit:
+                try:
+                    msg = f"⏰ <@{user_id}> Reminder: {text}"
+                    channel = self.bot.get_channel(channel_id)
+                    if channel:
+                        await channel.send(msg)
+                    else:
+                        user_obj = self.bot.get_user(user_id)
+                        if user_obj:
+                            await user_obj.send(msg)
+                except Exception:
+                    pass
+
+        await asyncio.gather(*(send(user_id, channel_id, text) for _, _, user_id, channel_id, text in due))
 
 
 async def setup(bot: commands.Bot):
@@ -28,7 +28,7 @@ class Settings(commands.Cog):
             guild_id = interaction.guild_id
             
             # Save starboard settings to the database
-            database.db.update_guild_data(guild_id, {
+            await database.db.update_guild_data(guild_id, {
                 "settings.starboard_channel": channel.id,
                 "settings.starboard_emoji": emoji,
                 "settings.starboard_threshold": threshold,
@@ -54,7 +54,7 @@ class Settings(commands.Cog):
     @app_commands.command(name="viewsettings", description="View current server settings.")
     async def view_settings(self, interaction: discord.Interaction):
         try:
-            guild_data = database.db.get_guild_data(interaction.guild_id)
+            guild_data = await database.db.get_guild_data(interaction.guild_id)
             settings = guild_data.get("settings", {})
             economy = guild_data.get("economy", {})
             
@@ -165,18 +165,14 @@ class Settings(commands.Cog):
             return
         
         try:
-            guild_data = database.db.get_guild_data(payload.guild_id)
-            settings = guild_data.get("settings", {})
-            
-            if not settings.get("starboard_enabled"):
+            # Cached settings: most reactions return here without touching the database
+            settings = database.db.get_guild_settings(payload.guild_id)
+            if not settings or not settings.starboard_enabled:
                 return
             
-            starboard_channel_id = settings.get("starboard_channel")
-            starboard_emoji_name = settings.get("starboard_emoji")
-            starboard_threshold = settings.get("starboard_threshold", 3)
-
-            if not all([starboard_channel_id, starboard_emoji_name, starboard_threshold]):
-                return
+            starboard_channel_id = settings.starboard_channel
+            starboard_emoji_name = settings.starboard_emoji
+            starboard_threshold = settings.starboard_threshold
             
             if str(payload.emoji) == starboard_emoji_name:
                 channel = self.bot.get_channel(payload.channel_id)
@@ -198,6 +194,7 @@ class Settings(commands.Cog):
                     return
                 
                 # Check existing starboard messages
+                guild_data = await database.db.get_guild_data(payload.guild_id)
                 existing_starboard = guild_data.get("starboard_messages", {})
                 if str(message.id) in existing_starboard:
                     return  # Message already on starboard
@@ -237,7 +234,7 @@ class Settings(commands.Cog):
                                 "created_at": discord.utils.utcnow().timestamp()
                             }
                             
-                            database.db.update_guild_data(payload.guild_id, {
+                            await database.db.update_guild_data(payload.guild_id, {
                                 "starboard_messages": existing_starboard
                             })
                             
@@ -152,7 +152,7 @@ class EconomyView(discord.ui.View):
             await interaction.response.send_message("❌ This is not your wallet!", ephemeral=True)
             return
         
-        user_data = database.db.get_user_data(self.user_id)
+        user_data = await database.db.get_user_data(self.user_id)
         coins = user_data.get("coins", 0)
         bank = user_data.get("bank", 0)
         net_worth = coins + bank
@@ -178,7 +178,7 @@ class UnifiedEconomy(commands.Cog):
     @app_commands.describe(user="The user whose balance you want to check (optional).")
     async def balance(self, interaction: discord.Interaction, user: discord.Member = None):
         target_user = user or interaction.user
-        user_data = database.db.get_user_data(target_user.id)
+        user_data = await database.db.get_user_data(target_user.id)
         
         coins = user_data.get("coins", 0)
         cookies = user_data.get("cookies", 0)
@@ -186,7 +186,7 @@ class UnifiedEconomy(commands.Cog):
         net_worth = coins + bank
 
         # Calculate total investments value
-        investments = user_data.get("investments", [])
+        investments = await database.db.get_user_items("investments", target_user.id)
         investment_value = sum(inv.get("amount", 0) for inv in investments)
         
         # Calculate total debt
@@ -235,10 +235,10 @@ class UnifiedEconomy(commands.Cog):
 
     @app_commands.command(name="daily", description="Claim enhanced daily rewards with streak bonuses.")
     async def daily(self, interaction: discord.Interaction):
-        result = database.db.claim_daily_bonus(interaction.user.id)
+        result = await database.db.claim_daily_bonus(interaction.user.id)
 
         if result["success"]:
-            user_data = database.db.get_user_data(interaction.user.id)
+            user_data = await database.db.get_user_data(interaction.user.id)
             streak = result["streak"]
             
             # Calculate enhanced rewards based on streak
@@ -331,7 +331,6 @@ class UnifiedEconomy(commands.Cog):
     )
     async def buy(self, interaction: discord.Interaction, item: str, quantity: int = 1):
         user_id = interaction.user.id
-        user_data = database.db.get_user_data(user_id)
         
         item_details = PREMIUM_SHOP_ITEMS.get(item)
         if not item_details:
@@ -345,8 +344,10 @@ class UnifiedEconomy(commands.Cog):
         total_cost = item_details["price"] * quantity
         duration = item_details["duration"]
 
-        if user_data["coins"] < total_cost:
-            needed = total_cost - user_data["coins"]
+        # The guarded debit is the balance check
+        if not await database.db.remove_coins(user_id, total_cost):
+            user_data = await database.db.get_user_data(user_id)
+            needed = max(1, total_cost - user_data["coins"])
             embed = discord.Embed(
                 title="💸 Insufficient Funds",
                 description=f"You need `{needed:,}` more coins to buy {quantity}x {item.replace('_', ' ').title()}.",
@@ -354,13 +355,13 @@ class UnifiedEconomy(commands.Cog):
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
-
-        # Process the purchase
-        database.db.remove_coins(user_id, total_cost)
         
         # Stack duration if buying multiple
         total_duration = duration * quantity
-        database.db.add_temporary_purchase(user_id, item, total_duration)
+        if not await database.db.add_temporary_purchase(user_id, item, total_duration):
+            await database.db.refund_coins(user_id, total_cost)
+            await interaction.response.send_message("❌ Your purchase could not be completed; you have been refunded.", ephemeral=True)
+            return
 
         tier_emoji = {"common": "🟢", "uncommon": "🟡", "rare": "🟠", "legendary": "🟣"}.get(item_details["tier"], "⚪")
         
@@ -390,24 +391,25 @@ class UnifiedEconomy(commands.Cog):
     )
     async def coinflip(self, interaction: discord.Interaction, amount: int, side: str = None):
         user_id = interaction.user.id
-        user_data = database.db.get_user_data(user_id)
 
         if amount <= 0:
             await interaction.response.send_message("❌ You must bet a positive amount of coins.", ephemeral=True)
             return
-            
-        if user_data["coins"] < amount:
+        
+        # Take the bet up front so overlapping flips cannot spend the same coins
+        balance = await database.db.spend_coins(user_id, amount)
+        if balance is None:
             await interaction.response.send_message("❌ You don't have enough coins for that bet.", ephemeral=True)
             return
 
-        # Check for gambling luck boost
-        active_purchases = database.db.get_active_temporary_purchases(user_id)
-        luck_boost = any(p.get("item_type") == "gambling_luck" for p in active_purchases)
+        # Gambling luck (or premium) boost
+        boosts = await database.db.get_boost_effects(user_id)
+        win_chance = boosts["win_chance"]
+        luck_boost = win_chance > 0.50
         
         await interaction.response.defer()
         
         # Determine outcome with luck boost
-        win_chance = 0.52 if luck_boost else 0.50  # Slight edge with luck boost
         user_wins = random.random() < win_chance
         actual_outcome = side if user_wins else ("tails" if side == "heads" else "heads")
         
@@ -437,11 +439,13 @@ class UnifiedEconomy(commands.Cog):
         # Calculate winnings with multipliers
         if user_wins:
             base_winnings = amount
-            luck_multiplier = 1.2 if luck_boost else 1.0
+            luck_multiplier = boosts["gamble_payout"]
             final_winnings = int(base_winnings * luck_multiplier)
             
-            database.db.add_coins(user_id, final_winnings)
-            new_balance = user_data['coins'] + final_winnings
+            # Return the stake along with the winnings; only the winnings are earnings
+            await database.db.refund_coins(user_id, amount)
+            await database.db.add_coins(user_id, final_winnings)
+            new_balance = balance + amount + final_winnings
             
             embed = discord.Embed(
                 title=f"🪙 {actual_outcome.upper()} - You Win!",
@@ -455,8 +459,7 @@ class UnifiedEconomy(commands.Cog):
                 embed.add_field(name="🍀 Luck Bonus", value=f"+{int((luck_multiplier-1)*100)}%", inline=True)
             embed.set_thumbnail(url="https://i.imgur.com/YpTzj5Q.png" if actual_outcome == "heads" else "https://i.imgur.com/8XfzJ5Q.png")
         else:
-            database.db.remove_coins(user_id, amount)
-            new_balance = user_data['coins'] - amount
+            new_balance = balance
             
             embed = discord.Embed(
                 title=f"🪙 {actual_outcome.upper()} - You Lose!",
@@ -474,13 +477,12 @@ class UnifiedEconomy(commands.Cog):
     @app_commands.command(name="slots", description="Play enhanced slot machine with multiple paylines.")
     @app_commands.describe(bet="Amount to bet (minimum 50 coins)")
     async def slots(self, interaction: discord.Interaction, bet: int):
-        user_data = database.db.get_user_data(interaction.user.id)
-        
         if bet < 50:
             await interaction.response.send_message("❌ Minimum bet is 50 coins.", ephemeral=True)
             return
         
-        if user_data["coins"] < bet:
+        # Take the bet up front; the guarded debit is the balance check
+        if not await database.db.remove_coins(interaction.user.id, bet):
             await interaction.response.send_message("❌ You don't have enough coins for that bet.", ephemeral=True)
             return
 
@@ -546,7 +548,7 @@ class UnifiedEconomy(commands.Cog):
         slot_display = "\n".join(["".join(row) for row in result])
         
         if winnings > 0:
-            database.db.add_coins(interaction.user.id, winnings - bet)  # Net winnings
+            await database.db.add_coins(interaction.user.id, winnings)  # Stake was already taken
             embed = discord.Embed(
                 title="🎰 JACKPOT! 🎰",
                 color=discord.Color.gold(),
@@ -557,7 +559,6 @@ class UnifiedEconomy(commands.Cog):
             embed.add_field(name="📈 Net Profit", value=f"`{winnings - bet:+,}` coins", inline=True)
             embed.add_field(name="🏆 Winning Lines", value="\n".join(win_lines) if win_lines else "None", inline=False)
         else:
-            database.db.remove_coins(interaction.user.id, bet)
             embed = discord.Embed(
                 title="🎰 Better Luck Next Time!",
                 color=discord.Color.red(),
@@ -573,7 +574,7 @@ class UnifiedEconomy(commands.Cog):
 
     @app_commands.command(name="bank", description="Access your comprehensive banking dashboard.")
     async def bank(self, interaction: discord.Interaction):
-        user_data = database.db.get_user_data(interaction.user.id)
+        user_data = await database.db.get_user_data(interaction.user.id)
         
         coins = user_data.get("coins", 0)
         bank_balance = user_data.get("bank", 0)
@@ -634,39 +635,43 @@ class UnifiedEconomy(commands.Cog):
         ]
     )
     async def savings(self, interaction: discord.Interaction, action: str, amount: int = 0):
-        user_data = database.db.get_user_data(interaction.user.id)
+        user_id = interaction.user.id
         
         if action == "interest":
-            # Claim daily compound interest
-            last_interest = user_data.get("last_interest", time.time())
-            days_passed = (time.time() - last_interest) / 86400
-            
-            if days_passed < 1:
-                next_claim = last_interest + 86400
-                embed = discord.Embed(
-                    title="⏰ Interest Not Ready",
-                    description=f"You can claim interest again <t:{int(next_claim)}:R>",
-                    color=discord.Color.orange()
-                )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
-            
-            bank_balance = user_data.get("bank", 0)
-            if bank_balance == 0:
-                await interaction.response.send_message("❌ You need money in your savings to earn interest!", ephemeral=True)
-                return
-            
-            # Compound interest calculation
-            daily_rate = 0.01  # 1% daily
-            days_to_apply = min(int(days_passed), 7)  # Max 7 days of interest
-            final_amount = bank_balance * ((1 + daily_rate) ** days_to_apply)
-            interest_earned = int(final_amount - bank_balance)
-            
-            new_bank_balance = bank_balance + interest_earned
-            database.db.update_user_data(interaction.user.id, {
-                "bank": new_bank_balance,
-                "last_interest": time.time()
-            })
+            # The claim itself is one compare-and-set on last_interest; the lock only spares a losing write
+            async with database.db.user_txn(user_id):
+                user_data = await database.db.get_user_data(user_id)
+                
+                # Claim daily compound interest
+                last_interest = user_data.get("last_interest", time.time())
+                days_passed = (time.time() - last_interest) / 86400
+                
+                if days_passed < 1:
+                    next_claim = last_interest + 86400
+                    embed = discord.Embed(
+                        title="⏰ Interest Not Ready",
+                        description=f"You can claim interest again <t:{int(next_claim)}:R>",
+                        color=discord.Color.orange()
+                    )
+                    await interaction.response.send_message(embed=embed, ephemeral=True)
+                    return
+                
+                bank_balance = user_data.get("bank", 0)
+                if bank_balance == 0:
+                    await interaction.response.send_message("❌ You need money in your savings to earn interest!", ephemeral=True)
+                    return
+                
+                # Compound interest calculation
+                daily_rate = 0.01  # 1% daily
+                days_to_apply = min(int(days_passed), 7)  # Max 7 days of interest
+                final_amount = bank_balance * ((1 + daily_rate) ** days_to_apply)
+                interest_earned = int(final_amount - bank_balance)
+                
+                # Increment, so deposits made meanwhile are kept; a rejected claim leaves last_interest alone
+                new_bank_balance = await database.db.claim_bank_interest(user_id, interest_earned, last_interest, time.time())
+                if new_bank_balance is None:
+                    await interaction.response.send_message("❌ Could not credit your interest (already claimed?), please try again.", ephemeral=True)
+                    return
             
             embed = discord.Embed(
                 title="📈 Compound Interest Claimed!",
@@ -688,8 +693,11 @@ class UnifiedEconomy(commands.Cog):
             return
 
         if action == "deposit":
-            if user_data["coins"] < amount:
-                needed = amount - user_data["coins"]
+            # One guarded increment: the balance check and the move cannot interleave
+            balances = await database.db.move_to_bank(user_id, amount)
+            if balances is None:
+                user_data = await database.db.get_user_data(user_id)
+                needed = max(1, amount - user_data["coins"])
                 embed = discord.Embed(
                     title="💸 Insufficient Funds",
                     description=f"You need `{needed:,}` more coins to make this deposit.",
@@ -698,11 +706,6 @@ class UnifiedEconomy(commands.Cog):
                 await interaction.response.send_message(embed=embed, ephemeral=True)
                 return
             
-            database.db.update_user_data(interaction.user.id, {
-                "coins": user_data["coins"] - amount,
-                "bank": user_data["bank"] + amount
-            })
-            
             embed = discord.Embed(
                 title="🏦 Deposit Successful",
                 description=f"**{interaction.user.display_name}** deposited money into savings!",
@@ -710,28 +713,25 @@ class UnifiedEconomy(commands.Cog):
                 timestamp=datetime.now(datetime.UTC)
             )
             embed.add_field(name="💰 Deposited", value=f"`{amount:,}` coins", inline=True)
-            embed.add_field(name="🏦 New Balance", value=f"`{user_data['bank'] + amount:,}` coins", inline=True)
+            embed.add_field(name="🏦 New Balance", value=f"`{balances['bank']:,}` coins", inline=True)
             
             # Show potential interest
-            daily_interest = (user_data['bank'] + amount) * 0.01
+            daily_interest = balances['bank'] * 0.01
             embed.add_field(name="📈 Daily Interest", value=f"`{daily_interest:.0f}` coins/day", inline=True)
             embed.set_thumbnail(url=interaction.user.display_avatar.url)
-            
+        
         elif action == "withdraw":
-            if user_data["bank"] < amount:
+            balances = await database.db.move_from_bank(user_id, amount)
+            if balances is None:
+                user_data = await database.db.get_user_data(user_id)
                 embed = discord.Embed(
                     title="🏦 Insufficient Savings",
-                    description=f"You only have `{user_data['bank']:,}` coins in savings.",
+                    description=f"You only have `{user_data.get('bank', 0):,}` coins in savings.",
                     color=discord.Color.red()
                 )
                 await interaction.response.send_message(embed=embed, ephemeral=True)
                 return
             
-            database.db.update_user_data(interaction.user.id, {
-                "coins": user_data["coins"] + amount,
-                "bank": user_data["bank"] - amount
-            })
-            
             embed = discord.Embed(
                 title="💸 Withdrawal Successful",
                 description=f"**{interaction.user.display_name}** withdrew money from savings!",
@@ -739,7 +739,7 @@ class UnifiedEconomy(commands.Cog):
                 timestamp=datetime.now(datetime.UTC)
             )
             embed.add_field(name="💰 Withdrawn", value=f"`{amount:,}` coins", inline=True)
-            embed.add_field(name="🏦 Remaining", value=f"`{user_data['bank'] - amount:,}` coins", inline=True)
+            embed.add_field(name="🏦 Remaining", value=f"`{balances['bank']:,}` coins", inline=True)
             embed.set_thumbnail(url=interaction.user.display_avatar.url)
 
         await interaction.response.send_message(embed=embed)
@@ -761,13 +761,12 @@ class UnifiedEconomy(commands.Cog):
         ]
     )
     async def invest(self, interaction: discord.Interaction, investment_type: str, amount: int):
-        user_data = database.db.get_user_data(interaction.user.id)
-        
         if amount < 100:
             await interaction.response.send_message("❌ Minimum investment is 100 coins.", ephemeral=True)
             return
         
-        if user_data["coins"] < amount:
+        # The guarded debit is the balance check
+        if not await database.db.remove_coins(interaction.user.id, amount):
             await interaction.response.send_message("❌ You don't have enough coins to invest.", ephemeral=True)
             return
         
@@ -787,13 +786,10 @@ class UnifiedEconomy(commands.Cog):
         }
         
         # Store investment
-        user_investments = user_data.get("investments", [])
-        user_investments.append(investment_data)
-        
-        database.db.update_user_data(interaction.user.id, {
-            "coins": user_data["coins"] - amount,
-            "investments": user_investments
-        })
+        if await database.db.add_user_item("investments", interaction.user.id, investment_data) is None:
+            await database.db.refund_coins(interaction.user.id, amount)
+            await interaction.response.send_message("❌ Your investment could not be saved; you have been refunded.", ephemeral=True)
+            return
         
         mature_timestamp = int(investment_data["mature_time"])
         
@@ -820,8 +816,7 @@ class UnifiedEconomy(commands.Cog):
 
     @app_commands.command(name="portfolio", description="View and manage your investment portfolio with analytics.")
     async def portfolio(self, interaction: discord.Interaction):
-        user_data = database.db.get_user_data(interaction.user.id)
-        investments = user_data.get("investments", [])
+        investments = await database.db.get_user_items("investments", interaction.user.id)
         
         if not investments:
             embed = discord.Embed(
@@ -5,15 +5,18 @@ Enhanced Discord Bot Database System
 - Implemented data validation
 - Added backup and recovery mechanisms
 - FIXED: Added missing methods for cookies and other functionality
+- Native async storage engine on motor (all I/O methods are awaitable)
 """
 
 import os
+import copy
+import random
+import uuid
 import asyncio
 import time
 import logging
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional
-import json
 import threading
 from contextlib import contextmanager
 
@@ -23,7 +26,7 @@ logger = logging.getLogger(__name__)
 
 # Import dependencies with fallbacks
 try:
-    from pymongo import MongoClient, errors as pymongo_errors
+    from pymongo import ReturnDocument, UpdateOne, ReplaceOne, DeleteOne, errors as pymongo_errors
     from motor.motor_asyncio import AsyncIOMotorClient
     MONGODB_AVAILABLE = True
     logger.info("✅ MongoDB drivers available")
@@ -38,6 +41,19 @@ try:
 except ImportError:
     logger.warning("⚠️ python-dotenv not available")
 
+from storage import LocalJournal, SQLiteStore
+from cache import SharedCache, UserCache
+from locks import UserLockStripes
+from timers import TimerService
+from boosts import BoostEngine
+from leaderboards import MemoryLeaderboardIndex, LeaderboardSnapshot, LeaderboardEngine
+from schema import UserSchema
+from activity import ActivityAccumulator
+from write_behind import WriteBehindQueue
+from dirty import DirtyTracker
+from guild_settings import GuildSettings
+from aggregates import RunningAggregates
+
 class DatabaseError(Exception):
     """Custom database error class"""
     pass
@@ -84,51 +100,167 @@ class DatabaseManager:
         self.mongodb_db = None
         self.users_collection = None
         self.guilds_collection = None
+        self.meta_collection = None
+        self.timers_collection = None
+        self.item_collections = {}
         self.connected_to_mongodb = False
-        self.connection_lock = threading.Lock()
+        self.connection_lock = asyncio.Lock()
         
         # In-memory storage as fallback
         self.memory_users = {}
         self.memory_guilds = {}
+        # Memory-mode user item lists: kind -> user_id -> items
+        self.memory_items = {kind: {} for kind in self.USER_ITEM_KINDS}
+        # Memory-mode timers: timer_id -> record
+        self.memory_timers: Dict[str, Dict[str, Any]] = {}
         self.memory_lock = threading.Lock()
         
+        # Bounded read-through cache of user documents while on MongoDB
+        self.user_cache = UserCache(
+            max_size=int(os.getenv('USER_CACHE_SIZE', 10000)),
+            ttl=float(os.getenv('USER_CACHE_TTL', 300))
+        )
+        
+        # Optional Redis tier shared with other processes (REDIS_URL)
+        self.shared_cache = SharedCache(self)
+        self.user_cache.on_write = lambda user_id: self.shared_cache.invalidate("users", user_id)
+        
+        # Per-user locks for multi-step read-modify-write commands
+        self.user_locks = UserLockStripes(int(os.getenv('USER_LOCK_STRIPES', 256)))
+        
+        # Persistent timers (giveaways, event starts, boost expiry)
+        self.timers = TimerService(self)
+        self.timers.register("boost_expiry", self._expire_temporary_purchase)
+        
+        # Active boosts and their multipliers, kept in memory
+        self.boosts = BoostEngine(self)
+        
         # Data validation
         self.validator = DataValidator()
+        self.schema = UserSchema(self._create_default_user_data)
+        
+        # Per-message XP/activity is batched instead of written per message
+        self.activity = ActivityAccumulator(self)
         
-        # Connection retry settings
-        self.max_retries = 3
-        self.retry_delay = 5
+        # Optional write-behind for update_user_data/update_guild_data
+        self.write_behind = WriteBehindQueue(self)
         
-        # Initialize connection
-        self._initialize_database()
+        # Keyset-paginated leaderboards with cached totals
+        self.leaderboards = LeaderboardEngine(self)
+        self.memory_leaderboards = MemoryLeaderboardIndex(LeaderboardEngine.FIELDS)
+        
+        # Durable store under the memory backend: journal + snapshots, or SQLite
+        self.backend = os.getenv('STORAGE_BACKEND', 'mongodb').lower()
+        self.local_store = SQLiteStore(self) if self.backend == 'sqlite' else LocalJournal(self)
+        
+        # Fields changed in memory mode, reconciled onto MongoDB in the background
+        self.dirty = DirtyTracker(enabled=self.backend != 'sqlite')
+        self.reconcile_task = None
+        self.reconciling: Dict[int, Dict[str, Any]] = {}
+        self.sync_progress: Dict[str, Any] = {"state": "idle"}
+        
+        # guild_id -> GuildSettings, kept current by every guild read/write
+        self.guild_settings: Dict[int, GuildSettings] = {}
+        self.known_guild_ids: set = set()
+        # guild_id -> settings load in flight (first use, or another process's invalidation)
+        self.guild_refreshes: Dict[int, asyncio.Task] = {}
+        # Guilds whose cached settings are still defaults standing in for a first load
+        self.guild_placeholders: set = set()
+        
+        # Running totals so stats never scan the users collection
+        self.aggregates = RunningAggregates()
+        self.memory_aggregates = RunningAggregates()
+        
+        # Expiry sweep metrics (cleanup_expired_data)
+        self.expiry_stats = {"sweeps": 0, "failed_sweeps": 0, "items_removed": 0, "users_modified": 0, "last_sweep": None}
+        
+        # Background connection with exponential backoff (see initialize)
+        self.connect_task = None
+        self.connection_state = "starting"
+        self.connect_attempts = 0
+        self.next_retry_at = None
+        self.retry_initial_delay = float(os.getenv('MONGODB_RETRY_INITIAL', 1))
+        self.retry_max_delay = float(os.getenv('MONGODB_RETRY_MAX', 300))
     
-    def _initialize_database(self):
-        """Initialize database connection with retry mechanism"""
-        for attempt in range(self.max_retries):
-            try:
-                if self._attempt_mongodb_connection():
-                    return
-                    
-                logger.warning(f"MongoDB connection attempt {attempt + 1} failed, retrying in {self.retry_delay}s...")
-                time.sleep(self.retry_delay)
-                
-            except Exception as e:
-                logger.error(f"Critical error during database initialization: {e}")
-                
-        logger.warning("All MongoDB connection attempts failed, using memory storage")
-        self.connected_to_mongodb = False
+    async def initialize(self, wait: bool = False):
+        """Load local state and start connecting to MongoDB in the background (wait=True blocks on the first attempt)"""
+        self.local_store.recover()
+        await self.recompute_aggregates()
+        if self.backend == 'sqlite':
+            self.connection_state = "sqlite"
+            logger.info("🗄️ Using SQLite storage (STORAGE_BACKEND=sqlite)")
+            return
+        
+        self.shared_cache.start()
+        task = self.start_connecting()
+        if wait and task:
+            await asyncio.shield(task)
+    
+    def start_connecting(self) -> Optional[asyncio.Task]:
+        """Start the background connect loop unless it is already running"""
+        if self.backend == 'sqlite' or self.connected_to_mongodb:
+            return None
+        if not MONGODB_AVAILABLE or not os.getenv('MONGODB_URI'):
+            if self.connection_state != "memory":
+                logger.warning("⚠️ MongoDB not configured, using memory storage")
+            self.connection_state = "memory"
+            return None
+        if self.connect_task is None or self.connect_task.done():
+            self.connection_state = "connecting"
+            self.connect_task = asyncio.create_task(self._connect_loop())
+        return self.connect_task
+    
+    async def _connect_loop(self):
+        """Retry the MongoDB connection with capped exponential backoff and jitter"""
+        delay = self.retry_initial_delay
+        while not self.connected_to_mongodb:
+            self.connect_attempts += 1
+            if await self._attempt_mongodb_connection():
+                break
+            self.connection_state = "degraded"
+            # delay stays the un-jittered capped backoff; only this sleep is jittered
+            pause = min(self.retry_max_delay, delay * random.uniform(0.8, 1.2))
+            self.next_retry_at = time.time() + pause
+            logger.warning(f"MongoDB connection attempt {self.connect_attempts} failed, "
+                           f"retrying in {pause:.1f}s (running on memory storage)")
+            await asyncio.sleep(pause)
+            delay = min(self.retry_max_delay, delay * 2)
+        
+        self.next_retry_at = None
+        await self._on_connected()
+    
+    async def _on_connected(self):
+        """Work that needs MongoDB: push outage changes, run migrations"""
+        self.connection_state = "connected"
+        self.start_reconciliation()
+        if self.known_guild_ids:
+            await self.preload_guild_settings(())
+        if self.timers.task is not None:
+            await self.timers.load()
+        if self.boosts.loaded:
+            await self.boosts.load()
+        await self.run_storage_migrations()
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        """Readiness for /health: not ready only while a configured MongoDB is still connecting"""
+        return {
+            "ready": self.connected_to_mongodb or self.connection_state in ("sqlite", "memory"),
+            "state": self.connection_state,
+            "connect_attempts": self.connect_attempts,
+            "next_retry_in": round(max(0.0, self.next_retry_at - time.time()), 1) if self.next_retry_at else None
+        }
     
-    def _attempt_mongodb_connection(self) -> bool:
+    async def _attempt_mongodb_connection(self) -> bool:
         """Attempt to connect to MongoDB"""
         try:
             mongodb_uri = os.getenv('MONGODB_URI')
             
-            if not MONGODB_AVAILABLE or not mongodb_uri:
+            if self.backend == 'sqlite' or not MONGODB_AVAILABLE or not mongodb_uri:
                 return False
             
-            with self.connection_lock:
+            async with self.connection_lock:
                 # Create client with proper settings
-                self.mongodb_client = MongoClient(
+                self.mongodb_client = AsyncIOMotorClient(
                     mongodb_uri,
                     serverSelectionTimeoutMS=10000,
                     connectTimeoutMS=10000,
@@ -139,37 +271,62 @@ class DatabaseManager:
                 )
                 
                 # Test connection
-                self.mongodb_client.admin.command('ping')
+                await self.mongodb_client.admin.command('ping')
                 
                 # Setup database and collections
                 db_name = os.getenv('MONGODB_DATABASE', 'blackops-bot')
                 self.mongodb_db = self.mongodb_client[db_name]
                 self.users_collection = self.mongodb_db.users
                 self.guilds_collection = self.mongodb_db.guilds
+                self.meta_collection = self.mongodb_db.meta
+                self.timers_collection = self.mongodb_db.timers
+                self.item_collections = {kind: self.mongodb_db[kind] for kind in self.USER_ITEM_KINDS}
                 
                 # Create indexes for performance
-                self._create_indexes()
+                await self._create_indexes()
                 
                 self.connected_to_mongodb = True
+                # Baseline for the running totals
+                await self.recompute_aggregates()
                 logger.info("🎯 MongoDB connection established successfully!")
                 return True
                 
         except Exception as e:
             logger.error(f"MongoDB connection failed: {e}")
             self.connected_to_mongodb = False
+            if self.mongodb_client:
+                # Stop the failed client's monitor threads
+                self.mongodb_client.close()
+                self.mongodb_client = None
             return False
     
-    def _create_indexes(self):
+    async def _create_indexes(self):
         """Create database indexes for performance"""
         try:
             # User collection indexes
-            self.users_collection.create_index("user_id", unique=True)
-            self.users_collection.create_index("level")
-            self.users_collection.create_index("coins")
-            self.users_collection.create_index("daily_streak")
+            await self.users_collection.create_index("user_id", unique=True)
+            
+            # User item collections, plus their expiry fields
+            for kind, fields in self.USER_ITEM_KINDS.items():
+                await self.item_collections[kind].create_index([("user_id", 1), ("position", 1)])
+                for field in fields:
+                    await self.item_collections[kind].create_index(field)
+            await self.item_collections["temporary_purchases"].create_index([("user_id", 1), ("item_type", 1)])
+            await self.users_collection.create_index("level")
+            await self.users_collection.create_index("coins")
+            await self.users_collection.create_index("daily_streak")
+            # Expiry sweeps only visit users with something due
+            await self.users_collection.create_index("next_expiry_at", sparse=True)
+            
+            # Leaderboard keyset indexes: score descending, ties by user_id
+            for field in LeaderboardEngine.FIELDS:
+                await self.users_collection.create_index([(field, -1), ("user_id", 1)])
             
             # Guild collection indexes
-            self.guilds_collection.create_index("guild_id", unique=True)
+            await self.guilds_collection.create_index("guild_id", unique=True)
+            
+            # Timers are re-armed and swept by due time
+            await self.timers_collection.create_index("fire_at")
             
             logger.info("📊 Database indexes created successfully")
             
@@ -190,7 +347,25 @@ class DatabaseManager:
             logger.error(f"Unexpected error in {operation_name}: {e}")
             raise DatabaseError(f"Unexpected error in {operation_name}: {str(e)}")
     
-    def health_check(self) -> Dict[str, Any]:
+    def close(self):
+        """Close the MongoDB client"""
+        if self.mongodb_client:
+            self.mongodb_client.close()
+        self.connected_to_mongodb = False
+        self.shared_cache.close()
+        for task in self.guild_refreshes.values():
+            task.cancel()
+        self.timers.close()
+        self.local_store.close()
+    
+    async def flush_pending_writes(self):
+        """Drain batched writes (message activity and write-behind queue)"""
+        await self.activity.flush()
+        if self.connected_to_mongodb:
+            await self.write_behind.flush()
+        await self.local_store.commit()
+    
+    async def health_check(self) -> Dict[str, Any]:
         """Perform comprehensive health check"""
         health_status = {
             "mongodb_connected": False,
@@ -205,93 +380,305 @@ class DatabaseManager:
             if self.connected_to_mongodb and self.mongodb_client:
                 # Test MongoDB connection
                 with self._safe_operation("health_check"):
-                    self.mongodb_client.admin.command('ping')
+                    await self.mongodb_client.admin.command('ping')
                     health_status["mongodb_connected"] = True
-                    health_status["total_users"] = self.users_collection.count_documents({})
-                    health_status["total_guilds"] = self.guilds_collection.count_documents({})
+                    health_status["total_users"] = self.aggregates.values["users"]
+                    health_status["total_guilds"] = self.aggregates.values["guilds"]
         except Exception as e:
             health_status["errors"].append(f"MongoDB: {str(e)}")
             
         if not health_status["mongodb_connected"]:
             health_status["memory_storage"] = True
             with self.memory_lock:
-                health_status["total_users"] = len(self.memory_users)
+                health_status["total_users"] = (
+                    self.memory_aggregates.values["users"] if self.sql_backed else len(self.memory_users)
+                )
                 health_status["total_guilds"] = len(self.memory_guilds)
         
         return health_status
     
-    def get_database_health(self) -> Dict[str, Any]:
+    async def get_database_health(self) -> Dict[str, Any]:
         """Get database health status (compatibility method)"""
-        health = self.health_check()
+        health = await self.health_check()
         return {
             "connected": health["mongodb_connected"],
             "mongodb_connected": health["mongodb_connected"],
+            **self.get_readiness(),
             "errors": health.get("errors", [])
         }
     
-    def reconnect_mongodb(self) -> bool:
-        """Attempt to reconnect to MongoDB"""
+    async def reconnect_mongodb(self) -> bool:
+        """Attempt to reconnect to MongoDB (no-op while the connect loop is retrying)"""
+        if self.connect_task and not self.connect_task.done():
+            return False
         logger.info("Attempting MongoDB reconnection...")
-        if self._attempt_mongodb_connection():
-            # Sync memory data to MongoDB
-            self._sync_memory_to_mongodb()
+        if await self._attempt_mongodb_connection():
+            # Push changes made in memory mode without blocking callers
+            self.start_reconciliation()
+            self.connection_state = "connected"
             return True
+        self.start_connecting()
         return False
     
-    def _sync_memory_to_mongodb(self):
-        """Sync memory data to MongoDB after reconnection"""
+    # Chunk size for reconciliation bulk_writes
+    RECONCILE_CHUNK = 1000
+    # Stand-in last_updated for documents that never recorded one
+    RECONCILE_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    
+    def start_reconciliation(self) -> Optional[asyncio.Task]:
+        """Reconcile memory-mode changes onto MongoDB in the background"""
+        if self.reconcile_task is None or self.reconcile_task.done():
+            self.reconcile_task = asyncio.create_task(self._sync_memory_to_mongodb())
+        return self.reconcile_task
+    
+    async def _sync_memory_to_mongodb(self):
+        """Push dirty memory-mode fields, items and timers to MongoDB in chunked bulk writes"""
         if not self.connected_to_mongodb:
             return
-            
+        
+        with self.memory_lock:
+            users, guilds, items, timers = self.dirty.take()
+        if not (users or guilds or items or timers):
+            return
+        
+        total = len(users) + len(guilds) + len(items) + len(timers)
+        progress = self.sync_progress = {
+            "state": "running",
+            "users": len(users),
+            "guilds": len(guilds),
+            "item_lists": len(items),
+            "timers": len(timers),
+            "done": 0,
+            "conflicts": 0,
+            "failed": 0,
+            "started_at": datetime.now(timezone.utc).isoformat()
+        }
+        logger.info(f"🔄 Reconciling {len(users)} users, {len(guilds)} guilds, "
+                    f"{len(items)} item lists and {len(timers)} timers with MongoDB...")
+        
+        self.reconciling = users
         try:
-            logger.info("Syncing memory data to MongoDB...")
-            
-            # Sync users
+            user_ids = list(users)
+            for start in range(0, len(user_ids), self.RECONCILE_CHUNK):
+                # Users settled by a read in the meantime are already gone
+                chunk = {uid: users.pop(uid) for uid in user_ids[start:start + self.RECONCILE_CHUNK] if uid in users}
+                if chunk and not await self._reconcile_users(chunk):
+                    break
+                logger.info(f"🔄 Reconciled {progress['done']}/{total} "
+                            f"({progress['conflicts']} conflicts, {progress['failed']} failed)")
+            else:
+                if await self._reconcile_guilds(guilds) and await self._reconcile_items(items):
+                    await self._reconcile_timers(timers)
+        finally:
+            self.reconciling = {}
+            # Anything not attempted (connection lost) waits for the next run
+            leftover = len(users) + len(guilds) + len(items) + len(timers)
             with self.memory_lock:
-                for user_id, user_data in self.memory_users.items():
-                    try:
-                        self.users_collection.replace_one(
-                            {"user_id": user_id},
-                            user_data,
-                            upsert=True
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to sync user {user_id}: {e}")
+                self.dirty.requeue_users(users, self.memory_users)
+                self.dirty.requeue_guilds(guilds)
+                self.dirty.requeue_items(items)
+                self.dirty.requeue_timers(timers)
+            progress["failed"] += leftover
+        
+        self.user_cache.clear()
+        self.shared_cache.invalidate("guilds", None)
+        # $set/$max outcomes are decided server-side; recount once
+        await self.recompute_aggregates()
+        progress["state"] = "failed" if progress["failed"] else "done"
+        progress["finished_at"] = datetime.now(timezone.utc).isoformat()
+        
+        # Everything is in MongoDB now; the local store can start afresh
+        if not progress["failed"]:
+            await self.local_store.reset()
+        
+        logger.info(f"🔄 Reconciliation {progress['state']}: {progress['done']}/{total} written, "
+                    f"{progress['conflicts']} conflicts, {progress['failed']} requeued")
+    
+    def _journal_dirty(self, collection: str, keys):
+        """Journal the tracker's entries for keys so a restart skips reconciled changes (caller holds memory_lock)"""
+        entries = getattr(self.dirty, collection)
+        for key in keys:
+            self.local_store.record("dirty", (collection, key), entries.get(key))
+    
+    async def _settle_reconciliation(self, user_id: int):
+        """Reconcile one user ahead of the background pass (before a read)"""
+        entry = self.reconciling.pop(user_id, None)
+        if entry is not None:
+            await self._reconcile_users({user_id: entry})
+    
+    @staticmethod
+    def _as_utc(value: Any) -> Any:
+        """MongoDB hands back naive UTC datetimes"""
+        if isinstance(value, datetime) and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+    
+    def _reconcile_stage(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Pipeline $set applying one user's DirtyTracker entry"""
+        stored_at = {"$ifNull": ["$last_updated", self.RECONCILE_EPOCH]}
+        stage = self._increment_stage(entry["$inc"])
+        for path, value in entry["$max"].items():
+            stage[path] = {"$max": [{"$ifNull": [f"${path}", self._default_user_value(path)]}, value]}
+        for path, (value, at) in entry["$set"].items():
+            # Keep the stored value if the document was written after us
+            stage[path] = {"$cond": [{"$gt": [stored_at, at]}, f"${path}", {"$literal": value}]}
+        stage["last_updated"] = {"$max": [stored_at, entry["at"]]}
+        return stage
+    
+    async def _reconcile_bulk(self, collection, operations: List[Any], keys: List[Any]) -> List[Any]:
+        """Unordered bulk_write; returns the keys of failed operations"""
+        try:
+            await collection.bulk_write(operations, ordered=False)
+            return []
+        except pymongo_errors.BulkWriteError as e:
+            return [keys[error["index"]] for error in e.details.get("writeErrors", [])]
+    
+    async def _stored_last_updated(self, collection, key_field: str, keys: List[int]) -> Dict[int, datetime]:
+        stored = {}
+        async for document in collection.find({key_field: {"$in": keys}}, {"_id": 0, key_field: 1, "last_updated": 1}):
+            stored[document[key_field]] = self._as_utc(document.get("last_updated")) or self.RECONCILE_EPOCH
+        return stored
+    
+    async def _reconcile_users(self, entries: Dict[int, Dict[str, Any]]) -> bool:
+        """Write one chunk of user entries; returns False if MongoDB is unreachable"""
+        progress = self.sync_progress
+        reachable = True
+        try:
+            stored = await self._stored_last_updated(self.users_collection, "user_id", list(entries))
+            operations = []
+            for user_id, entry in entries.items():
+                if user_id in stored and any(stored[user_id] > at for _, at in entry["$set"].values()):
+                    progress["conflicts"] += 1
+                operations.append(UpdateOne({"user_id": user_id}, [{"$set": self._reconcile_stage(entry)}], upsert=True))
+            failed = await self._reconcile_bulk(self.users_collection, operations, list(entries))
+        except Exception as e:
+            logger.error(f"Failed to reconcile {len(entries)} users: {e}")
+            failed, reachable = list(entries), False
+        
+        with self.memory_lock:
+            if failed:
+                self.dirty.requeue_users({uid: entries[uid] for uid in failed}, self.memory_users)
+            self._journal_dirty("users", entries)
+        await self.local_store.commit()
+        progress["done"] += len(entries) - len(failed)
+        progress["failed"] += len(failed)
+        return reachable
+    
+    async def _reconcile_guilds(self, guilds: Dict[int, Dict[str, tuple]]) -> bool:
+        """Write guild entries in chunks, popping them from ``guilds`` as they go"""
+        progress = self.sync_progress
+        guild_ids = list(guilds)
+        for start in range(0, len(guild_ids), self.RECONCILE_CHUNK):
+            entries = {gid: guilds.pop(gid) for gid in guild_ids[start:start + self.RECONCILE_CHUNK]}
+            try:
+                stored = await self._stored_last_updated(self.guilds_collection, "guild_id", list(entries))
+                with self.memory_lock:
+                    documents = {gid: copy.deepcopy(self.memory_guilds.get(gid)) for gid in entries if gid not in stored}
                 
-                # Sync guilds
-                for guild_id, guild_data in self.memory_guilds.items():
-                    try:
-                        self.guilds_collection.replace_one(
-                            {"guild_id": guild_id},
-                            guild_data,
-                            upsert=True
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to sync guild {guild_id}: {e}")
+                operations = []
+                for guild_id, sets in entries.items():
+                    latest = max(at for _, at in sets.values()) if sets else self.RECONCILE_EPOCH
+                    if guild_id not in stored and documents.get(guild_id):
+                        # Not in MongoDB at all: store the whole memory document
+                        operations.append(ReplaceOne({"guild_id": guild_id}, documents[guild_id], upsert=True))
+                        continue
+                    if any(stored[guild_id] > at for _, at in sets.values()):
+                        progress["conflicts"] += 1
+                    stored_at = {"$ifNull": ["$last_updated", self.RECONCILE_EPOCH]}
+                    stage = {
+                        path: {"$cond": [{"$gt": [stored_at, at]}, f"${path}", {"$literal": value}]}
+                        for path, (value, at) in sets.items()
+                    }
+                    stage["last_updated"] = {"$max": [stored_at, latest]}
+                    operations.append(UpdateOne({"guild_id": guild_id}, [{"$set": stage}], upsert=True))
+                failed = await self._reconcile_bulk(self.guilds_collection, operations, list(entries))
+            except Exception as e:
+                logger.error(f"Failed to reconcile {len(entries)} guilds: {e}")
+                guilds.update(entries)
+                return False
             
-            logger.info("Memory data sync completed")
+            with self.memory_lock:
+                if failed:
+                    self.dirty.requeue_guilds({gid: entries[gid] for gid in failed})
+                self._journal_dirty("guilds", entries)
+            await self.local_store.commit()
+            progress["done"] += len(entries) - len(failed)
+            progress["failed"] += len(failed)
+        return True
+    
+    async def _reconcile_items(self, items: Dict[tuple, Dict[str, Any]]) -> bool:
+        """Upsert/delete changed items by _id, one kind at a time"""
+        progress = self.sync_progress
+        for kind in self.USER_ITEM_KINDS:
+            keys = [key for key in items if key[0] == kind]
+            for start in range(0, len(keys), self.RECONCILE_CHUNK):
+                entries = {key: items.pop(key) for key in keys[start:start + self.RECONCILE_CHUNK]}
+                operations, owners = [], []
+                for key, changes in entries.items():
+                    for item_id, document in changes.items():
+                        if document is None:
+                            operations.append(DeleteOne({"_id": item_id}))
+                        else:
+                            operations.append(ReplaceOne({"_id": item_id}, document, upsert=True))
+                        owners.append(key)
+                try:
+                    failed = set(await self._reconcile_bulk(self.item_collections[kind], operations, owners))
+                except Exception as e:
+                    logger.error(f"Failed to reconcile {kind}: {e}")
+                    items.update(entries)
+                    return False
+                
+                with self.memory_lock:
+                    if failed:
+                        self.dirty.requeue_items({key: entries[key] for key in failed})
+                    self._journal_dirty("items", entries)
+                await self.local_store.commit()
+                progress["done"] += len(entries) - len(failed)
+                progress["failed"] += len(failed)
+        return True
+    
+    async def _reconcile_timers(self, timers: Dict[str, Dict[str, Any]]) -> bool:
+        """Upsert/delete timers changed in memory mode by _id"""
+        progress = self.sync_progress
+        timer_ids = list(timers)
+        for start in range(0, len(timer_ids), self.RECONCILE_CHUNK):
+            entries = {timer_id: timers.pop(timer_id) for timer_id in timer_ids[start:start + self.RECONCILE_CHUNK]}
+            operations = [
+                DeleteOne({"_id": timer_id}) if entry["document"] is None
+                else ReplaceOne({"_id": timer_id}, entry["document"], upsert=True)
+                for timer_id, entry in entries.items()
+            ]
+            try:
+                failed = await self._reconcile_bulk(self.timers_collection, operations, list(entries))
+            except Exception as e:
+                logger.error(f"Failed to reconcile timers: {e}")
+                timers.update(entries)
+                return False
             
-        except Exception as e:
-            logger.error(f"Failed to sync memory data: {e}")
+            with self.memory_lock:
+                if failed:
+                    self.dirty.requeue_timers({timer_id: entries[timer_id] for timer_id in failed})
+                self._journal_dirty("timers", entries)
+            await self.local_store.commit()
+            progress["done"] += len(entries) - len(failed)
+            progress["failed"] += len(failed)
+        return True
     
     # ==================== USER DATA OPERATIONS ====================
     
-    def get_user_data(self, user_id: int) -> Dict[str, Any]:
+    async def get_user_data(self, user_id: int) -> Dict[str, Any]:
         """Get user data with enhanced error handling"""
         try:
-            # Try MongoDB first
+            # Try MongoDB first, through the read-through cache
             if self.connected_to_mongodb:
-                with self._safe_operation(f"get_user_data_{user_id}"):
-                    result = self.users_collection.find_one({"user_id": user_id})
-                    if result:
-                        # Remove MongoDB _id field
-                        result.pop("_id", None)
-                        return result
+                document = await self.user_cache.load(user_id, lambda: self._load_user_shared(user_id))
+                return self.schema.expand(document)
             
             # Fallback to memory
             with self.memory_lock:
-                if user_id in self.memory_users:
-                    return self.memory_users[user_id].copy()
+                user_data = self._memory_user(user_id, create=False)
+                if user_data is not None:
+                    return user_data.copy()
             
             # Return default user data
             return self._create_default_user_data(user_id)
@@ -303,8 +690,74 @@ class DatabaseManager:
             logger.error(f"Unexpected error getting user data for {user_id}: {e}")
             return self._create_default_user_data(user_id)
     
-    def update_user_data(self, user_id: int, data: Dict[str, Any]) -> bool:
-        """Update user data with validation and error handling"""
+    async def _load_user_document(self, user_id: int) -> Dict[str, Any]:
+        """Fetch one sparse user document from MongoDB"""
+        await self._settle_reconciliation(user_id)
+        with self._safe_operation(f"get_user_data_{user_id}"):
+            result = await self.users_collection.find_one({"user_id": user_id}, self.USER_PROJECTION)
+        return self.write_behind.overlay("users", user_id, result or {"user_id": user_id})
+    
+    async def _load_user_shared(self, user_id: int) -> Dict[str, Any]:
+        """L1 miss: try the shared Redis copy before MongoDB"""
+        if self.shared_cache.connected:
+            await self._settle_reconciliation(user_id)
+            document = await self.shared_cache.get("users", user_id)
+            if document is not None:
+                return self.write_behind.overlay("users", user_id, document)
+        
+        loaded_seq = self.shared_cache.seq
+        document = await self._load_user_document(user_id)
+        # Only the stored document is shared, never this process's unflushed writes
+        if not self.write_behind.has_pending("users", user_id):
+            await self.shared_cache.put("users", user_id, document, loaded_seq)
+        return document
+    
+    def _on_shared_invalidation(self, collection: str, key: Optional[int]):
+        """Another process changed a document (key None: all of them)"""
+        if collection == "users":
+            if key is None:
+                self.user_cache.clear(notify=False)
+                self.activity.levels.clear()
+            else:
+                self.user_cache.invalidate(key, notify=False)
+                self.activity.forget(key)
+        elif collection == "guilds":
+            guild_ids = list(self.guild_settings) if key is None else [key] if key in self.guild_settings else []
+            for guild_id in guild_ids:
+                self._refresh_guild_settings(guild_id)
+    
+    def _refresh_guild_settings(self, guild_id: int):
+        """Reload a guild's cached settings in the background (one refresh per guild at a time)"""
+        task = self.guild_refreshes.get(guild_id)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self.get_guild_data(guild_id))
+        self.guild_refreshes[guild_id] = task
+        
+        def done(task: asyncio.Task):
+            if self.guild_refreshes.get(guild_id) is task:
+                del self.guild_refreshes[guild_id]
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(f"Error refreshing guild settings for {guild_id}: {task.exception()}")
+            if guild_id in self.guild_placeholders:
+                # The first load failed: drop the defaults so the next lookup retries
+                self.guild_placeholders.discard(guild_id)
+                self.guild_settings.pop(guild_id, None)
+        task.add_done_callback(done)
+    
+    def user_txn(self, *user_ids: int):
+        """Serialise a read-modify-write on one or more users (take every user in a single call)"""
+        # Nesting a call for a user not already held can deadlock against another transaction
+        return self.user_locks.hold(*user_ids)
+    
+    # Fields summed by RunningAggregates
+    AGGREGATE_USER_FIELDS = {"coins", "xp", "level"}
+    
+    # Fields the atomic economy/XP operations write; never deferred
+    WRITE_THROUGH_USER_FIELDS = {"coins", "bank", "cookies", "xp", "level", "economy"}
+    
+    async def update_user_data(self, user_id: int, data: Dict[str, Any], durable: bool = False) -> bool:
+        """Update user data with validation; durable=True bypasses write-behind"""
         try:
             # Validate data
             self.validator.validate_user_data(data, "update")
@@ -312,32 +765,65 @@ class DatabaseManager:
             # Add metadata
             data["last_updated"] = datetime.now(timezone.utc)
             
+            if "xp" in data or "level" in data:
+                self.activity.forget(user_id)
+            
+            if "temporary_roles" in data:
+                # Keeps expiry sweeps index-driven (see cleanup_expired_data)
+                data["next_expiry_at"] = self._next_expiry(data["temporary_roles"])
+            
             # Try MongoDB first
             if self.connected_to_mongodb:
+                write_through = durable or any(
+                    key.split('.')[0] in self.WRITE_THROUGH_USER_FIELDS for key in data
+                )
+                # Only values that differ from the defaults are stored
+                sets, unsets = self.schema.compact_fields(data)
+                
+                if self.write_behind.enabled and not write_through:
+                    self.write_behind.mark_set("users", user_id, data)
+                    self.user_cache.patch(user_id, sets, unsets)
+                    return True
+                
+                await self.write_behind.settle("users", user_id)
                 with self._safe_operation(f"update_user_data_{user_id}"):
-                    update_doc = {}
-                    for key, value in data.items():
-                        # Always set via $set, allowing dot-notation for nested fields
-                        update_doc[key] = value
+                    update_doc = {"$set": sets}
+                    if unsets:
+                        update_doc["$unset"] = {field: "" for field in unsets}
+                    if "coins" not in sets:
+                        update_doc["$setOnInsert"] = {"coins": self.schema.template["coins"]}
                     
-                    result = self.users_collection.update_one(
+                    totals = self.AGGREGATE_USER_FIELDS.intersection(data)
+                    if totals:
+                        # The pre-image keeps the running totals exact
+                        before = await self.users_collection.find_one_and_update(
+                            {"user_id": user_id},
+                            update_doc,
+                            projection={"_id": 0, **{field: 1 for field in totals}},
+                            upsert=True,
+                            return_document=ReturnDocument.BEFORE
+                        )
+                        self.aggregates.user_delta(before, {f: data[f] for f in totals}, self.schema.template["coins"])
+                        self.user_cache.patch(user_id, sets, unsets)
+                        return True
+                    
+                    result = await self.users_collection.update_one(
                         {"user_id": user_id},
-                        {"$set": update_doc},
+                        update_doc,
                         upsert=True
                     )
+                    if result.upserted_id is not None:
+                        self.aggregates.add(users=1)
                     
                     if result.acknowledged:
-                        # Also update memory cache for consistency
-                        with self.memory_lock:
-                            if user_id not in self.memory_users:
-                                self.memory_users[user_id] = self._create_default_user_data(user_id)
-                            self.memory_users[user_id].update(data)
+                        # Keep the cached copy coherent
+                        self.user_cache.patch(user_id, sets, unsets)
                         return True
+                    self.user_cache.invalidate(user_id)
             
             # Fallback to memory storage
             with self.memory_lock:
-                if user_id not in self.memory_users:
-                    self.memory_users[user_id] = self._create_default_user_data(user_id)
+                self._memory_user(user_id)
                 
                 # Handle nested updates
                 for key, value in data.items():
@@ -353,7 +839,10 @@ class DatabaseManager:
                     else:
                         self.memory_users[user_id][key] = value
                 
-                return True
+                self._memory_user_changed(user_id, sets=list(data), at=data["last_updated"])
+            
+            await self.local_store.commit()
+            return True
                 
         except DatabaseError as e:
             logger.error(f"Database validation error updating user {user_id}: {e}")
@@ -375,19 +864,12 @@ class DatabaseManager:
             "work_streak": 0,
             "work_count": 0,
             "last_work": 0,
-            "inventory": {},
-            "achievements": [],
-            "temporary_purchases": [],
             "temporary_roles": [],
-            "reminders": [],
-            "pets": [],
             "stocks": {},
-            "investments": [],
             "loans": [],
             "credit_cards": [],
             "cookies": 0,  # Added this field
             "last_cookie": 0,
-            "warnings": [],
             "mutes": [],
             "bans": [],
             "tickets": [],
@@ -439,83 +921,448 @@ class DatabaseManager:
             "last_updated": datetime.now(timezone.utc)
         }
     
+    # ==================== ATOMIC USER MUTATIONS ====================
+    
+    def _default_user_value(self, field: str) -> Any:
+        """Default value of a (dot-notation) user field"""
+        current = self.schema.template
+        for key in field.split('.'):
+            current = current.get(key, 0) if isinstance(current, dict) else 0
+        return current
+    
+    @property
+    def sql_backed(self) -> bool:
+        """SQLite serves user lookups, rankings and totals; memory_users holds only users touched since start"""
+        return self.backend == 'sqlite' and self.local_store.enabled
+    
+    def _memory_user(self, user_id: int, create: bool = True) -> Optional[Dict[str, Any]]:
+        """Memory-mode document, loaded from SQLite on first use (caller holds memory_lock)"""
+        user_data = self.memory_users.get(user_id)
+        if user_data is None and self.sql_backed:
+            user_data = self.local_store.load_user(user_id)
+            if user_data is not None:
+                self.memory_users[user_id] = user_data
+                self.memory_aggregates.seen(user_id, user_data)
+        if user_data is None and create:
+            user_data = self.memory_users[user_id] = self._create_default_user_data(user_id)
+        return user_data
+    
+    def _memory_user_changed(self, user_id: int, sets=(), incs: Optional[Dict[str, int]] = None,
+                             maxes: Optional[Dict[str, Any]] = None, at: Optional[datetime] = None):
+        """Index, journal and dirty-track a memory-mode user write (caller holds memory_lock)"""
+        user_data = self.memory_users[user_id]
+        if not self.sql_backed:
+            self.memory_leaderboards.update(user_id, user_data)
+        self.memory_aggregates.observe(user_id, user_data)
+        self.local_store.record("users", user_id, user_data)
+        entry = self.dirty.mark_user(user_id, user_data, sets, incs, maxes, at)
+        if entry is not None:
+            self.local_store.record("dirty", ("users", user_id), entry)
+    
+    def _memory_items_changed(self, kind: str, user_id: int, changed=(), removed=()):
+        """Journal and dirty-track a memory-mode item list write (caller holds memory_lock)"""
+        documents = self.memory_items[kind].get(user_id, [])
+        self.local_store.record("items", (kind, user_id), documents)
+        entry = self.dirty.mark_items(kind, user_id, {d["_id"]: d for d in documents}, changed, removed)
+        if entry is not None:
+            self.local_store.record("dirty", ("items", (kind, user_id)), entry)
+    
+    def _memory_get_path(self, document: Dict[str, Any], field: str) -> Any:
+        """Read a dot-notation field from a memory document"""
+        current = document
+        for key in field.split('.'):
+            if not isinstance(current, dict) or key not in current:
+                return self._default_user_value(field)
+            current = current[key]
+        return current
+    
+    def _memory_set_path(self, document: Dict[str, Any], field: str, value: Any):
+        """Write a dot-notation field into a memory document"""
+        keys = field.split('.')
+        current = document
+        for k in keys[:-1]:
+            if k not in current:
+                current[k] = {}
+            current = current[k]
+        current[keys[-1]] = value
+    
+    def _increment_stage(self, increments: Dict[str, int]) -> Dict[str, Any]:
+        """$set stage adding deltas to fields, starting absent ones at their default"""
+        stage = {
+            field: {"$add": [{"$ifNull": [f"${field}", self._default_user_value(field)]}, delta]}
+            for field, delta in increments.items()
+        }
+        # Sparse documents still always store coins (see UserSchema)
+        stage.setdefault("coins", {"$ifNull": ["$coins", self._default_user_value("coins")]})
+        return stage
+    
+    async def apply_activity_batch(self, batch: Dict[int, Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Apply accumulated message activity; returns the users that were not applied"""
+        now = datetime.now(timezone.utc)
+        
+        if self.connected_to_mongodb:
+            user_ids = list(batch)
+            operations = []
+            for user_id in user_ids:
+                deltas = batch[user_id]
+                increments = {"xp": deltas["xp"], "stats.messages_sent": deltas["messages"]}
+                if deltas["coins"]:
+                    increments["coins"] = deltas["coins"]
+                stage = self._increment_stage(increments)
+                stage["last_seen"] = {"$max": ["$last_seen", deltas["last_seen"]]}
+                stage["stats.last_message"] = {"$max": ["$stats.last_message", deltas["last_message"]]}
+                stage["last_updated"] = now
+                if deltas["level"]:
+                    stage["level"] = {"$max": [{"$ifNull": ["$level", 1]}, deltas["level"]]}
+                operations.append(UpdateOne({"user_id": user_id}, [{"$set": stage}], upsert=True))
+            
+            unapplied: Dict[int, Dict[str, Any]] = {}
+            for start in range(0, len(operations), self.BULK_CHUNK):
+                chunk_ids = user_ids[start:start + self.BULK_CHUNK]
+                try:
+                    result = await self.users_collection.bulk_write(
+                        operations[start:start + self.BULK_CHUNK], ordered=False
+                    )
+                    self.aggregates.add(users=result.upserted_count)
+                except pymongo_errors.BulkWriteError as e:
+                    # Unordered: every operation except the reported ones was applied
+                    self.aggregates.add(users=e.details.get("nUpserted", 0))
+                    for error in e.details.get("writeErrors", []):
+                        user_id = chunk_ids[error["index"]]
+                        unapplied[user_id] = batch[user_id]
+                    logger.error(f"Activity flush: {len(e.details.get('writeErrors', []))} updates failed: {e}")
+                except Exception as e:
+                    # Nothing from this chunk on is known to have been applied
+                    for user_id in user_ids[start:]:
+                        unapplied[user_id] = batch[user_id]
+                    logger.error(f"Activity flush stopped with {len(user_ids) - start} users left: {e}")
+                    break
+            
+            applied = {user_id: deltas for user_id, deltas in batch.items() if user_id not in unapplied}
+            self.aggregates.add(
+                total_xp=sum(deltas["xp"] for deltas in applied.values()),
+                total_coins=sum(deltas["coins"] for deltas in applied.values()),
+                level_sum=sum(deltas.get("levels", 0) for deltas in applied.values())
+            )
+            
+            # Apply the same deltas to cached copies
+            for user_id, deltas in applied.items():
+                self.user_cache.apply(user_id, lambda document: self._apply_activity_deltas(document, deltas, now))
+            return unapplied
+        
+        with self.memory_lock:
+            for user_id, deltas in batch.items():
+                self._apply_activity_deltas(self._memory_user(user_id), deltas, now)
+                maxes = {"last_seen": deltas["last_seen"], "stats.last_message": deltas["last_message"]}
+                if deltas["level"]:
+                    maxes["level"] = deltas["level"]
+                self._memory_user_changed(
+                    user_id,
+                    incs={"xp": deltas["xp"], "stats.messages_sent": deltas["messages"], "coins": deltas["coins"]},
+                    maxes=maxes,
+                    at=now
+                )
+        await self.local_store.commit()
+        return {}
+    
+    def _apply_activity_deltas(self, user_data: Dict[str, Any], deltas: Dict[str, Any], now: datetime):
+        """Apply one user's accumulated activity to an in-memory document"""
+        user_data["xp"] = user_data.get("xp", 0) + deltas["xp"]
+        user_data["coins"] = user_data.get("coins", self._default_user_value("coins")) + deltas["coins"]
+        if deltas["level"]:
+            user_data["level"] = max(user_data.get("level", 1), deltas["level"])
+        stats = user_data.setdefault("stats", {})
+        stats["messages_sent"] = stats.get("messages_sent", 0) + deltas["messages"]
+        stats["last_message"] = max(stats.get("last_message", 0), deltas["last_message"])
+        user_data["last_seen"] = max(user_data.get("last_seen", deltas["last_seen"]), deltas["last_seen"])
+        user_data["last_updated"] = now
+    
+    async def _atomic_increment(self, user_id: int, increments: Dict[str, int],
+                                guard: Optional[tuple] = None, durable: bool = True,
+                                sets: Optional[Dict[str, Any]] = None,
+                                expect: Optional[tuple] = None) -> Optional[Dict[str, Any]]:
+        """Apply counter increments (and ``sets``) in one round-trip; returns updated fields, or None when ``guard`` or ``expect`` rejects it"""
+        now = datetime.now(timezone.utc)
+        sets = sets or {}
+        
+        if self.connected_to_mongodb and self.write_behind.enabled and not durable and not (guard or expect or sets):
+            self.write_behind.mark_inc("users", user_id, increments)
+            self.write_behind.mark_set("users", user_id, {"last_updated": now})
+            
+            def add_deltas(document):
+                for field, delta in increments.items():
+                    self._memory_set_path(document, field, self._memory_get_path(document, field) + delta)
+            self.user_cache.apply(user_id, add_deltas)
+            self.aggregates.add(total_coins=increments.get("coins", 0), total_xp=increments.get("xp", 0))
+            return dict(increments)
+        
+        if self.connected_to_mongodb:
+            await self.write_behind.settle("users", user_id)
+            with self._safe_operation(f"atomic_increment_{user_id}"):
+                stage = self._increment_stage(increments)
+                stage.update(sets)
+                stage["last_updated"] = now
+                
+                query = {"user_id": user_id}
+                upsert = True
+                if expect:
+                    # Compare-and-set: only the document still holding the value that was read
+                    query[expect[0]] = expect[1]
+                    upsert = False
+                if guard:
+                    field, minimum = guard
+                    if self._default_user_value(field) >= minimum:
+                        # An absent field still holds its default balance
+                        query["$or"] = [{field: {"$gte": minimum}}, {field: {"$exists": False}}]
+                    else:
+                        query[field] = {"$gte": minimum}
+                        upsert = False
+                
+                try:
+                    before = await self.users_collection.find_one_and_update(
+                        query,
+                        [{"$set": stage}],
+                        projection={"_id": 0, **{field: 1 for field in increments}},
+                        upsert=upsert,
+                        return_document=ReturnDocument.BEFORE
+                    )
+                except pymongo_errors.DuplicateKeyError:
+                    # Guard failed on an existing document and the upsert collided
+                    return None
+                
+                if before is None and not upsert:
+                    return None
+                
+                # No pre-image on an upsert: the document started from defaults
+                updated = {
+                    field: self._memory_get_path(before or {}, field) + delta
+                    for field, delta in increments.items()
+                }
+                updated.update(sets)
+                self.aggregates.add(
+                    users=1 if before is None else 0,
+                    total_coins=increments.get("coins", 0),
+                    total_xp=increments.get("xp", 0)
+                )
+                updated["last_updated"] = now
+                self.user_cache.patch(user_id, updated)
+                return updated
+        
+        # Memory storage: the lock makes the check-and-apply atomic
+        with self.memory_lock:
+            user_data = self._memory_user(user_id)
+            
+            if guard:
+                field, minimum = guard
+                if self._memory_get_path(user_data, field) < minimum:
+                    return None
+            if expect and self._memory_get_path(user_data, expect[0]) != expect[1]:
+                return None
+            
+            updated = {}
+            for field, delta in increments.items():
+                updated[field] = self._memory_get_path(user_data, field) + delta
+                self._memory_set_path(user_data, field, updated[field])
+            for field, value in sets.items():
+                self._memory_set_path(user_data, field, value)
+            updated.update(sets)
+            user_data["last_updated"] = now
+            updated["last_updated"] = now
+            self._memory_user_changed(user_id, sets=list(sets), incs=increments, at=now)
+        
+        await self.local_store.commit()
+        return updated
+    
     # ==================== ENHANCED ECONOMY OPERATIONS ====================
     
-    def add_coins(self, user_id: int, amount: int) -> bool:
-        """Add coins with transaction safety"""
+    async def add_coins(self, user_id: int, amount: int, durable: bool = True) -> bool:
+        """Add coins atomically in a single round-trip (durable=False may use write-behind)"""
         if amount <= 0:
             return False
             
         try:
-            user_data = self.get_user_data(user_id)
-            new_balance = user_data.get("coins", 0) + amount
-            total_earned = user_data.get("economy", {}).get("total_earned", 0) + amount
-            
-            return self.update_user_data(user_id, {
-                "coins": new_balance,
-                "economy.total_earned": total_earned
-            })
+            result = await self._atomic_increment(user_id, {
+                "coins": amount,
+                "economy.total_earned": amount
+            }, durable=durable)
+            return result is not None
             
         except Exception as e:
             logger.error(f"Error adding coins for user {user_id}: {e}")
             return False
     
-    def remove_coins(self, user_id: int, amount: int) -> bool:
-        """Remove coins with sufficient balance check"""
+    async def refund_coins(self, user_id: int, amount: int) -> bool:
+        """Give back coins already counted by remove_coins; economy totals are left untouched"""
         if amount <= 0:
             return False
             
         try:
-            user_data = self.get_user_data(user_id)
-            current_balance = user_data.get("coins", 0)
+            return await self._atomic_increment(user_id, {"coins": amount}) is not None
             
-            if current_balance < amount:
-                return False
-            
-            new_balance = current_balance - amount
-            total_spent = user_data.get("economy", {}).get("total_spent", 0) + amount
+        except Exception as e:
+            logger.error(f"Error refunding coins for user {user_id}: {e}")
+            return False
+    
+    async def remove_coins(self, user_id: int, amount: int) -> bool:
+        """Remove coins atomically, only if the balance covers the amount"""
+        return await self.spend_coins(user_id, amount) is not None
+    
+    async def spend_coins(self, user_id: int, amount: int) -> Optional[int]:
+        """remove_coins returning the balance left, or None if it did not cover the amount"""
+        if amount <= 0:
+            return None
             
-            return self.update_user_data(user_id, {
-                "coins": new_balance,
-                "economy.total_spent": total_spent
-            })
+        try:
+            result = await self._atomic_increment(user_id, {
+                "coins": -amount,
+                "economy.total_spent": amount
+            }, guard=("coins", amount))
+            return None if result is None else result["coins"]
             
         except Exception as e:
             logger.error(f"Error removing coins for user {user_id}: {e}")
-            return False
+            return None
+    
+    async def move_to_bank(self, user_id: int, amount: int) -> Optional[Dict[str, Any]]:
+        """Deposit coins into savings atomically; returns the new coins/bank, or None if short"""
+        if amount <= 0:
+            return None
+        try:
+            return await self._atomic_increment(user_id, {"coins": -amount, "bank": amount}, guard=("coins", amount))
+        except Exception as e:
+            logger.error(f"Error depositing coins for user {user_id}: {e}")
+            return None
+    
+    async def move_from_bank(self, user_id: int, amount: int) -> Optional[Dict[str, Any]]:
+        """Withdraw savings atomically; returns the new coins/bank, or None if short"""
+        if amount <= 0:
+            return None
+        try:
+            return await self._atomic_increment(user_id, {"coins": amount, "bank": -amount}, guard=("bank", amount))
+        except Exception as e:
+            logger.error(f"Error withdrawing coins for user {user_id}: {e}")
+            return None
+    
+    async def claim_bank_interest(self, user_id: int, amount: int, last_interest: float,
+                                  claimed_at: float) -> Optional[int]:
+        """Credit interest and move last_interest in one write, only if last_interest is still the value read"""
+        try:
+            result = await self._atomic_increment(
+                user_id, {"bank": amount},
+                sets={"last_interest": claimed_at},
+                expect=("last_interest", last_interest)
+            )
+            return None if result is None else result["bank"]
+        except Exception as e:
+            logger.error(f"Error claiming interest for user {user_id}: {e}")
+            return None
+    
+    # Users per bulk_write (and per memory-lock hold) in bulk_inc_field
+    BULK_CHUNK = 1000
+    
+    async def bulk_inc_field(self, user_ids, field: str, delta: int, floor: Optional[int] = 0,
+                             progress=None) -> Dict[str, Any]:
+        """Add ``delta`` to one counter for many users in chunks, clamped at ``floor``"""
+        user_ids = list(dict.fromkeys(user_ids))
+        default = self._default_user_value(field)
+        fresh_value = default + delta if floor is None else max(floor, default + delta)
+        upsert = fresh_value != default
+        now = datetime.now(timezone.utc)
+        result = {"users": len(user_ids), "modified": 0, "upserted": 0, "failed": 0, "chunks": 0}
+        
+        value = {"$add": [{"$ifNull": [f"${field}", default]}, delta]}
+        stage = {field: value if floor is None else {"$max": [floor, value]}, "last_updated": now}
+        stage.setdefault("coins", {"$ifNull": ["$coins", self._default_user_value("coins")]})
+        
+        for start in range(0, len(user_ids), self.BULK_CHUNK):
+            chunk = user_ids[start:start + self.BULK_CHUNK]
+            try:
+                if self.connected_to_mongodb:
+                    pending = [("users", user_id) for user_id in chunk if self.write_behind.has_pending("users", user_id)]
+                    if pending:
+                        await self.write_behind.flush(only=pending)
+                    operations = [UpdateOne({"user_id": user_id}, [{"$set": stage}], upsert=upsert) for user_id in chunk]
+                    try:
+                        written = await self.users_collection.bulk_write(operations, ordered=False)
+                        result["modified"] += written.modified_count
+                        result["upserted"] += written.upserted_count
+                    except pymongo_errors.BulkWriteError as e:
+                        result["modified"] += e.details.get("nModified", 0)
+                        result["upserted"] += e.details.get("nUpserted", 0)
+                        result["failed"] += len(e.details.get("writeErrors", []))
+                        logger.error(f"bulk_inc_field({field}): {len(e.details.get('writeErrors', []))} writes failed")
+                    for user_id in chunk:
+                        self.user_cache.invalidate(user_id)
+                else:
+                    with self.memory_lock:
+                        for user_id in chunk:
+                            user_data = self._memory_user(user_id, create=False)
+                            if user_data is None:
+                                if not upsert:
+                                    continue
+                                user_data = self._memory_user(user_id)
+                                result["upserted"] += 1
+                            current = self._memory_get_path(user_data, field)
+                            updated = current + delta if floor is None else max(floor, current + delta)
+                            if updated == current:
+                                continue
+                            self._memory_set_path(user_data, field, updated)
+                            user_data["last_updated"] = now
+                            result["modified"] += 1
+                            if floor is None:
+                                self._memory_user_changed(user_id, incs={field: delta}, at=now)
+                            else:
+                                self._memory_user_changed(user_id, sets=[field], at=now)
+                    await self.local_store.commit()
+                    # Let other events run between chunks
+                    await asyncio.sleep(0)
+            except Exception as e:
+                logger.error(f"bulk_inc_field({field}) chunk of {len(chunk)} users failed: {e}")
+                result["failed"] += len(chunk)
+            
+            result["chunks"] += 1
+            if progress is not None:
+                await progress(min(start + len(chunk), len(user_ids)), len(user_ids))
+        
+        if self.connected_to_mongodb:
+            if field in ("xp", "level"):
+                for user_id in user_ids:
+                    self.activity.forget(user_id)
+            if field.split('.')[0] in self.AGGREGATE_USER_FIELDS:
+                # Clamped deltas are not known client-side; recount once
+                await self.recompute_aggregates()
+            else:
+                self.aggregates.add(users=result["upserted"])
+        if field in LeaderboardEngine.FIELDS:
+            self.leaderboards.invalidate(field)
+        
+        logger.info(f"🍪 bulk_inc_field({field}, {delta:+}): {result['modified']} modified, "
+                    f"{result['upserted']} created, {result['failed']} failed across {result['chunks']} chunks")
+        return result
     
     # ==================== COOKIES SYSTEM (MISSING METHODS) ====================
     
-    def add_cookies(self, user_id: int, amount: int) -> bool:
-        """Add cookies to user - FIXED: This method was missing"""
+    async def add_cookies(self, user_id: int, amount: int, durable: bool = True) -> bool:
+        """Add cookies to user atomically"""
         if amount <= 0:
             return False
             
         try:
-            user_data = self.get_user_data(user_id)
-            current_cookies = user_data.get("cookies", 0)
-            new_cookies = current_cookies + amount
-            
-            return self.update_user_data(user_id, {"cookies": new_cookies})
+            result = await self._atomic_increment(user_id, {"cookies": amount}, durable=durable)
+            return result is not None
             
         except Exception as e:
             logger.error(f"Error adding cookies for user {user_id}: {e}")
             return False
     
-    def remove_cookies(self, user_id: int, amount: int) -> bool:
-        """Remove cookies from user"""
+    async def remove_cookies(self, user_id: int, amount: int) -> bool:
+        """Remove cookies from user atomically, only if they have enough"""
         if amount <= 0:
             return False
             
         try:
-            user_data = self.get_user_data(user_id)
-            current_cookies = user_data.get("cookies", 0)
-            
-            if current_cookies < amount:
-                return False
-            
-            new_cookies = current_cookies - amount
-            return self.update_user_data(user_id, {"cookies": new_cookies})
+            result = await self._atomic_increment(user_id, {"cookies": -amount}, guard=("cookies", amount))
+            return result is not None
             
         except Exception as e:
             logger.error(f"Error removing cookies for user {user_id}: {e}")
@@ -523,121 +1370,343 @@ class DatabaseManager:
     
     # ==================== WARNING SYSTEM (MISSING METHODS) ====================
     
-    def add_warning(self, user_id: int, warning_data: dict) -> bool:
+    async def add_warning(self, user_id: int, warning_data: dict) -> bool:
         """Add warning to user"""
+        return await self.add_user_item("warnings", user_id, warning_data) is not None
+    
+    async def get_warnings(self, user_id: int) -> List[Dict[str, Any]]:
+        """Get warnings for user (each carries its ``_id``)"""
+        return await self.get_user_items("warnings", user_id)
+    
+    async def remove_warning(self, user_id: int, warning_id: str) -> bool:
+        """Remove one warning by its ``_id``"""
+        return await self.remove_user_items("warnings", user_id, [warning_id]) > 0
+    
+    # ==================== TIMERS ====================
+    
+    def _memory_timer_changed(self, timer_id: str):
+        """Journal and dirty-track a memory-mode timer write (caller holds memory_lock)"""
+        document = self.memory_timers.get(timer_id)
+        self.local_store.record("timers", timer_id, document)
+        entry = self.dirty.mark_timer(timer_id, document)
+        if entry is not None:
+            self.local_store.record("dirty", ("timers", timer_id), entry)
+    
+    async def save_timer(self, record: Dict[str, Any]) -> bool:
+        """Insert or replace a timer record by its ``_id``"""
         try:
-            user_data = self.get_user_data(user_id)
-            warnings = user_data.get("warnings", [])
-            warnings.append(warning_data)
+            if self.connected_to_mongodb:
+                with self._safe_operation(f"save_timer_{record['_id']}"):
+                    result = await self.timers_collection.replace_one({"_id": record["_id"]}, record, upsert=True)
+                    return result.acknowledged
             
-            return self.update_user_data(user_id, {"warnings": warnings})
+            with self.memory_lock:
+                self.memory_timers[record["_id"]] = copy.deepcopy(record)
+                self._memory_timer_changed(record["_id"])
+            return await self.local_store.commit()
             
         except Exception as e:
-            logger.error(f"Error adding warning for user {user_id}: {e}")
+            logger.error(f"Error saving timer {record.get('_id')}: {e}")
             return False
     
-    def get_warnings(self, user_id: int) -> List[Dict[str, Any]]:
-        """Get warnings for user"""
+    async def delete_timer(self, timer_id: str) -> bool:
+        """Delete a timer record; returns whether one was removed"""
         try:
-            user_data = self.get_user_data(user_id)
-            return user_data.get("warnings", [])
+            if self.connected_to_mongodb:
+                with self._safe_operation(f"delete_timer_{timer_id}"):
+                    result = await self.timers_collection.delete_one({"_id": timer_id})
+                    return result.deleted_count > 0
+            
+            with self.memory_lock:
+                removed = self.memory_timers.pop(timer_id, None) is not None
+                if removed:
+                    self._memory_timer_changed(timer_id)
+            await self.local_store.commit()
+            return removed
+            
+        except Exception as e:
+            logger.error(f"Error deleting timer {timer_id}: {e}")
+            return False
+    
+    async def load_timers(self) -> List[Dict[str, Any]]:
+        """Every stored timer, soonest first"""
+        try:
+            if self.connected_to_mongodb:
+                with self._safe_operation("load_timers"):
+                    return await self.timers_collection.find().sort("fire_at", 1).to_list(length=None)
+            
+            with self.memory_lock:
+                records = copy.deepcopy(list(self.memory_timers.values()))
+            return sorted(records, key=lambda record: record["fire_at"])
+            
         except Exception as e:
-            logger.error(f"Error getting warnings for user {user_id}: {e}")
+            logger.error(f"Error loading timers: {e}")
             return []
     
-    # ==================== LEADERBOARD METHODS (MISSING) ====================
+    # ==================== USER ITEM COLLECTIONS ====================
+    
+    # Per-user lists stored one document per item in their own collection,
+    # mapped to the fields (besides user_id/position) they are indexed on
+    USER_ITEM_KINDS = {
+        "pets": [],
+        "warnings": [],
+        "reminders": ["remind_at"],
+        "investments": [],
+        "temporary_purchases": ["expires_at"],
+        "inventory": [],
+        "achievements": []
+    }
+    # Kinds whose items are plain values rather than dicts
+    SCALAR_ITEM_KINDS = {"achievements"}
+    # User reads never load (not yet migrated) embedded item lists
+    USER_PROJECTION = {"_id": 0, **{kind: 0 for kind in USER_ITEM_KINDS}}
+    
+    def _encode_item(self, kind: str, user_id: int, item: Any, position: int) -> Dict[str, Any]:
+        """Stored document for one item"""
+        document = {"value": item} if kind in self.SCALAR_ITEM_KINDS else dict(item)
+        document.setdefault("_id", uuid.uuid4().hex)
+        document["user_id"] = user_id
+        document["position"] = position
+        return document
+    
+    def _decode_items(self, kind: str, documents: List[Dict[str, Any]]) -> List[Any]:
+        if kind in self.SCALAR_ITEM_KINDS:
+            return [document["value"] for document in documents]
+        for document in documents:
+            document.pop("user_id", None)
+            document.pop("position", None)
+        return documents
     
-    def get_streak_leaderboard(self, page: int = 1, members_per_page: int = 10) -> Dict[str, Any]:
-        """Get leaderboard for daily streaks - FIXED: This method was missing"""
+    async def get_user_items(self, kind: str, user_id: int, query: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Get a user's items of one kind in insertion order, optionally filtered by ``query``"""
         try:
             if self.connected_to_mongodb:
-                with self._safe_operation(f"streak_leaderboard_{page}"):
-                    skip = (page - 1) * members_per_page
-                    
-                    # Get total count
-                    total_users = self.users_collection.count_documents(
-                        {"daily_streak": {"$gt": 0}}
-                    )
-                    total_pages = max(1, (total_users + members_per_page - 1) // members_per_page)
-                    
-                    # Get paginated results
-                    pipeline = [
-                        {"$match": {"daily_streak": {"$gt": 0}}},
-                        {"$sort": {"daily_streak": -1}},
-                        {"$skip": skip},
-                        {"$limit": members_per_page},
-                        {"$project": {"_id": 0}}
-                    ]
-                    
-                    cursor = self.users_collection.aggregate(pipeline)
-                    users = list(cursor)
-                    
-                    return {
-                        'users': users,
-                        'total_pages': total_pages,
-                        'total_users': total_users,
-                        'current_page': page,
-                        'members_per_page': members_per_page
-                    }
+                with self._safe_operation(f"get_{kind}_{user_id}"):
+                    cursor = self.item_collections[kind].find({"user_id": user_id, **(query or {})}).sort("position", 1)
+                    return self._decode_items(kind, await cursor.to_list(length=None))
+            
+            with self.memory_lock:
+                documents = copy.deepcopy(self.memory_items[kind].get(user_id, []))
+            if query:
+                documents = [d for d in documents if all(self._matches(d.get(k), v) for k, v in query.items())]
+            return self._decode_items(kind, documents)
+            
+        except Exception as e:
+            logger.error(f"Error getting {kind} for user {user_id}: {e}")
+            return []
+    
+    @staticmethod
+    def _matches(value: Any, condition: Any) -> bool:
+        """Minimal query matching for memory mode ($gt/$lt/$lte or equality)"""
+        if not isinstance(condition, dict):
+            return value == condition
+        operators = {"$gt": lambda a, b: a > b, "$lt": lambda a, b: a < b, "$lte": lambda a, b: a <= b}
+        return value is not None and all(operators[op](value, bound) for op, bound in condition.items())
+    
+    async def add_user_item(self, kind: str, user_id: int, item: Any) -> Optional[str]:
+        """Append an item; returns its ``_id``"""
+        try:
+            document = self._encode_item(kind, user_id, item, time.time_ns())
+            if self.connected_to_mongodb:
+                with self._safe_operation(f"add_{kind}_{user_id}"):
+                    await self.item_collections[kind].insert_one(document)
             else:
                 with self.memory_lock:
-                    users = [user for user in self.memory_users.values() if user.get("daily_streak", 0) > 0]
-                    users.sort(key=lambda x: x.get("daily_streak", 0), reverse=True)
-                    
-                    total_users = len(users)
-                    total_pages = max(1, (total_users + members_per_page - 1) // members_per_page)
-                    
-                    start_idx = (page - 1) * members_per_page
-                    end_idx = start_idx + members_per_page
-                    paginated_users = users[start_idx:end_idx]
-                    
-                    return {
-                        'users': paginated_users,
-                        'total_pages': total_pages,
-                        'total_users': total_users,
-                        'current_page': page,
-                        'members_per_page': members_per_page
-                    }
-                    
+                    self.memory_items[kind].setdefault(user_id, []).append(document)
+                    self._memory_items_changed(kind, user_id, changed=[document["_id"]])
+                await self.local_store.commit()
+            return document["_id"]
+            
         except Exception as e:
-            logger.error(f"Error getting streak leaderboard: {e}")
-            return {
-                'users': [],
-                'total_pages': 1,
-                'total_users': 0,
-                'current_page': page,
-                'members_per_page': members_per_page
-            }
+            logger.error(f"Error adding {kind} for user {user_id}: {e}")
+            return None
     
-    def add_xp(self, user_id: int, amount: int) -> Dict[str, Any]:
-        """Add XP and handle level ups with a harder progression curve"""
+    async def save_user_item(self, kind: str, user_id: int, item: Dict[str, Any]) -> bool:
+        """Write back a modified item previously read with get_user_items"""
         try:
-            user_data = self.get_user_data(user_id)
-            old_level = user_data.get("level", 1)
-            old_xp = user_data.get("xp", 0)
-            new_xp = old_xp + amount
-            # Ensure XP does not go below zero
-            if new_xp < 0:
-                new_xp = 0
-            new_level = self._calculate_level(new_xp)
+            fields = {k: v for k, v in item.items() if k != "_id"}
+            if self.connected_to_mongodb:
+                with self._safe_operation(f"save_{kind}_{user_id}"):
+                    result = await self.item_collections[kind].update_one(
+                        {"_id": item["_id"], "user_id": user_id}, {"$set": fields}
+                    )
+                    return result.matched_count > 0
             
-            update_data = {
-                "xp": new_xp,
-                "level": new_level
-            }
+            with self.memory_lock:
+                document = next((d for d in self.memory_items[kind].get(user_id, []) if d["_id"] == item["_id"]), None)
+                if document is None:
+                    return False
+                document.update(copy.deepcopy(fields))
+                self._memory_items_changed(kind, user_id, changed=[item["_id"]])
+            return await self.local_store.commit()
+            
+        except Exception as e:
+            logger.error(f"Error saving {kind} for user {user_id}: {e}")
+            return False
+    
+    async def remove_user_items(self, kind: str, user_id: int, item_ids: List[str]) -> int:
+        """Remove items by ``_id``; returns how many were removed"""
+        try:
+            if self.connected_to_mongodb:
+                with self._safe_operation(f"remove_{kind}_{user_id}"):
+                    result = await self.item_collections[kind].delete_many(
+                        {"user_id": user_id, "_id": {"$in": list(item_ids)}}
+                    )
+                    return result.deleted_count
+            
+            with self.memory_lock:
+                documents = self.memory_items[kind].get(user_id, [])
+                remaining = [d for d in documents if d["_id"] not in item_ids]
+                self.memory_items[kind][user_id] = remaining
+                self._memory_items_changed(kind, user_id, removed=[d["_id"] for d in documents if d["_id"] in item_ids])
+            await self.local_store.commit()
+            return len(documents) - len(remaining)
+            
+        except Exception as e:
+            logger.error(f"Error removing {kind} for user {user_id}: {e}")
+            return 0
+    
+    async def find_items(self, kind: str, query: Optional[Dict[str, Any]] = None,
+                         sort_field: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Dict items of one kind across all users, each keeping its ``user_id``"""
+        try:
+            if self.connected_to_mongodb:
+                with self._safe_operation(f"find_{kind}"):
+                    cursor = self.item_collections[kind].find(query or {}, {"position": 0})
+                    if sort_field:
+                        cursor = cursor.sort(sort_field, 1)
+                    return await cursor.to_list(length=None)
+            
+            with self.memory_lock:
+                documents = [
+                    copy.deepcopy(document)
+                    for items in self.memory_items[kind].values() for document in items
+                    if all(self._matches(document.get(k), v) for k, v in (query or {}).items())
+                ]
+            for document in documents:
+                document.pop("position", None)
+            if sort_field:
+                documents.sort(key=lambda document: document.get(sort_field, 0))
+            return documents
+            
+        except Exception as e:
+            logger.error(f"Error finding {kind}: {e}")
+            return []
+    
+    async def migrate_user_items(self, batch_size: int = 500) -> Dict[str, Any]:
+        """Move embedded item lists into their collections in repeatable batches"""
+        stats = {"users": 0, "items": 0}
+        if not self.connected_to_mongodb:
+            return stats
+        
+        kinds = list(self.USER_ITEM_KINDS)
+        try:
+            cursor = self.users_collection.find(
+                {"$or": [{kind: {"$exists": True}} for kind in kinds]},
+                {"user_id": 1, **{kind: 1 for kind in kinds}},
+                batch_size=batch_size
+            )
+            
+            async def write_batch(item_operations, user_operations):
+                for kind, operations in item_operations.items():
+                    if operations:
+                        await self.item_collections[kind].bulk_write(operations, ordered=False)
+                if user_operations:
+                    await self.users_collection.bulk_write(user_operations, ordered=False)
+            
+            item_operations = {kind: [] for kind in kinds}
+            user_operations = []
+            async for document in cursor:
+                user_id = document.get("user_id")
+                embedded = {kind: document.get(kind) for kind in kinds if kind in document}
+                
+                for kind, value in embedded.items():
+                    if kind == "inventory" and isinstance(value, dict):
+                        value = [{"name": name, "quantity": quantity} for name, quantity in value.items()]
+                    for position, item in enumerate(value or []):
+                        if kind not in self.SCALAR_ITEM_KINDS and not isinstance(item, dict):
+                            continue
+                        stored = self._encode_item(kind, user_id, item, position)
+                        stored["_id"] = f"{user_id}:{kind}:{position}"
+                        item_operations[kind].append(ReplaceOne({"_id": stored["_id"]}, stored, upsert=True))
+                        stats["items"] += 1
+                
+                # last_updated changes so a concurrent compaction won't restore the fields
+                user_operations.append(UpdateOne(
+                    {"_id": document["_id"]},
+                    {"$unset": {kind: "" for kind in embedded},
+                     "$set": {"last_updated": datetime.now(timezone.utc)}}
+                ))
+                stats["users"] += 1
+                
+                if len(user_operations) >= batch_size:
+                    await write_batch(item_operations, user_operations)
+                    item_operations = {kind: [] for kind in kinds}
+                    user_operations = []
+            
+            await write_batch(item_operations, user_operations)
+            
+            if stats["users"]:
+                self.user_cache.clear()
+                logger.info(f"✅ Moved {stats['items']} embedded items for {stats['users']} users into item collections")
             
-            # Add level-up rewards (reduced to slow progression)
-            level_rewards = {}
-            if new_level > old_level:
-                level_rewards = self._calculate_level_rewards(new_level, old_level)
-                if level_rewards.get("coins", 0) > 0:
-                    current_coins = user_data.get("coins", 0)
-                    update_data["coins"] = current_coins + level_rewards["coins"]
+        except Exception as e:
+            logger.error(f"Error migrating embedded user items: {e}")
+        
+        return stats
+    
+    async def run_storage_migrations(self):
+        """Startup migrations, in order (each is a no-op once complete)"""
+        await self.migrate_user_items()
+        await self.compact_user_documents()
+        await self.backfill_next_expiry()
+    
+    # ==================== LEADERBOARD METHODS (MISSING) ====================
+    
+    async def get_streak_leaderboard(self, page: int = 1, members_per_page: int = 10,
+                                     after: Optional[tuple] = None, before: Optional[tuple] = None) -> Dict[str, Any]:
+        """Get leaderboard for daily streaks"""
+        return await self.get_paginated_leaderboard("daily_streak", page, members_per_page, after, before)
+
+    async def add_xp(self, user_id: int, amount: int) -> Dict[str, Any]:
+        """Add XP and handle level ups atomically; reports the level change"""
+        try:
+            now = datetime.now(timezone.utc)
             
-            success = self.update_user_data(user_id, update_data)
+            if self.connected_to_mongodb:
+                await self.write_behind.settle("users", user_id)
+                with self._safe_operation(f"add_xp_{user_id}"):
+                    before = await self.users_collection.find_one_and_update(
+                        {"user_id": user_id},
+                        self._add_xp_pipeline(amount, now),
+                        projection={"_id": 0, "xp": 1, "level": 1, "coins": 1},
+                        upsert=True,
+                        return_document=ReturnDocument.BEFORE
+                    )
+                update_data = self._apply_xp(before or {}, amount, now)
+                self.aggregates.user_delta(before, update_data, self._default_user_value("coins"))
+                before = before or {}
+                self.user_cache.patch(user_id, update_data)
+            else:
+                with self.memory_lock:
+                    before = dict(self._memory_user(user_id))
+                    update_data = self._apply_xp(before, amount, now)
+                    self.memory_users[user_id].update(update_data)
+                    # Tracked as deltas so reconciliation adds to the stored totals
+                    incs = {"xp": update_data["xp"] - before.get("xp", 0)}
+                    if "coins" in update_data:
+                        incs["coins"] = update_data["coins"] - before.get("coins", self._default_user_value("coins"))
+                    self._memory_user_changed(user_id, incs=incs, maxes={"level": update_data["level"]}, at=now)
+                await self.local_store.commit()
+            
+            old_level = before.get("level", 1)
+            new_xp = update_data["xp"]
+            new_level = update_data["level"]
+            level_rewards = self._calculate_level_rewards(new_level, old_level) if new_level > old_level else {}
+            self.activity.forget(user_id)
             
             return {
-                "success": success,
+                "success": True,
                 "xp_gained": amount,
                 "total_xp": new_xp,
                 "old_level": old_level,
@@ -654,6 +1723,49 @@ class DatabaseManager:
                 "leveled_up": False
             }
     
+    def _apply_xp(self, before: Dict[str, Any], amount: int, now: datetime) -> Dict[str, Any]:
+        """Fields written by add_xp, computed from the user's prior state"""
+        old_level = before.get("level", 1)
+        # Ensure XP does not go below zero
+        new_xp = max(0, before.get("xp", 0) + amount)
+        new_level = self._calculate_level(new_xp)
+        
+        update_data = {"xp": new_xp, "level": new_level, "last_updated": now}
+        # Add level-up rewards (reduced to slow progression)
+        if new_level > old_level:
+            rewards = self._calculate_level_rewards(new_level, old_level)
+            update_data["coins"] = before.get("coins", self._default_user_value("coins")) + rewards["coins"]
+        return update_data
+    
+    def _add_xp_pipeline(self, amount: int, now: datetime) -> List[Dict[str, Any]]:
+        """Update pipeline mirroring add_xp: clamp XP, recompute level, pay rewards"""
+        # Server-side twins of _calculate_level and _calculate_level_rewards; keep them in sync
+        new_level = {"$cond": [
+            {"$lte": ["$xp", 0]},
+            1,
+            {"$add": [{"$toInt": {"$floor": {"$pow": [{"$divide": ["$xp", 1000]}, 0.75]}}}, 1]}
+        ]}
+        old_level = {"$ifNull": ["$level", 1]}
+        reward = {"$cond": [
+            {"$gt": ["$$new_level", "$$old_level"]},
+            {"$add": [
+                {"$multiply": [50, {"$subtract": ["$$new_level", "$$old_level"]}, "$$new_level"]},
+                {"$cond": [{"$eq": ["$$new_level", 100]}, 5000, 0]}
+            ]},
+            0
+        ]}
+        return [
+            {"$set": {"xp": {"$max": [0, {"$add": [{"$ifNull": ["$xp", 0]}, amount]}]}}},
+            {"$set": {
+                "level": new_level,
+                "coins": {"$let": {
+                    "vars": {"new_level": new_level, "old_level": old_level},
+                    "in": {"$add": [{"$ifNull": ["$coins", self._default_user_value("coins")]}, reward]}
+                }},
+                "last_updated": now
+            }}
+        ]
+    
     def _calculate_level(self, xp: int) -> int:
         """Calculate level based on XP with a harder curve.
         New curve: level ~ floor((xp / 1000) ** 0.75) + 1 which is significantly slower.
@@ -714,30 +1826,45 @@ class DatabaseManager:
     
     # ==================== GUILD DATA OPERATIONS ====================
     
-    def get_guild_data(self, guild_id: int) -> Dict[str, Any]:
+    async def get_guild_data(self, guild_id: int) -> Dict[str, Any]:
         """Get guild data with error handling"""
         try:
             # Try MongoDB first
             if self.connected_to_mongodb:
                 with self._safe_operation(f"get_guild_data_{guild_id}"):
-                    result = self.guilds_collection.find_one({"guild_id": guild_id})
+                    result = await self.shared_cache.get("guilds", guild_id)
+                    if result is None:
+                        loaded_seq = self.shared_cache.seq
+                        result = await self.guilds_collection.find_one({"guild_id": guild_id})
+                        if result:
+                            result.pop("_id", None)
+                            await self.shared_cache.put("guilds", guild_id, result, loaded_seq)
                     if result:
-                        result.pop("_id", None)
+                        result = self.write_behind.overlay("guilds", guild_id, result)
+                        self._cache_guild_settings(guild_id, result)
+                        return result
+                    if self.write_behind.has_pending("guilds", guild_id):
+                        result = self.write_behind.overlay(
+                            "guilds", guild_id, self._create_default_guild_data(guild_id)
+                        )
+                        self._cache_guild_settings(guild_id, result)
                         return result
             
             # Fallback to memory
             with self.memory_lock:
-                if guild_id in self.memory_guilds:
-                    return self.memory_guilds[guild_id].copy()
+                result = self.memory_guilds[guild_id].copy() if guild_id in self.memory_guilds else None
             
-            return self._create_default_guild_data(guild_id)
+            if result is None:
+                result = self._create_default_guild_data(guild_id)
+            self._cache_guild_settings(guild_id, result)
+            return result
             
         except Exception as e:
             logger.error(f"Error getting guild data for {guild_id}: {e}")
             return self._create_default_guild_data(guild_id)
     
-    def update_guild_data(self, guild_id: int, data: Dict[str, Any]) -> bool:
-        """Update guild data with validation"""
+    async def update_guild_data(self, guild_id: int, data: Dict[str, Any], durable: bool = False) -> bool:
+        """Update guild data with validation (queued when write-behind is enabled)"""
         try:
             # Validate data
             self.validator.validate_guild_data(data)
@@ -747,17 +1874,31 @@ class DatabaseManager:
             
             # Try MongoDB first
             if self.connected_to_mongodb:
+                if self.write_behind.enabled and not durable:
+                    self.write_behind.mark_set("guilds", guild_id, data)
+                    with self.memory_lock:
+                        if guild_id not in self.memory_guilds:
+                            self.memory_guilds[guild_id] = self._create_default_guild_data(guild_id)
+                        self.memory_guilds[guild_id].update(data)
+                    self._write_guild_settings(guild_id, data)
+                    self.shared_cache.invalidate("guilds", guild_id)
+                    return True
+                
+                await self.write_behind.settle("guilds", guild_id)
                 with self._safe_operation(f"update_guild_data_{guild_id}"):
                     update_doc = {}
                     for key, value in data.items():
                         # Always set via $set, allowing dot-notation for nested fields
                         update_doc[key] = value
                     
-                    result = self.guilds_collection.update_one(
+                    result = await self.guilds_collection.update_one(
                         {"guild_id": guild_id},
                         {"$set": update_doc},
                         upsert=True
                     )
+                    if result.upserted_id is not None:
+                        self.aggregates.add(guilds=1)
+                    self.shared_cache.invalidate("guilds", guild_id)
                     
                     if result.acknowledged:
                         # Update memory cache
@@ -765,6 +1906,7 @@ class DatabaseManager:
                             if guild_id not in self.memory_guilds:
                                 self.memory_guilds[guild_id] = self._create_default_guild_data(guild_id)
                             self.memory_guilds[guild_id].update(data)
+                        self._write_guild_settings(guild_id, data)
                         return True
             
             # Fallback to memory
@@ -785,12 +1927,89 @@ class DatabaseManager:
                     else:
                         self.memory_guilds[guild_id][key] = value
                 
-                return True
+                self.local_store.record("guilds", guild_id, self.memory_guilds[guild_id])
+                entry = self.dirty.mark_guild(
+                    guild_id, self.memory_guilds[guild_id],
+                    [key for key in data if key != "last_updated"], data["last_updated"]
+                )
+                if entry is not None:
+                    self.local_store.record("dirty", ("guilds", guild_id), entry)
+            
+            self._write_guild_settings(guild_id, data)
+            await self.local_store.commit()
+            return True
                 
         except Exception as e:
             logger.error(f"Error updating guild data for {guild_id}: {e}")
             return False
     
+    def get_guild_settings(self, guild_id: Optional[int]) -> Optional[GuildSettings]:
+        """Cached typed settings for a guild (no I/O; defaults while a load runs)"""
+        if guild_id is None:
+            return None
+        settings = self.guild_settings.get(guild_id)
+        if settings is None:
+            settings = self._cache_guild_settings(guild_id, self._create_default_guild_data(guild_id))
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # No event loop to load it on; do not keep the defaults
+                del self.guild_settings[guild_id]
+                return settings
+            self.guild_placeholders.add(guild_id)
+            self._refresh_guild_settings(guild_id)
+        return settings
+    
+    def _cache_guild_settings(self, guild_id: int, guild_data: Dict[str, Any]) -> GuildSettings:
+        defaults = self._create_default_guild_data(guild_id)["settings"]
+        settings = GuildSettings(guild_id, {**defaults, **(guild_data.get("settings") or {})})
+        self.guild_settings[guild_id] = settings
+        self.guild_placeholders.discard(guild_id)
+        return settings
+    
+    def _write_guild_settings(self, guild_id: int, data: Dict[str, Any]):
+        """Write-through of an update_guild_data change into the settings cache"""
+        changes = {key: value for key, value in data.items() if key == "settings" or key.startswith("settings.")}
+        if not changes:
+            return
+        values = dict(self.get_guild_settings(guild_id).values)
+        for key, value in changes.items():
+            if key == "settings":
+                values = dict(value or {})
+            else:
+                self._memory_set_path(values, key[len("settings."):], value)
+        self._cache_guild_settings(guild_id, {"settings": values})
+    
+    async def preload_guild_settings(self, guild_ids) -> int:
+        """Load settings for every joined guild in one query (startup/reconnect)"""
+        self.known_guild_ids.update(guild_ids)
+        guild_ids = list(self.known_guild_ids)
+        loaded = 0
+        try:
+            if self.connected_to_mongodb:
+                with self._safe_operation("preload_guild_settings"):
+                    async for document in self.guilds_collection.find(
+                        {"guild_id": {"$in": guild_ids}}, {"_id": 0, "guild_id": 1, "settings": 1}
+                    ):
+                        self._cache_guild_settings(document["guild_id"], self.write_behind.overlay(
+                            "guilds", document["guild_id"], document
+                        ))
+                        loaded += 1
+            else:
+                with self.memory_lock:
+                    documents = {gid: copy.deepcopy(self.memory_guilds[gid]) for gid in guild_ids if gid in self.memory_guilds}
+                for guild_id, document in documents.items():
+                    self._cache_guild_settings(guild_id, document)
+                loaded = len(documents)
+            
+            for guild_id in guild_ids:
+                if guild_id not in self.guild_settings:
+                    self._cache_guild_settings(guild_id, {})
+            logger.info(f"⚙️ Cached settings for {len(guild_ids)} guilds ({loaded} stored)")
+        except Exception as e:
+            logger.error(f"Error preloading guild settings: {e}")
+        return loaded
+    
     def _create_default_guild_data(self, guild_id: int) -> Dict[str, Any]:
         """Create default guild data structure"""
         return {
@@ -840,7 +2059,7 @@ class DatabaseManager:
     
     # ==================== ADVANCED OPERATIONS ====================
     
-    def get_leaderboard(self, field: str, limit: int = 10) -> List[Dict[str, Any]]:
+    async def get_leaderboard(self, field: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get leaderboard with improved performance"""
         try:
             if self.connected_to_mongodb:
@@ -854,9 +2073,17 @@ class DatabaseManager:
                     ]
                     
                     cursor = self.users_collection.aggregate(pipeline)
-                    return list(cursor)
+                    return await cursor.to_list(length=limit)
+            elif self.sql_backed:
+                entries = await self.local_store.ranked(field, limit)
+                with self.memory_lock:
+                    users = [self._memory_user(entry["user_id"], create=False) for entry in entries]
+                    return [user.copy() for user in users if user is not None]
             else:
                 with self.memory_lock:
+                    if field in self.memory_leaderboards.indexes:
+                        keys = self.memory_leaderboards.indexes[field].slice(0, limit)
+                        return [self.memory_users[user_id].copy() for _, user_id in keys]
                     users = [user for user in self.memory_users.values() if user.get(field, 0) > 0]
                     users.sort(key=lambda x: x.get(field, 0), reverse=True)
                     return users[:limit]
@@ -865,58 +2092,13 @@ class DatabaseManager:
             logger.error(f"Error getting leaderboard for {field}: {e}")
             return []
     
-    def get_paginated_leaderboard(self, field: str, page: int = 1, members_per_page: int = 10) -> Dict[str, Any]:
-        """Enhanced paginated leaderboard with better performance"""
+    async def get_paginated_leaderboard(self, field: str, page: int = 1, members_per_page: int = 10,
+                                        after: Optional[tuple] = None, before: Optional[tuple] = None,
+                                        inclusive: bool = False) -> Dict[str, Any]:
+        """Keyset-paginated leaderboard (pass last_cursor as ``after`` or first_cursor as ``before``)"""
         try:
-            if self.connected_to_mongodb:
-                with self._safe_operation(f"paginated_leaderboard_{field}"):
-                    skip = (page - 1) * members_per_page
-                    
-                    # Get total count
-                    total_users = self.users_collection.count_documents(
-                        {field: {"$exists": True, "$gt": 0}}
-                    )
-                    total_pages = max(1, (total_users + members_per_page - 1) // members_per_page)
-                    
-                    # Get paginated results
-                    pipeline = [
-                        {"$match": {field: {"$exists": True, "$gt": 0}}},
-                        {"$sort": {field: -1}},
-                        {"$skip": skip},
-                        {"$limit": members_per_page},
-                        {"$project": {"_id": 0}}
-                    ]
-                    
-                    cursor = self.users_collection.aggregate(pipeline)
-                    users = list(cursor)
-                    
-                    return {
-                        'users': users,
-                        'total_pages': total_pages,
-                        'total_users': total_users,
-                        'current_page': page,
-                        'members_per_page': members_per_page
-                    }
-            else:
-                with self.memory_lock:
-                    users = [user for user in self.memory_users.values() if user.get(field, 0) > 0]
-                    users.sort(key=lambda x: x.get(field, 0), reverse=True)
-                    
-                    total_users = len(users)
-                    total_pages = max(1, (total_users + members_per_page - 1) // members_per_page)
-                    
-                    start_idx = (page - 1) * members_per_page
-                    end_idx = start_idx + members_per_page
-                    paginated_users = users[start_idx:end_idx]
-                    
-                    return {
-                        'users': paginated_users,
-                        'total_pages': total_pages,
-                        'total_users': total_users,
-                        'current_page': page,
-                        'members_per_page': members_per_page
-                    }
-                    
+            return await self.leaderboards.page(field, page, members_per_page, after, before, inclusive)
+            
         except Exception as e:
             logger.error(f"Error getting paginated leaderboard: {e}")
             return {
@@ -924,73 +2106,252 @@ class DatabaseManager:
                 'total_pages': 1,
                 'total_users': 0,
                 'current_page': page,
-                'members_per_page': members_per_page
+                'members_per_page': members_per_page,
+                'first_cursor': None,
+                'last_cursor': None
             }
     
-    # ==================== UTILITY METHODS ====================
+    async def get_leaderboard_snapshot(self, field: str) -> Optional[LeaderboardSnapshot]:
+        """Get the shared leaderboard snapshot for a field (None on failure)"""
+        try:
+            return await self.leaderboards.snapshot(field)
+        except Exception as e:
+            logger.error(f"Error building {field} leaderboard snapshot: {e}")
+            return None
+    
+    async def get_snapshot_leaderboard(self, field: str, snapshot: Optional[LeaderboardSnapshot], page: int = 1,
+                                       members_per_page: int = 10, after: Optional[tuple] = None) -> Dict[str, Any]:
+        """Leaderboard page from a pinned snapshot, falling back to a live read"""
+        if snapshot is None:
+            return await self.get_paginated_leaderboard(field, page, members_per_page, after=after)
+        try:
+            return await self.leaderboards.snapshot_page(snapshot, page, members_per_page, after)
+        except Exception as e:
+            logger.error(f"Error reading {field} leaderboard snapshot: {e}")
+            return await self.get_paginated_leaderboard(field, page, members_per_page, after=after)
+    
+    async def get_leaderboard_rank(self, field: str, user_id: int) -> Optional[int]:
+        """Get a user's 1-based leaderboard rank (None when unranked)"""
+        try:
+            return await self.leaderboards.rank(field, user_id)
+        except Exception as e:
+            logger.error(f"Error getting {field} rank for user {user_id}: {e}")
+            return None
+    
+    async def get_leaderboard_neighbours(self, field: str, user_id: int, radius: int = 5) -> Dict[str, Any]:
+        """Get a user's rank and the users ranked just above and below them"""
+        try:
+            return await self.leaderboards.around(field, user_id, radius)
+        except Exception as e:
+            logger.error(f"Error getting {field} neighbours for user {user_id}: {e}")
+            return {'rank': None, 'score': 0, 'users': []}
+
+    async def compact_user_documents(self, batch_size: int = 500, force: bool = False) -> Dict[str, Any]:
+        """Rewrite stored user documents in sparse form (one-time migration)"""
+        stats = {"scanned": 0, "compacted": 0, "skipped": False}
+        if not self.connected_to_mongodb:
+            return stats
+        
+        try:
+            if not force and await self.meta_collection.find_one({"_id": "user_compaction"}):
+                stats["skipped"] = True
+                return stats
+            
+            logger.info("🗜️ Compacting user documents...")
+            operations = []
+            async for document in self.users_collection.find({}, batch_size=batch_size):
+                stats["scanned"] += 1
+                compacted = self.schema.compact(document)
+                if compacted == {k: v for k, v in document.items() if k != "_id"}:
+                    continue
+                
+                operations.append(ReplaceOne(
+                    {"_id": document["_id"], "last_updated": document.get("last_updated")},
+                    compacted
+                ))
+                if len(operations) >= batch_size:
+                    result = await self.users_collection.bulk_write(operations, ordered=False)
+                    stats["compacted"] += result.modified_count
+                    operations = []
+            
+            if operations:
+                result = await self.users_collection.bulk_write(operations, ordered=False)
+                stats["compacted"] += result.modified_count
+            
+            await self.meta_collection.update_one(
+                {"_id": "user_compaction"},
+                {"$set": {"completed_at": datetime.now(timezone.utc), **stats}},
+                upsert=True
+            )
+            
+            # Cached copies may predate the rewrite
+            self.user_cache.clear()
+            logger.info(f"✅ Compacted {stats['compacted']} of {stats['scanned']} user documents")
+            
+        except Exception as e:
+            logger.error(f"Error compacting user documents: {e}")
+        
+        return stats
+
+    # Expiring item collections and the field their sweep uses (both indexed)
+    # Reminders are not swept: the reminder scheduler deletes them once delivered
+    EXPIRING_ITEMS = {"temporary_purchases": "expires_at"}
+    
+    @staticmethod
+    def _next_expiry(entries: List[Dict[str, Any]]) -> Optional[float]:
+        """Earliest expires_at among a user's expiring entries (temporary_roles)"""
+        return min((entry.get("expires_at", 0) for entry in entries), default=None)
     
-    def cleanup_expired_data(self):
-        """Clean up expired data with better performance"""
+    async def cleanup_expired_data(self) -> Dict[str, Any]:
+        """Remove expired items and temporary roles via their expiry indexes"""
+        sweep = {"started_at": datetime.now(timezone.utc).isoformat(), "removed": {}, "users_modified": 0}
+        started = time.perf_counter()
         try:
             current_time = time.time()
-            logger.info("🧹 Starting comprehensive database cleanup...")
             
             if self.connected_to_mongodb:
                 with self._safe_operation("cleanup_expired_data"):
-                    # Clean temporary purchases
-                    self.users_collection.update_many(
-                        {},
-                        {"$pull": {"temporary_purchases": {"expires_at": {"$lt": current_time}}}}
-                    )
-                    
-                    # Clean temporary roles
-                    self.users_collection.update_many(
-                        {},
-                        {"$pull": {"temporary_roles": {"expires_at": {"$lt": current_time}}}}
-                    )
-                    
-                    # Clean old reminders
-                    self.users_collection.update_many(
-                        {},
-                        {"$pull": {"reminders": {"remind_at": {"$lt": current_time}}}}
-                    )
+                    for kind, field in self.EXPIRING_ITEMS.items():
+                        result = await self.item_collections[kind].delete_many({field: {"$lt": current_time}})
+                        sweep["removed"][kind] = result.deleted_count
                     
-                logger.info("✅ MongoDB cleanup completed")
+                    # Only users whose earliest temporary role has expired
+                    due = [
+                        document["user_id"] async for document in self.users_collection.find(
+                            {"next_expiry_at": {"$lte": current_time}}, {"_id": 0, "user_id": 1}
+                        )
+                    ]
+                    if due:
+                        remaining = {"$filter": {
+                            "input": {"$ifNull": ["$temporary_roles", []]},
+                            "as": "role",
+                            "cond": {"$gt": ["$$role.expires_at", current_time]}
+                        }}
+                        result = await self.users_collection.update_many(
+                            {"user_id": {"$in": due}, "next_expiry_at": {"$lte": current_time}},
+                            [
+                                {"$set": {"temporary_roles": remaining}},
+                                {"$set": {"next_expiry_at": {"$min": "$temporary_roles.expires_at"}}}
+                            ]
+                        )
+                        sweep["users_modified"] = result.modified_count
+                        for user_id in due:
+                            self.user_cache.invalidate(user_id)
             else:
-                # Clean memory storage
                 with self.memory_lock:
-                    for user_data in self.memory_users.values():
-                        # Clean temporary purchases
-                        if "temporary_purchases" in user_data:
-                            user_data["temporary_purchases"] = [
-                                item for item in user_data["temporary_purchases"]
-                                if item.get("expires_at", 0) > current_time
-                            ]
-                        
-                        # Clean temporary roles
-                        if "temporary_roles" in user_data:
-                            user_data["temporary_roles"] = [
-                                item for item in user_data["temporary_roles"]
-                                if item.get("expires_at", 0) > current_time
-                            ]
-                        
-                        # Clean reminders
-                        if "reminders" in user_data:
-                            user_data["reminders"] = [
-                                item for item in user_data["reminders"]
-                                if item.get("remind_at", 0) > current_time
-                            ]
+                    for kind, field in self.EXPIRING_ITEMS.items():
+                        removed = 0
+                        for user_id, items in self.memory_items[kind].items():
+                            expired = [item["_id"] for item in items if item.get(field, 0) <= current_time]
+                            if expired:
+                                self.memory_items[kind][user_id] = [
+                                    item for item in items if item.get(field, 0) > current_time
+                                ]
+                                self._memory_items_changed(kind, user_id, removed=expired)
+                                removed += len(expired)
+                        sweep["removed"][kind] = removed
+                    
+                    if self.sql_backed:
+                        for user_id in self.local_store.expiring_users(current_time):
+                            self._memory_user(user_id, create=False)
+                    for user_id, user_data in self.memory_users.items():
+                        next_expiry = user_data.get("next_expiry_at")
+                        if next_expiry is None or next_expiry > current_time:
+                            continue
+                        user_data["temporary_roles"] = [
+                            role for role in user_data.get("temporary_roles", [])
+                            if role.get("expires_at", 0) > current_time
+                        ]
+                        user_data["next_expiry_at"] = self._next_expiry(user_data["temporary_roles"])
+                        self._memory_user_changed(user_id, sets=["temporary_roles", "next_expiry_at"])
+                        sweep["users_modified"] += 1
                 
-                logger.info("✅ Memory cleanup completed")
+                await self.local_store.commit()
+            
+            sweep["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self.expiry_stats["sweeps"] += 1
+            self.expiry_stats["items_removed"] += sum(sweep["removed"].values())
+            self.expiry_stats["users_modified"] += sweep["users_modified"]
+            self.expiry_stats["last_sweep"] = sweep
+            logger.info(f"🧹 Expiry sweep: removed {sweep['removed']}, "
+                        f"{sweep['users_modified']} users modified in {sweep['duration_ms']}ms")
                 
         except Exception as e:
+            self.expiry_stats["failed_sweeps"] += 1
             logger.error(f"Error during cleanup: {e}")
+        
+        return sweep
+    
+    async def backfill_next_expiry(self) -> int:
+        """Set next_expiry_at on documents written before it existed (one-time migration)"""
+        if not self.connected_to_mongodb:
+            return 0
+        try:
+            if await self.meta_collection.find_one({"_id": "next_expiry_backfill"}):
+                return 0
+            result = await self.users_collection.update_many(
+                {"temporary_roles.0": {"$exists": True}, "next_expiry_at": {"$exists": False}},
+                [{"$set": {"next_expiry_at": {"$min": "$temporary_roles.expires_at"}}}]
+            )
+            await self.meta_collection.update_one(
+                {"_id": "next_expiry_backfill"},
+                {"$set": {"completed_at": datetime.now(timezone.utc), "modified": result.modified_count}},
+                upsert=True
+            )
+            self.user_cache.clear()
+            logger.info(f"✅ Backfilled next_expiry_at on {result.modified_count} users")
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error backfilling next_expiry_at: {e}")
+            return 0
     
-    def get_database_stats(self) -> Dict[str, Any]:
+    async def recompute_aggregates(self) -> Dict[str, Any]:
+        """Recount the running totals with a full scan (see RunningAggregates)"""
+        try:
+            if self.connected_to_mongodb:
+                with self._safe_operation("recompute_aggregates"):
+                    values = {
+                        "users": await self.users_collection.count_documents({}),
+                        "guilds": await self.guilds_collection.count_documents({})
+                    }
+                    result = await self.users_collection.aggregate([
+                        {"$group": {
+                            "_id": None,
+                            "total_coins": {"$sum": "$coins"},
+                            "total_xp": {"$sum": "$xp"},
+                            # Sparse documents omit the default level
+                            "level_sum": {"$sum": {"$ifNull": ["$level", 1]}}
+                        }}
+                    ]).to_list(length=1)
+                    if result:
+                        values.update({field: result[0][field] for field in ("total_coins", "total_xp", "level_sum")})
+                self.aggregates.reset(values)
+                aggregates = self.aggregates
+            elif self.sql_backed:
+                self.memory_aggregates.reset(await self.local_store.totals())
+                aggregates = self.memory_aggregates
+            else:
+                with self.memory_lock:
+                    self.memory_aggregates.counted = {}
+                    self.memory_aggregates.values = dict.fromkeys(RunningAggregates.FIELDS, 0)
+                    for user_id, user_data in self.memory_users.items():
+                        self.memory_aggregates.observe(user_id, user_data)
+                    self.memory_aggregates.reset(dict(self.memory_aggregates.values))
+                aggregates = self.memory_aggregates
+            
+            if any(aggregates.last_drift.values()):
+                logger.info(f"📊 Aggregates recomputed, corrected drift {aggregates.last_drift}")
+            return aggregates.snapshot()
+            
+        except Exception as e:
+            logger.error(f"Error recomputing aggregates: {e}")
+            return {}
+    
+    async def get_database_stats(self) -> Dict[str, Any]:
         """Get comprehensive database statistics"""
         try:
             stats = {
-                "storage_type": "MongoDB" if self.connected_to_mongodb else "Memory",
+                "storage_type": "MongoDB" if self.connected_to_mongodb else ("SQLite" if self.backend == 'sqlite' else "Memory"),
                 "connection_status": "Connected" if self.connected_to_mongodb else "Fallback",
                 "users": 0,
                 "guilds": 0,
@@ -998,41 +2359,29 @@ class DatabaseManager:
                 "total_xp": 0,
                 "active_pets": 0,
                 "active_investments": 0,
+                "activity": self.activity.get_stats(),
+                "write_behind": self.write_behind.get_stats(),
+                "user_cache": self.user_cache.get_stats(),
+                "shared_cache": self.shared_cache.get_stats(),
+                "user_locks": self.user_locks.get_stats(),
+                "timers": self.timers.get_stats(),
+                "boosts": self.boosts.get_stats(),
+                "local_store": self.local_store.get_stats(),
+                "reconciliation": dict(self.sync_progress, pending=len(self.dirty)),
+                "expiry": self.expiry_stats,
+                "guild_settings_cached": len(self.guild_settings),
                 "last_updated": datetime.now(timezone.utc).isoformat()
             }
             
-            if self.connected_to_mongodb:
-                with self._safe_operation("database_stats"):
-                    stats["users"] = self.users_collection.count_documents({})
-                    stats["guilds"] = self.guilds_collection.count_documents({})
-                    
-                    # Aggregate statistics
-                    pipeline = [
-                        {"$group": {
-                            "_id": None,
-                            "total_coins": {"$sum": "$coins"},
-                            "total_xp": {"$sum": "$xp"},
-                            "avg_level": {"$avg": "$level"}
-                        }}
-                    ]
-                    
-                    result = list(self.users_collection.aggregate(pipeline))
-                    if result:
-                        stats.update({
-                            "total_coins": result[0].get("total_coins", 0),
-                            "total_xp": result[0].get("total_xp", 0),
-                            "avg_level": round(result[0].get("avg_level", 1), 2)
-                        })
-            else:
+            # Running totals: no collection scans per request
+            aggregates = self.aggregates if self.connected_to_mongodb else self.memory_aggregates
+            stats.update(aggregates.snapshot())
+            stats["aggregates"] = aggregates.get_stats()
+            if not self.connected_to_mongodb:
                 with self.memory_lock:
-                    stats["users"] = len(self.memory_users)
+                    if not self.sql_backed:
+                        stats["users"] = len(self.memory_users)
                     stats["guilds"] = len(self.memory_guilds)
-                    
-                    # Calculate aggregates from memory
-                    if self.memory_users:
-                        stats["total_coins"] = sum(user.get("coins", 0) for user in self.memory_users.values())
-                        stats["total_xp"] = sum(user.get("xp", 0) for user in self.memory_users.values())
-                        stats["avg_level"] = sum(user.get("level", 1) for user in self.memory_users.values()) / len(self.memory_users)
             
             return stats
             
@@ -1048,28 +2397,24 @@ class DatabaseManager:
     
     # ==================== WORK AND DAILY SYSTEM ====================
     
-    def can_work(self, user_id: int) -> bool:
+    async def can_work(self, user_id: int) -> bool:
         """Check if user can work with cooldown"""
         try:
-            user_data = self.get_user_data(user_id)
+            user_data = await self.get_user_data(user_id)
             last_work = user_data.get("last_work", 0)
-            cooldown = 3600  # 1 hour default
-            
-            # Check for work energizer boost
-            active_purchases = self.get_active_temporary_purchases(user_id)
-            if any(p.get("item_type") == "work_energizer" for p in active_purchases):
-                cooldown = 0  # No cooldown with boost
+            # 1 hour, or none with a work energizer
+            cooldown = (await self.boosts.get(user_id))["work_cooldown"]
             
             return time.time() - last_work >= cooldown
         except Exception as e:
             logger.error(f"Error checking work status for {user_id}: {e}")
             return True
     
-    def process_work(self, user_id: int, job_title: str, earnings: int) -> Dict[str, Any]:
+    async def process_work(self, user_id: int, job_title: str, earnings: int) -> Dict[str, Any]:
         """Process work activity with enhanced tracking"""
         try:
             current_time = time.time()
-            user_data = self.get_user_data(user_id)
+            user_data = await self.get_user_data(user_id)
             
             # Calculate work streak
             last_work = user_data.get("last_work", 0)
@@ -1089,16 +2434,16 @@ class DatabaseManager:
             
             # Add earnings
             if earnings > 0:
-                self.add_coins(user_id, earnings)
+                await self.add_coins(user_id, earnings)
             
             # Add work XP
             xp_gained = 25
             if work_streak > 7:
                 xp_gained += 10  # Bonus XP for long streaks
             
-            self.add_xp(user_id, xp_gained)
+            await self.add_xp(user_id, xp_gained)
             
-            success = self.update_user_data(user_id, update_data)
+            success = await self.update_user_data(user_id, update_data)
             
             return {
                 "success": success,
@@ -1112,10 +2457,10 @@ class DatabaseManager:
             logger.error(f"Error processing work for {user_id}: {e}")
             return {"success": False}
     
-    def claim_daily_bonus(self, user_id: int) -> Dict[str, Any]:
+    async def claim_daily_bonus(self, user_id: int) -> Dict[str, Any]:
         """Enhanced daily bonus system with weekly streak bonus and streak reset at 7 days"""
         try:
-            user_data = self.get_user_data(user_id)
+            user_data = await self.get_user_data(user_id)
             current_time = time.time()
             last_daily = user_data.get("last_daily", 0)
             
@@ -1153,12 +2498,12 @@ class DatabaseManager:
             total_coins += milestone_bonus
             
             # Apply rewards
-            self.add_coins(user_id, total_coins)
-            xp_result = self.add_xp(user_id, total_xp)
+            await self.add_coins(user_id, total_coins)
+            xp_result = await self.add_xp(user_id, total_xp)
             
             # Update daily data; reset streak after weekly bonus at 7
             new_streak = 0 if streak == 7 else streak
-            self.update_user_data(user_id, {
+            await self.update_user_data(user_id, {
                 "last_daily": current_time,
                 "daily_streak": new_streak
             })
@@ -1177,104 +2522,120 @@ class DatabaseManager:
             logger.error(f"Error claiming daily bonus for {user_id}: {e}")
             return {"success": False, "message": "An error occurred"}
     
-    def add_temporary_purchase(self, user_id: int, item_type: str, duration: int) -> bool:
-        """Add temporary purchase with better stacking"""
+    async def add_temporary_purchase(self, user_id: int, item_type: str, duration: int) -> bool:
+        """Add temporary purchase, stacking duration onto an active one of the same type"""
         try:
             current_time = time.time()
-            expiry_time = current_time + duration
-            
-            user_data = self.get_user_data(user_id)
-            temp_purchases = user_data.get("temporary_purchases", [])
-            
-            # Check if same item type exists and stack duration
-            existing_item = None
-            for item in temp_purchases:
-                if item.get("item_type") == item_type:
-                    existing_item = item
-                    break
             
-            if existing_item:
-                # Stack duration
-                existing_item["expires_at"] = max(existing_item.get("expires_at", 0), current_time) + duration
-            else:
-                # Add new item
-                purchase_data = {
-                    "item_type": item_type,
-                    "expires_at": expiry_time,
-                    "purchased_at": current_time
-                }
-                temp_purchases.append(purchase_data)
+            if self.connected_to_mongodb:
+                with self._safe_operation(f"add_temporary_purchase_{user_id}"):
+                    # One upsert per (user, item type); expired items restart from now
+                    purchase = await self.item_collections["temporary_purchases"].find_one_and_update(
+                        {"user_id": user_id, "item_type": item_type},
+                        [{"$set": {
+                            "position": {"$ifNull": ["$position", time.time_ns()]},
+                            "purchased_at": {"$ifNull": ["$purchased_at", current_time]},
+                            "expires_at": {"$add": [
+                                {"$max": [{"$ifNull": ["$expires_at", 0]}, current_time]}, duration
+                            ]}
+                        }}],
+                        projection={"_id": 0, "expires_at": 1},
+                        upsert=True,
+                        return_document=ReturnDocument.AFTER
+                    )
+                self.boosts.add(user_id, item_type, purchase["expires_at"])
+                await self._schedule_boost_expiry(user_id, item_type, purchase["expires_at"])
+                return True
             
-            return self.update_user_data(user_id, {"temporary_purchases": temp_purchases})
+            with self.memory_lock:
+                purchases = self.memory_items["temporary_purchases"].setdefault(user_id, [])
+                existing_item = next((item for item in purchases if item.get("item_type") == item_type), None)
+                if existing_item:
+                    # Stack duration
+                    existing_item["expires_at"] = max(existing_item.get("expires_at", 0), current_time) + duration
+                else:
+                    existing_item = self._encode_item("temporary_purchases", user_id, {
+                        "item_type": item_type,
+                        "expires_at": current_time + duration,
+                        "purchased_at": current_time
+                    }, time.time_ns())
+                    purchases.append(existing_item)
+                self._memory_items_changed("temporary_purchases", user_id, changed=[existing_item["_id"]])
+                expires_at = existing_item["expires_at"]
+            self.boosts.add(user_id, item_type, expires_at)
+            await self._schedule_boost_expiry(user_id, item_type, expires_at)
+            return await self.local_store.commit()
             
         except Exception as e:
             logger.error(f"Error adding temporary purchase: {e}")
             return False
     
-    def get_active_temporary_purchases(self, user_id: int) -> List[Dict[str, Any]]:
-        """Get active temporary purchases with cleanup"""
-        try:
-            user_data = self.get_user_data(user_id)
-            current_time = time.time()
-            all_purchases = user_data.get("temporary_purchases", [])
-            
-            # Filter active purchases
-            active_purchases = [
-                purchase for purchase in all_purchases
-                if purchase.get("expires_at", 0) > current_time
-            ]
-            
-            # If we filtered out expired items, update the database
-            if len(active_purchases) != len(all_purchases):
-                self.update_user_data(user_id, {"temporary_purchases": active_purchases})
-            
-            return active_purchases
-            
-        except Exception as e:
-            logger.error(f"Error getting active purchases for {user_id}: {e}")
-            return []
-
+    async def _schedule_boost_expiry(self, user_id: int, item_type: str, expires_at: float):
+        """Move the purchase's expiry timer to its (stacked) expires_at"""
+        for timer in self.timers.find("boost_expiry", user_id=user_id, item_type=item_type):
+            await self.timers.cancel(timer["_id"])
+        await self.timers.schedule("boost_expiry", expires_at, {"user_id": user_id, "item_type": item_type})
+    
+    async def _expire_temporary_purchase(self, timer: Dict[str, Any]):
+        """boost_expiry timer: drop the purchase as soon as it runs out"""
+        user_id, item_type = timer["payload"]["user_id"], timer["payload"]["item_type"]
+        expired = await self.get_user_items("temporary_purchases", user_id, {
+            "item_type": item_type, "expires_at": {"$lte": time.time()}
+        })
+        if expired:
+            await self.remove_user_items("temporary_purchases", user_id, [item["_id"] for item in expired])
+            self.boosts.expire(user_id, item_type)
+    
+    async def get_boost_effects(self, user_id: int) -> Dict[str, float]:
+        """Multipliers from a user's active boosts (see BoostEngine.DEFAULTS)"""
+        return await self.boosts.get(user_id)
+    
+    async def get_active_temporary_purchases(self, user_id: int) -> List[Dict[str, Any]]:
+        """Get unexpired temporary purchases (expired ones are swept by cleanup)"""
+        return await self.get_user_items(
+            "temporary_purchases", user_id, {"expires_at": {"$gt": time.time()}}
+        )
 
 # Create global database instance
 db = DatabaseManager()
 
 # ==================== LEGACY COMPATIBILITY FUNCTIONS ====================
 
-def get_user_data(user_id: int) -> Dict[str, Any]:
+async def get_user_data(user_id: int) -> Dict[str, Any]:
     """Legacy function for backward compatibility"""
-    return db.get_user_data(user_id)
+    return await db.get_user_data(user_id)
 
-def update_user_data(user_id: int, data: Dict[str, Any]) -> bool:
+async def update_user_data(user_id: int, data: Dict[str, Any]) -> bool:
     """Legacy function for backward compatibility"""
-    return db.update_user_data(user_id, data)
+    return await db.update_user_data(user_id, data)
 
-def add_coins(user_id: int, amount: int) -> bool:
+async def add_coins(user_id: int, amount: int) -> bool:
     """Legacy function for backward compatibility"""
-    return db.add_coins(user_id, amount)
+    return await db.add_coins(user_id, amount)
 
-def remove_coins(user_id: int, amount: int) -> bool:
+async def remove_coins(user_id: int, amount: int) -> bool:
     """Legacy function for backward compatibility"""
-    return db.remove_coins(user_id, amount)
+    return await db.remove_coins(user_id, amount)
 
 def get_database():
     """Get database instance"""
     return db
 
-def cleanup_expired_items():
+async def cleanup_expired_items():
     """Legacy cleanup function"""
-    return db.cleanup_expired_data()
+    return await db.cleanup_expired_data()
 
-def get_active_temporary_purchases(user_id: int):
+async def get_active_temporary_purchases(user_id: int):
     """Legacy function for active temporary purchases"""
-    return db.get_active_temporary_purchases(user_id)
+    return await db.get_active_temporary_purchases(user_id)
 
-def add_xp(user_id: int, amount: int):
+async def add_xp(user_id: int, amount: int):
     """Legacy function for adding XP"""
-    return db.add_xp(user_id, amount)
+    return await db.add_xp(user_id, amount)
 
-def claim_daily_bonus(user_id: int):
+async def claim_daily_bonus(user_id: int):
     """Legacy function for claiming daily bonus"""
-    return db.claim_daily_bonus(user_id)
+    return await db.claim_daily_bonus(user_id)
 
 # ==================== PERIODIC TASKS ====================
 
@@ -1283,25 +2644,56 @@ async def periodic_cleanup():
     while True:
         try:
             await asyncio.sleep(3600)  # Every hour
-            db.cleanup_expired_data()
+            await db.cleanup_expired_data()
             
             # Attempt reconnection if disconnected
             if not db.connected_to_mongodb:
-                db.reconnect_mongodb()
+                await db.reconnect_mongodb()
                 
         except Exception as e:
             logger.error(f"Error in periodic cleanup: {e}")
 
+async def periodic_activity_flush():
+    """Flush batched message XP/activity"""
+    while True:
+        try:
+            await asyncio.sleep(db.activity.flush_interval)
+            await db.activity.flush()
+            
+        except Exception as e:
+            logger.error(f"Error in periodic activity flush: {e}")
+
+async def periodic_write_behind_flush():
+    """Flush queued write-behind updates"""
+    while True:
+        try:
+            await asyncio.sleep(db.write_behind.flush_interval)
+            if db.connected_to_mongodb:
+                await db.write_behind.flush()
+            
+        except Exception as e:
+            logger.error(f"Error in periodic write-behind flush: {e}")
+
+async def periodic_aggregates_recompute():
+    """Reconcile running totals against a full recount"""
+    while True:
+        try:
+            await asyncio.sleep(db.aggregates.reconcile_interval)
+            await db.recompute_aggregates()
+            
+        except Exception as e:
+            logger.error(f"Error in periodic aggregates recompute: {e}")
+
 async def periodic_health_check():
     """Run periodic health checks"""
     while True:
         try:
             await asyncio.sleep(300)  # Every 5 minutes
-            health = db.get_database_health()
+            health = await db.get_database_health()
             
             if not health.get("mongodb_connected", False) and db.connected_to_mongodb:
                 logger.warning("MongoDB connection lost, attempting reconnection...")
-                db.reconnect_mongodb()
+                await db.reconnect_mongodb()
                 
         except Exception as e:
             logger.error(f"Error in periodic health check: {e}")
@@ -1311,11 +2703,13 @@ __all__ = [
     'DatabaseManager', 'db', 'get_user_data', 'update_user_data', 
     'add_coins', 'remove_coins', 'get_database', 'cleanup_expired_items',
     'get_active_temporary_purchases', 'add_xp',
-    'claim_daily_bonus', 'periodic_cleanup', 'periodic_health_check'
+    'claim_daily_bonus', 'periodic_cleanup', 'periodic_health_check',
+    'periodic_activity_flush', 'periodic_write_behind_flush',
+    'periodic_aggregates_recompute'
 ]
 
 logger.info("🎯 Enhanced database system initialized successfully!")
-logger.info(f"📊 Storage mode: {'MongoDB' if db.connected_to_mongodb else 'Memory'}")
+logger.info("📊 Storage mode: Memory until db.initialize() connects to MongoDB")
 logger.info(f"🔧 Available methods: {len([m for m in dir(db) if not m.startswith('_')])}")
 
 # Schedule periodic tasks if running in async context
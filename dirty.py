@@ -0,0 +1,144 @@
+"""
+Memory-mode changes owed to MongoDB
+- Tracked per field (users, guilds) or per _id (items, timers)
+- Journalled so they survive a restart, replayed once MongoDB is back
+"""
+
+import copy
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+
+class DirtyTracker:
+    """Per-field memory-mode changes awaiting MongoDB: user $set/$inc/$max, guild $set, items and timers by _id"""
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.guilds: Dict[int, Dict[str, tuple]] = {}
+        self.items: Dict[tuple, Dict[str, Any]] = {}
+        # timer_id -> {"document": record, or None once deleted}
+        self.timers: Dict[str, Dict[str, Any]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.users) + len(self.guilds) + len(self.items) + len(self.timers)
+    
+    @staticmethod
+    def _covers(path: str, other: str) -> bool:
+        return other == path or other.startswith(path + ".")
+    
+    @staticmethod
+    def _get(document: Dict[str, Any], path: str) -> Any:
+        for key in path.split('.'):
+            if not isinstance(document, dict) or key not in document:
+                return None
+            document = document[key]
+        return document
+    
+    def _mark_sets(self, sets: Dict[str, tuple], document: Dict[str, Any], paths, at: datetime,
+                   covered_buckets=()):
+        for path in paths:
+            # A set nested under a pending one just refreshes the parent's value
+            path = next((p for p in sets if self._covers(p, path)), path)
+            for bucket in (sets,) + tuple(covered_buckets):
+                for other in [o for o in bucket if self._covers(path, o)]:
+                    del bucket[other]
+            sets[path] = (copy.deepcopy(self._get(document, path)), at)
+    
+    def mark_user(self, user_id: int, document: Dict[str, Any], sets=(), incs: Optional[Dict[str, int]] = None,
+                  maxes: Optional[Dict[str, Any]] = None, at: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Record a memory write to ``document``; returns the entry to journal"""
+        if not self.enabled:
+            return None
+        at = at or datetime.now(timezone.utc)
+        entry = self.users.setdefault(user_id, {"$set": {}, "$inc": {}, "$max": {}, "at": at})
+        entry["at"] = max(entry["at"], at)
+        
+        self._mark_sets(entry["$set"], document, [p for p in sets if p != "last_updated"], at,
+                        (entry["$inc"], entry["$max"]))
+        for bucket, values in (("$inc", incs), ("$max", maxes)):
+            for path, value in (values or {}).items():
+                covering = next((p for p in entry["$set"] if self._covers(p, path)), None)
+                if covering is not None:
+                    entry["$set"][covering] = (copy.deepcopy(self._get(document, covering)), at)
+                elif bucket == "$inc":
+                    entry["$inc"][path] = entry["$inc"].get(path, 0) + value
+                else:
+                    entry["$max"][path] = max(entry["$max"].get(path, value), value)
+        return entry
+    
+    def mark_guild(self, guild_id: int, document: Dict[str, Any], paths, at: datetime) -> Optional[Dict[str, tuple]]:
+        if not self.enabled:
+            return None
+        entry = self.guilds.setdefault(guild_id, {})
+        self._mark_sets(entry, document, paths, at)
+        return entry
+    
+    def mark_items(self, kind: str, user_id: int, documents: Dict[str, Any], changed=(), removed=()) -> Optional[Dict[str, Any]]:
+        """``documents`` maps _id -> current item document"""
+        if not self.enabled:
+            return None
+        entry = self.items.setdefault((kind, user_id), {})
+        for item_id in changed:
+            entry[item_id] = copy.deepcopy(documents[item_id])
+        for item_id in removed:
+            entry[item_id] = None
+        return entry
+    
+    def mark_timer(self, timer_id: str, document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        entry = self.timers[timer_id] = {"document": copy.deepcopy(document)}
+        return entry
+    
+    def take(self) -> tuple:
+        """Hand every pending entry to the caller and start afresh"""
+        taken = (self.users, self.guilds, self.items, self.timers)
+        self.users, self.guilds, self.items, self.timers = {}, {}, {}, {}
+        return taken
+    
+    def requeue_users(self, entries: Dict[int, Dict[str, Any]], memory_users: Dict[int, Dict[str, Any]]):
+        """Put back entries that failed to reconcile; anything newer takes precedence"""
+        for user_id, entry in entries.items():
+            document = memory_users.get(user_id, {})
+            current = self.users.get(user_id)
+            if current:
+                # Re-read set values so they include the newer changes
+                self._mark_sets(current["$set"], document, list(entry["$set"]), current["at"],
+                                (current["$inc"], current["$max"]))
+                self.mark_user(user_id, document, incs=entry["$inc"], maxes=entry["$max"], at=entry["at"])
+            else:
+                self.users[user_id] = entry
+    
+    def requeue_guilds(self, entries: Dict[int, Dict[str, tuple]]):
+        for guild_id, sets in entries.items():
+            current = self.guilds.setdefault(guild_id, {})
+            for path, value in sets.items():
+                if not any(self._covers(p, path) or self._covers(path, p) for p in current):
+                    current[path] = value
+    
+    def requeue_items(self, entries: Dict[tuple, Dict[str, Any]]):
+        for key, changes in entries.items():
+            current = self.items.setdefault(key, {})
+            for item_id, document in changes.items():
+                current.setdefault(item_id, document)
+    
+    def requeue_timers(self, entries: Dict[str, Dict[str, Any]]):
+        for timer_id, entry in entries.items():
+            self.timers.setdefault(timer_id, entry)
+    
+    def restore(self, key: tuple, entry: Any):
+        """Apply a journalled entry during recovery"""
+        collection, record_key = key
+        target = getattr(self, collection)
+        if entry:
+            target[record_key] = entry
+        else:
+            target.pop(record_key, None)
+    
+    def export(self) -> Dict[str, Any]:
+        return {"users": self.users, "guilds": self.guilds, "items": self.items, "timers": self.timers}
+    
+    def load(self, state: Optional[Dict[str, Any]]):
+        for collection, entries in (state or {}).items():
+            getattr(self, collection).update(entries)
@@ -0,0 +1,68 @@
+"""
+Typed guild settings
+- Built once per guild load or write, so event listeners read attributes
+- Log channels are resolved up front
+"""
+
+from typing import Dict, Any, Optional
+
+
+class GuildSettings:
+    """Typed, read-only view of a guild's settings for event listeners"""
+    
+    # Log type -> settings field holding its channel
+    LOG_CHANNEL_FIELDS = {
+        "moderation": "modlog_channel",
+        "member": "join_leave_channel",
+        "message": "message_log_channel",
+        "general": "modlog_channel"
+    }
+    
+    __slots__ = (
+        "guild_id", "prefix", "logging_enabled", "log_channels",
+        "welcome_enabled", "welcome_channel", "welcome_message", "leave_message", "join_gif", "leave_gif",
+        "starboard_enabled", "starboard_channel", "starboard_emoji", "starboard_threshold",
+        "tickets_enabled", "ticket_category", "transcript_channel", "support_role",
+        "levelup_channel", "autorole", "values"
+    )
+    
+    def __init__(self, guild_id: int, settings: Dict[str, Any]):
+        channel = lambda field: int(settings[field]) if settings.get(field) else None
+        self.guild_id = guild_id
+        self.values = settings
+        self.prefix: str = settings.get("prefix") or "!"
+        
+        self.logging_enabled: bool = bool(settings.get("logging_enabled"))
+        # Resolved once: empty while logging is off
+        self.log_channels: Dict[str, Optional[int]] = {
+            log_type: channel(field) for log_type, field in self.LOG_CHANNEL_FIELDS.items()
+        } if self.logging_enabled else {}
+        
+        self.welcome_enabled: bool = bool(settings.get("welcome_enabled"))
+        self.welcome_channel: Optional[int] = channel("welcome_channel")
+        self.welcome_message: str = settings.get("welcome_message") or "Welcome {user} to {server}!"
+        self.leave_message: str = settings.get("leave_message") or "Goodbye {user}! They were with us for {days} days."
+        self.join_gif: Optional[str] = settings.get("join_gif")
+        self.leave_gif: Optional[str] = settings.get("leave_gif")
+        
+        self.starboard_channel: Optional[int] = channel("starboard_channel")
+        self.starboard_emoji: Optional[str] = settings.get("starboard_emoji")
+        self.starboard_threshold: int = int(settings.get("starboard_threshold") or 0)
+        # Only usable when fully configured
+        self.starboard_enabled: bool = bool(
+            settings.get("starboard_enabled") and self.starboard_channel
+            and self.starboard_emoji and self.starboard_threshold
+        )
+        
+        self.tickets_enabled: bool = bool(settings.get("tickets_enabled"))
+        self.ticket_category: Optional[int] = channel("ticket_category")
+        self.transcript_channel: Optional[int] = channel("transcript_channel")
+        self.support_role: Optional[int] = channel("support_role")
+        self.levelup_channel: Optional[int] = channel("levelup_channel")
+        self.autorole: Optional[int] = channel("autorole")
+    
+    def log_channel(self, log_type: str) -> Optional[int]:
+        """Channel id for a log type, None when logging is off or unset"""
+        if log_type in self.log_channels:
+            return self.log_channels[log_type]
+        return self.log_channels.get("general")
@@ -0,0 +1,390 @@
+"""
+Leaderboards
+- Keyset pagination and rank lookups over (score, user_id)
+- Shared top-N snapshots for paginated views
+- Skip-list indexes for the memory backend
+"""
+
+import os
+import time
+import random
+import asyncio
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+
+if TYPE_CHECKING:
+    from database import DatabaseManager
+
+
+class _SkipNode:
+    __slots__ = ("key", "next", "width")
+    
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next = [None] * level
+        # width[i] = positions skipped by next[i] (to the end when next[i] is None)
+        self.width = [1] * level
+
+class RankedIndex:
+    """Indexable skip list of unique keys: O(log n) insert/remove/rank, O(log n + count) slice"""
+    
+    MAX_LEVEL = 24
+    
+    def __init__(self):
+        self.head = _SkipNode(None, self.MAX_LEVEL)
+        self.size = 0
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def _path(self, key) -> tuple:
+        """Last node before key on each level, and its position"""
+        chain = [None] * self.MAX_LEVEL
+        positions = [0] * self.MAX_LEVEL
+        node, position = self.head, 0
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = position
+        return chain, positions
+    
+    def insert(self, key):
+        chain, positions = self._path(key)
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        
+        node = _SkipNode(key, level)
+        position = positions[0] + 1
+        for i in range(level):
+            previous = chain[i]
+            node.next[i] = previous.next[i]
+            previous.next[i] = node
+            node.width[i] = previous.width[i] - (position - positions[i]) + 1
+            previous.width[i] = position - positions[i]
+        for i in range(level, self.MAX_LEVEL):
+            chain[i].width[i] += 1
+        self.size += 1
+    
+    def remove(self, key) -> bool:
+        chain, _ = self._path(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            return False
+        
+        for i in range(self.MAX_LEVEL):
+            previous = chain[i]
+            if i < len(node.next) and previous.next[i] is node:
+                previous.width[i] += node.width[i] - 1
+                previous.next[i] = node.next[i]
+            else:
+                previous.width[i] -= 1
+        self.size -= 1
+        return True
+    
+    def rank(self, key) -> int:
+        """Number of keys ordered before key"""
+        _, positions = self._path(key)
+        return positions[0]
+    
+    def slice(self, start: int, count: int) -> List[Any]:
+        """Up to count keys starting at 0-based index start"""
+        if start < 0 or start >= self.size or count <= 0:
+            return []
+        
+        node, position = self.head, 0
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and position + node.width[level] <= start + 1:
+                position += node.width[level]
+                node = node.next[level]
+        
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+class MemoryLeaderboardIndex:
+    """One RankedIndex per field, keyed (-score, user_id); users without a positive score are not indexed"""
+    
+    def __init__(self, fields: tuple):
+        self.indexes = {field: RankedIndex() for field in fields}
+        self.keys: Dict[str, Dict[int, tuple]] = {field: {} for field in fields}
+    
+    def update(self, user_id: int, user_data: Dict[str, Any]):
+        """Re-index a user after a write (caller holds memory_lock)"""
+        for field, index in self.indexes.items():
+            score = user_data.get(field, 0)
+            key = (-score, user_id) if isinstance(score, (int, float)) and score > 0 else None
+            current = self.keys[field].get(user_id)
+            if current == key:
+                continue
+            if current is not None:
+                index.remove(current)
+            if key is None:
+                self.keys[field].pop(user_id, None)
+            else:
+                index.insert(key)
+                self.keys[field][user_id] = key
+
+class LeaderboardSnapshot:
+    """Immutable top-N view of one leaderboard at a point in time"""
+    
+    __slots__ = ("field", "version", "created_at", "entries", "positions", "total_users")
+    
+    def __init__(self, field: str, version: int, entries: List[Dict[str, Any]], total_users: int):
+        self.field = field
+        self.version = version
+        self.created_at = time.monotonic()
+        self.entries = entries
+        self.positions = {entry["user_id"]: index for index, entry in enumerate(entries)}
+        self.total_users = max(total_users, len(entries))
+    
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+    
+    @property
+    def complete(self) -> bool:
+        return len(self.entries) >= self.total_users
+
+class LeaderboardEngine:
+    """Keyset-paginated leaderboards over (score, user_id), with cached totals and shared snapshots"""
+    
+    FIELDS = ("xp", "coins", "cookies", "daily_streak", "work_count")
+    
+    def __init__(self, manager: "DatabaseManager"):
+        self.manager = manager
+        self.count_ttl = float(os.getenv('LEADERBOARD_COUNT_TTL', 60))
+        self.counts: Dict[str, tuple] = {}  # field -> (total, monotonic time)
+        
+        self.snapshot_interval = float(os.getenv('LEADERBOARD_SNAPSHOT_INTERVAL', 30))
+        self.snapshot_size = int(os.getenv('LEADERBOARD_SNAPSHOT_SIZE', 1000))
+        self.snapshots: Dict[str, LeaderboardSnapshot] = {}
+        self.snapshot_locks: Dict[str, asyncio.Lock] = {}
+    
+    @staticmethod
+    def _projection(field: str) -> Dict[str, int]:
+        return {"_id": 0, "user_id": 1, field: 1, "level": 1}
+    
+    @staticmethod
+    def _after(field: str, cursor: tuple, inclusive: bool = False) -> Dict[str, Any]:
+        """Entries ranked below cursor (at or below when inclusive)"""
+        score, user_id = cursor
+        return {"$or": [
+            {field: {"$lt": score}},
+            {field: score, "user_id": {"$gte" if inclusive else "$gt": user_id}}
+        ]}
+    
+    @staticmethod
+    def _before(field: str, cursor: tuple) -> Dict[str, Any]:
+        """Entries ranked above cursor"""
+        score, user_id = cursor
+        return {"$or": [
+            {field: {"$gt": score}},
+            {field: score, "user_id": {"$lt": user_id}}
+        ]}
+    
+    def _memory_slice(self, field: str, start: int, count: int) -> List[Dict[str, Any]]:
+        """Entries from the memory index (caller holds memory_lock)"""
+        users = self.manager.memory_users
+        return [
+            {"user_id": user_id, field: -score, "level": users.get(user_id, {}).get("level", 1)}
+            for score, user_id in self.manager.memory_leaderboards.indexes[field].slice(start, count)
+        ]
+    
+    def invalidate(self, field: Optional[str] = None):
+        """Drop cached totals"""
+        if field is None:
+            self.counts.clear()
+        else:
+            self.counts.pop(field, None)
+    
+    async def total(self, field: str) -> int:
+        """Number of users with a positive score (cached)"""
+        cached = self.counts.get(field)
+        if cached and time.monotonic() - cached[1] < self.count_ttl:
+            return cached[0]
+        
+        if self.manager.connected_to_mongodb:
+            total = await self.manager.users_collection.count_documents({field: {"$gt": 0}})
+        elif self.manager.sql_backed:
+            total = await self.manager.local_store.count_ranked(field)
+        else:
+            # The memory index is exact and O(1) to read; no need to cache
+            with self.manager.memory_lock:
+                return len(self.manager.memory_leaderboards.indexes[field])
+        self.counts[field] = (total, time.monotonic())
+        return total
+    
+    async def _fetch(self, field: str, query: Dict[str, Any], limit: int, reverse: bool = False) -> List[Dict[str, Any]]:
+        direction = 1 if reverse else -1
+        cursor = self.manager.users_collection.find(
+            {"$and": [{field: {"$gt": 0}}, query]} if query else {field: {"$gt": 0}},
+            self._projection(field)
+        ).sort([(field, direction), ("user_id", -direction)]).limit(limit)
+        users = await cursor.to_list(length=limit)
+        if reverse:
+            users.reverse()
+        return users
+    
+    async def _cursor_at(self, field: str, offset: int) -> Optional[tuple]:
+        """Key of the entry at offset, read from the index only"""
+        cursor = self.manager.users_collection.find(
+            {field: {"$gt": 0}}, {"_id": 0, "user_id": 1, field: 1}
+        ).sort([(field, -1), ("user_id", 1)]).skip(offset).limit(1)
+        entries = await cursor.to_list(length=1)
+        return (entries[0][field], entries[0]["user_id"]) if entries else None
+    
+    async def page(self, field: str, page: int, per_page: int, after: Optional[tuple] = None,
+                   before: Optional[tuple] = None, inclusive: bool = False) -> Dict[str, Any]:
+        """Fetch one page, continuing from a neighbouring page's cursor when given"""
+        total_users = await self.total(field)
+        total_pages = max(1, (total_users + per_page - 1) // per_page)
+        page = max(1, min(page, total_pages))
+        last_page_size = total_users - (total_pages - 1) * per_page
+        
+        if self.manager.connected_to_mongodb:
+            with self.manager._safe_operation(f"leaderboard_page_{field}"):
+                if after is not None:
+                    users = await self._fetch(field, self._after(field, after, inclusive), per_page)
+                elif before is not None:
+                    users = await self._fetch(field, self._before(field, before), per_page, reverse=True)
+                elif page == 1:
+                    users = await self._fetch(field, {}, per_page)
+                elif page == total_pages:
+                    users = await self._fetch(field, {}, max(1, last_page_size), reverse=True)
+                else:
+                    start = await self._cursor_at(field, (page - 1) * per_page)
+                    users = await self._fetch(field, self._after(field, start, True), per_page) if start else []
+        elif self.manager.sql_backed:
+            # OFFSET walks users_<field> only; cursors are range reads on it
+            offset = (page - 1) * per_page if after is None and before is None else 0
+            users = await self.manager.local_store.ranked(field, per_page, offset, after, before, inclusive)
+        else:
+            with self.manager.memory_lock:
+                index = self.manager.memory_leaderboards.indexes[field]
+                if after is not None:
+                    key = (-after[0], after[1])
+                    start = index.rank(key)
+                    if not inclusive and index.slice(start, 1) == [key]:
+                        start += 1
+                elif before is not None:
+                    start = max(0, index.rank((-before[0], before[1])) - per_page)
+                elif page == total_pages and page > 1:
+                    start = max(0, len(index) - max(1, last_page_size))
+                else:
+                    start = (page - 1) * per_page
+                users = self._memory_slice(field, start, per_page)
+        
+        return {
+            'users': users,
+            'total_pages': total_pages,
+            'total_users': total_users,
+            'current_page': page,
+            'members_per_page': per_page,
+            'first_cursor': (users[0][field], users[0]["user_id"]) if users else None,
+            'last_cursor': (users[-1][field], users[-1]["user_id"]) if users else None
+        }
+    
+    async def snapshot(self, field: str) -> LeaderboardSnapshot:
+        """Latest shared snapshot, rebuilt once it is older than snapshot_interval"""
+        current = self.snapshots.get(field)
+        if current and current.age < self.snapshot_interval:
+            return current
+        
+        async with self.snapshot_locks.setdefault(field, asyncio.Lock()):
+            current = self.snapshots.get(field)
+            if current and current.age < self.snapshot_interval:
+                return current
+            
+            self.invalidate(field)
+            total_users = await self.total(field)
+            if self.manager.connected_to_mongodb:
+                with self.manager._safe_operation(f"leaderboard_snapshot_{field}"):
+                    entries = await self._fetch(field, {}, self.snapshot_size)
+            elif self.manager.sql_backed:
+                entries = await self.manager.local_store.ranked(field, self.snapshot_size)
+            else:
+                with self.manager.memory_lock:
+                    entries = self._memory_slice(field, 0, self.snapshot_size)
+            
+            version = current.version + 1 if current else 1
+            self.snapshots[field] = LeaderboardSnapshot(field, version, entries, total_users)
+            return self.snapshots[field]
+    
+    async def snapshot_page(self, snapshot: LeaderboardSnapshot, page: int, per_page: int,
+                            after: Optional[tuple] = None) -> Dict[str, Any]:
+        """Fetch a page from a pinned snapshot; pages past a partial snapshot are read live"""
+        total_pages = max(1, (snapshot.total_users + per_page - 1) // per_page)
+        page = max(1, min(page, total_pages))
+        start = (page - 1) * per_page
+        
+        if snapshot.complete or start + per_page <= len(snapshot.entries):
+            users = snapshot.entries[start:start + per_page]
+            result = {
+                'users': users,
+                'total_pages': total_pages,
+                'total_users': snapshot.total_users,
+                'current_page': page,
+                'members_per_page': per_page,
+                'first_cursor': (users[0][snapshot.field], users[0]["user_id"]) if users else None,
+                'last_cursor': (users[-1][snapshot.field], users[-1]["user_id"]) if users else None
+            }
+        else:
+            if after is None and 0 < start <= len(snapshot.entries):
+                last = snapshot.entries[start - 1]
+                after = (last[snapshot.field], last["user_id"])
+            result = await self.page(snapshot.field, page, per_page, after=after)
+        
+        result['snapshot_version'] = snapshot.version
+        result['snapshot_age'] = snapshot.age
+        return result
+    
+    async def rank(self, field: str, user_id: int, score: Optional[int] = None) -> Optional[int]:
+        """1-based rank of a user, or None when they have no score"""
+        if score is None:
+            score = (await self.manager.get_user_data(user_id)).get(field, 0)
+        if score <= 0:
+            return None
+        
+        if self.manager.connected_to_mongodb:
+            with self.manager._safe_operation(f"leaderboard_rank_{field}"):
+                ahead = await self.manager.users_collection.count_documents(
+                    self._before(field, (score, user_id))
+                )
+        elif self.manager.sql_backed:
+            ahead = await self.manager.local_store.count_ahead(field, score, user_id)
+        else:
+            with self.manager.memory_lock:
+                ahead = self.manager.memory_leaderboards.indexes[field].rank((-score, user_id))
+        return ahead + 1
+    
+    async def around(self, field: str, user_id: int, radius: int = 5) -> Dict[str, Any]:
+        """The user's rank plus up to ``radius`` entries either side"""
+        user_data = await self.manager.get_user_data(user_id)
+        score = user_data.get(field, 0)
+        rank = await self.rank(field, user_id, score)
+        if rank is None:
+            return {'rank': None, 'score': score, 'users': []}
+        
+        key = (score, user_id)
+        if self.manager.connected_to_mongodb:
+            with self.manager._safe_operation(f"leaderboard_around_{field}"):
+                above = await self._fetch(field, self._before(field, key), radius, reverse=True)
+                below = await self._fetch(field, self._after(field, key), radius)
+        elif self.manager.sql_backed:
+            above = await self.manager.local_store.ranked(field, radius, before=key)
+            below = await self.manager.local_store.ranked(field, radius, after=key)
+        else:
+            with self.manager.memory_lock:
+                index = rank - 1
+                above = self._memory_slice(field, max(0, index - radius), index - max(0, index - radius))
+                below = self._memory_slice(field, index + 1, radius)
+        
+        me = {"user_id": user_id, field: score, "level": user_data.get("level", 1)}
+        users = above + [me] + below
+        for offset, entry in enumerate(users):
+            entry["rank"] = rank - len(above) + offset
+        return {'rank': rank, 'score': score, 'users': users}
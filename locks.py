@@ -0,0 +1,93 @@
+"""
+Per-user locks for multi-step read-modify-write commands
+- A fixed pool of asyncio locks indexed by a hash of user_id
+- Multi-user holds take stripes in index order, so they cannot deadlock
+"""
+
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+
+
+class UserLockStripes:
+    """Striped, re-entrant per-user asyncio locks behind DatabaseManager.user_txn"""
+    
+    def __init__(self, stripes: int = 256):
+        self.stripes = max(1, stripes)
+        self.locks = [asyncio.Lock() for _ in range(self.stripes)]
+        # stripe -> [owning task, depth]
+        self.owners: Dict[int, list] = {}
+        
+        self.acquisitions = 0
+        self.contended = 0
+        self.waiting = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+    
+    def stripe(self, user_id: int) -> int:
+        # Fibonacci hashing spreads snowflake ids evenly over the stripes
+        return ((user_id * 11400714819323198485) & 0xFFFFFFFFFFFFFFFF) % self.stripes
+    
+    @asynccontextmanager
+    async def hold(self, *user_ids: int):
+        """Hold the stripes of every given user until the block exits"""
+        task = asyncio.current_task()
+        taken = []
+        acquired_at = None
+        try:
+            for index in sorted({self.stripe(user_id) for user_id in user_ids}):
+                owner = self.owners.get(index)
+                if owner is not None and owner[0] is task:
+                    owner[1] += 1
+                    taken.append(index)
+                    continue
+                
+                lock = self.locks[index]
+                if lock.locked():
+                    self.contended += 1
+                    self.waiting += 1
+                    start = time.perf_counter()
+                    try:
+                        await lock.acquire()
+                    finally:
+                        self.waiting -= 1
+                    waited = time.perf_counter() - start
+                    self.wait_total += waited
+                    self.wait_max = max(self.wait_max, waited)
+                else:
+                    await lock.acquire()
+                self.owners[index] = [task, 1]
+                taken.append(index)
+            
+            self.acquisitions += 1
+            acquired_at = time.perf_counter()
+            yield
+        finally:
+            if acquired_at is not None:
+                held = time.perf_counter() - acquired_at
+                self.hold_total += held
+                self.hold_max = max(self.hold_max, held)
+            for index in reversed(taken):
+                owner = self.owners[index]
+                owner[1] -= 1
+                if owner[1] == 0:
+                    del self.owners[index]
+                    self.locks[index].release()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for get_database_stats"""
+        return {
+            "stripes": self.stripes,
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "contention_rate": round(self.contended / self.acquisitions, 4) if self.acquisitions else 0.0,
+            "waiting": self.waiting,
+            "held_stripes": len(self.owners),
+            "avg_wait_ms": round(self.wait_total / self.contended * 1000, 2) if self.contended else 0.0,
+            "max_wait_ms": round(self.wait_max * 1000, 2),
+            "avg_hold_ms": round(self.hold_total / self.acquisitions * 1000, 2) if self.acquisitions else 0.0,
+            "max_hold_ms": round(self.hold_max * 1000, 2)
+        }
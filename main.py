@@ -95,19 +95,60 @@ class BlackOpsBot(commands.Bot):
         """Called when the bot is starting up"""
         logger.info("🚀 Bot setup hook called")
         
+        # Load local state and connect to MongoDB in the background; the bot
+        # runs degraded on memory storage until the connection comes up
+        try:
+            await database.db.initialize()
+        except Exception as e:
+            logger.error(f"Database initialization failed: {e}")
+        
         # Start database periodic tasks
         try:
             self.loop.create_task(database.periodic_cleanup())
             self.loop.create_task(database.periodic_health_check())
+            self.loop.create_task(database.periodic_activity_flush())
+            self.loop.create_task(database.periodic_write_behind_flush())
+            self.loop.create_task(database.periodic_aggregates_recompute())
         except Exception as e:
             logger.error(f"Failed to start database tasks: {e}")
         
         # Load cogs
         await self.load_all_cogs()
         
+        # Re-arm persisted timers once cogs have registered their handlers
+        try:
+            await database.db.timers.start()
+        except Exception as e:
+            logger.error(f"Failed to start timer service: {e}")
+        
+        # Index active boosts before /work, XP and gambling look them up
+        try:
+            await database.db.boosts.load()
+        except Exception as e:
+            logger.error(f"Failed to load active boosts: {e}")
+        
+        # Resolve the bot owner once for is_bot_owner checks
+        try:
+            await permissions.perm_manager.load_owner(self)
+        except Exception as e:
+            logger.error(f"Failed to resolve bot owner: {e}")
+        
         # Sync commands
         await self.sync_commands()
 
+    async def close(self):
+        """Flush batched database writes before disconnecting"""
+        try:
+            await database.db.flush_pending_writes()
+        except Exception as e:
+            logger.error(f"Failed to flush pending database writes on shutdown: {e}")
+        await super().close()
+        
+        try:
+            database.db.close()
+        except Exception as e:
+            logger.error(f"Error closing database: {e}")
+
     async def load_all_cogs(self):
         """Load all cogs with enhanced error handling"""
         cog_list = [
@@ -180,9 +221,18 @@ class BlackOpsBot(commands.Bot):
         logger.info(f'📊 Loaded {self.cogs_loaded}/{self.total_cogs} cogs')
         logger.info(f'⚡ Commands available: {len(self.tree.get_commands())}')
         
+        # A new gateway session may have missed role updates
+        permissions.clear_permission_cache()
+        
+        # Warm the guild settings cache used by event listeners
+        try:
+            await database.db.preload_guild_settings([guild.id for guild in self.guilds])
+        except Exception as e:
+            logger.error(f"Guild settings preload failed: {e}")
+        
         # Database health check
         try:
-            health = database.db.get_database_health()
+            health = await database.db.get_database_health()
             if health.get("mongodb_connected"):
                 logger.info("🗄️ Database: MongoDB connected")
             else:
@@ -244,7 +294,7 @@ class BlackOpsBot(commands.Bot):
         
         # Initialize guild data
         try:
-            database.db.get_guild_data(guild.id)
+            await database.db.get_guild_data(guild.id)
         except Exception as e:
             logger.error(f"Failed to initialize guild data: {e}")
         
@@ -262,6 +312,7 @@ class BlackOpsBot(commands.Bot):
     async def on_guild_remove(self, guild):
         """Handle bot leaving guild"""
         logger.info(f"👋 Left guild: {guild.name} (ID: {guild.id})")
+        permissions.perm_manager.clear_guild_cache(guild.id)
         
         # Update status
         try:
@@ -274,12 +325,33 @@ class BlackOpsBot(commands.Bot):
         except Exception as e:
             logger.error(f"Failed to update presence: {e}")
 
+    # ==================== PERMISSION CACHE INVALIDATION ====================
+    
+    async def on_member_update(self, before, after):
+        permissions.perm_manager.on_member_update(before, after)
+    
+    async def on_member_remove(self, member):
+        permissions.perm_manager.clear_member_cache(member.guild.id, member.id)
+    
+    async def on_guild_role_update(self, before, after):
+        permissions.perm_manager.on_guild_role_update(before, after)
+    
+    async def on_guild_role_delete(self, role):
+        permissions.perm_manager.on_guild_role_delete(role)
+    
+    async def on_guild_update(self, before, after):
+        permissions.perm_manager.on_guild_update(before, after)
+
 # Create bot instance
 bot = BlackOpsBot()
 
 # Create Flask app for health checks and monitoring
 app = Flask(__name__)
 
+def run_on_bot_loop(coro, timeout: float = 10):
+    """Run a coroutine on the bot's event loop from a Flask worker thread"""
+    return asyncio.run_coroutine_threadsafe(coro, bot.loop).result(timeout=timeout)
+
 @app.route('/')
 def home():
     """Health check endpoint"""
@@ -298,12 +370,13 @@ def home():
 def health():
     """Detailed health check"""
     try:
-        db_health = database.db.get_database_health()
+        db_health = run_on_bot_loop(database.db.get_database_health())
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         db_health = {"connected": False, "error": str(e)}
     
     return jsonify({
+        "ready": bot.is_ready() and db_health.get("ready", False),
         "bot": {
             "status": "online" if bot.is_ready() else "offline",
             "guilds": len(bot.guilds) if bot.is_ready() else 0,
@@ -322,7 +395,7 @@ def health():
 def stats():
     """Database statistics endpoint"""
     try:
-        return jsonify(database.db.get_database_stats())
+        return jsonify(run_on_bot_loop(database.db.get_database_stats()))
     except Exception as e:
         logger.error(f"Stats endpoint failed: {e}")
         return jsonify({"error": str(e)}), 500
@@ -348,19 +421,20 @@ def signal_handler(signum, frame):
     """Handle shutdown signals"""
     logger.info(f"Received signal {signum}, initiating graceful shutdown...")
     
-    # Close database connections
+    # Let bot.close() drain pending database writes and close the client;
+    # bot.start() then returns and main() exits normally
     try:
-        if database.db.mongodb_client:
-            database.db.mongodb_client.close()
+        if bot.loop.is_running():
+            bot.loop.call_soon_threadsafe(lambda: bot.loop.create_task(bot.close()))
+            return
     except Exception as e:
-        logger.error(f"Error closing database: {e}")
+        logger.error(f"Failed to schedule bot close: {e}")
     
-    # Close bot safely from signal handler
+    # Close database connections
     try:
-        if bot.is_ready():
-            asyncio.run_coroutine_threadsafe(bot.close(), bot.loop)
+        database.db.close()
     except Exception as e:
-        logger.error(f"Failed to schedule bot close: {e}")
+        logger.error(f"Error closing database: {e}")
     
     sys.exit(0)
 
@@ -0,0 +1,66 @@
+"""
+Byte-budgeted message buffers for edit/delete logs
+- Compact records instead of discord.Message objects
+- One buffer per guild, oldest messages evicted first
+"""
+
+import sys
+from collections import OrderedDict
+
+import discord
+
+class CachedMessage:
+    """What edit/delete logs need from a message, without Member/Channel objects"""
+    __slots__ = ("message_id", "channel_id", "author_id", "content", "attachments", "created_at", "size")
+    
+    # Record, slots and dict entry, roughly
+    OVERHEAD = 256
+    
+    def __init__(self, message_id: int, channel_id: int, author_id: int, content: str,
+                 attachments: tuple, created_at: float):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.content = content
+        self.attachments = attachments
+        self.created_at = created_at
+        self.size = self.OVERHEAD + sys.getsizeof(content) + sum(sys.getsizeof(url) for url in attachments)
+    
+    @classmethod
+    def from_message(cls, message: discord.Message) -> "CachedMessage":
+        return cls(
+            message.id, message.channel.id, message.author.id, message.content,
+            tuple(att.url for att in message.attachments), message.created_at.timestamp()
+        )
+
+class MessageRingBuffer:
+    """One guild's recent messages, oldest evicted first once over a byte budget"""
+    __slots__ = ("budget", "records", "bytes", "evicted")
+    
+    def __init__(self, budget: int):
+        self.budget = budget
+        # message_id -> CachedMessage in arrival order
+        self.records = OrderedDict()
+        self.bytes = 0
+        self.evicted = 0
+    
+    def put(self, record: CachedMessage):
+        """Add or replace a record (a replaced one keeps its age)"""
+        old = self.records.get(record.message_id)
+        if old is not None:
+            self.bytes -= old.size
+        self.records[record.message_id] = record
+        self.bytes += record.size
+        while self.bytes > self.budget and len(self.records) > 1:
+            _, oldest = self.records.popitem(last=False)
+            self.bytes -= oldest.size
+            self.evicted += 1
+    
+    def get(self, message_id: int):
+        return self.records.get(message_id)
+    
+    def pop(self, message_id: int):
+        record = self.records.pop(message_id, None)
+        if record is not None:
+            self.bytes -= record.size
+        return record
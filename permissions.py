@@ -5,7 +5,7 @@ from discord import app_commands
 from dotenv import load_dotenv
 import logging
 from typing import Optional, Union
-import asyncio
+from collections import OrderedDict
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -20,6 +20,10 @@ class PermissionError(Exception):
 class PermissionManager:
     """Enhanced permission management system"""
     
+    # Level granted by Discord's administrator permission
+    ADMIN_LEVEL = 85  # Between moderator and overseer
+    MEMBER_LEVEL = 10
+    
     def __init__(self):
         self.role_hierarchy = {
             "forgotten_one": {"level": 100, "role_id": self._get_role_id("FORGOTTEN_ONE_ROLE_ID")},
@@ -29,12 +33,26 @@ class PermissionManager:
             "head_host": {"level": 60, "role_id": self._get_role_id("HEAD_HOST_ROLE_ID")},
             "host": {"level": 50, "role_id": self._get_role_id("HOST_ROLE_ID")},
             "cookies_manager": {"level": 40, "role_id": self._get_role_id("COOKIES_MANAGER_ROLE_ID")},
-            "member": {"level": 10, "role_id": None}
+            "member": {"level": self.MEMBER_LEVEL, "role_id": None}
         }
         
-        # Cache for permission checks
-        self._permission_cache = {}
-        self._cache_timeout = 300  # 5 minutes
+        # role_id -> level, so resolving a member is one set intersection
+        self.role_levels = {}
+        for role_data in self.role_hierarchy.values():
+            if role_data["role_id"]:
+                self.role_levels[role_data["role_id"]] = max(
+                    role_data["level"], self.role_levels.get(role_data["role_id"], 0)
+                )
+        
+        # (guild_id, user_id) -> level, least recently used first; dropped by the
+        # member/role/guild update events, so a command check is a dict lookup
+        self._permission_cache = OrderedDict()
+        self._cache_size = int(os.getenv("PERMISSION_CACHE_SIZE", 10000))
+        self.hits = 0
+        self.misses = 0
+        
+        # Bot owner ids, resolved once at startup
+        self.owner_ids = None
         
     def _get_role_id(self, env_var: str) -> Optional[int]:
         """Safely get role ID from environment"""
@@ -47,44 +65,99 @@ class PermissionManager:
     
     def get_user_permission_level(self, user: discord.Member) -> int:
         """Get user's permission level"""
-        # Check cache first
-        cache_key = f"perm_level_{user.id}"
-        if cache_key in self._permission_cache:
-            cached_data = self._permission_cache[cache_key]
-            if cached_data["expires"] > asyncio.get_event_loop().time():
-                return cached_data["level"]
+        cache_key = (user.guild.id, user.id)
+        level = self._permission_cache.get(cache_key)
+        if level is not None:
+            self._permission_cache.move_to_end(cache_key)
+            self.hits += 1
+            return level
         
-        max_level = 10  # Default member level
-        
-        # Check each role hierarchy
-        for role_name, role_data in self.role_hierarchy.items():
-            if role_data["role_id"] and any(role.id == role_data["role_id"] for role in user.roles):
-                max_level = max(max_level, role_data["level"])
+        self.misses += 1
+        matched = self.role_levels.keys() & {role.id for role in user.roles}
+        level = max((self.role_levels[role_id] for role_id in matched), default=self.MEMBER_LEVEL)
         
         # Check for administrator permission
         if user.guild_permissions.administrator:
-            max_level = max(max_level, 85)  # Between moderator and overseer
+            level = max(level, self.ADMIN_LEVEL)
         
-        # Cache the result
-        self._permission_cache[cache_key] = {
-            "level": max_level,
-            "expires": asyncio.get_event_loop().time() + self._cache_timeout
-        }
+        self._permission_cache[cache_key] = level
+        if len(self._permission_cache) > self._cache_size:
+            self._permission_cache.popitem(last=False)
         
-        return max_level
+        return level
     
     def has_permission_level(self, user: discord.Member, required_level: int) -> bool:
         """Check if user has required permission level"""
         return self.get_user_permission_level(user) >= required_level
     
+    def clear_member_cache(self, guild_id: int, user_id: int):
+        """Forget one member's cached level"""
+        self._permission_cache.pop((guild_id, user_id), None)
+    
     def clear_user_cache(self, user_id: int):
-        """Clear cached permissions for user"""
-        cache_key = f"perm_level_{user_id}"
-        self._permission_cache.pop(cache_key, None)
+        """Clear cached permissions for user in every guild"""
+        for cache_key in [key for key in self._permission_cache if key[1] == user_id]:
+            del self._permission_cache[cache_key]
+    
+    def clear_guild_cache(self, guild_id: int):
+        """Clear cached permissions for every member of a guild"""
+        for cache_key in [key for key in self._permission_cache if key[0] == guild_id]:
+            del self._permission_cache[cache_key]
+    
+    def _affects_level(self, role: discord.Role) -> bool:
+        """Whether holding this role can change a permission level"""
+        return role.id in self.role_levels or role.permissions.administrator
+    
+    def on_member_update(self, before: discord.Member, after: discord.Member):
+        """Drop the member's level if a role that grants one was added or removed"""
+        changed = set(before.roles) ^ set(after.roles)
+        if any(self._affects_level(role) for role in changed):
+            self.clear_member_cache(after.guild.id, after.id)
+    
+    def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        """Administrator toggled on a role: every holder may change level"""
+        if before.permissions.administrator != after.permissions.administrator:
+            self.clear_guild_cache(after.guild.id)
+    
+    def on_guild_role_delete(self, role: discord.Role):
+        """A deleted hierarchy or administrator role is gone from every holder"""
+        if self._affects_level(role):
+            self.clear_guild_cache(role.guild.id)
+    
+    def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        """The guild owner implicitly has administrator"""
+        if before.owner_id != after.owner_id:
+            self.clear_member_cache(after.id, before.owner_id)
+            self.clear_member_cache(after.id, after.owner_id)
+    
+    async def load_owner(self, client: discord.Client):
+        """Resolve the bot owner(s) once instead of on every is_bot_owner check"""
+        if client.owner_ids:
+            self.owner_ids = set(client.owner_ids)
+        elif client.owner_id:
+            self.owner_ids = {client.owner_id}
+        else:
+            app_info = await client.application_info()
+            if app_info.team:
+                self.owner_ids = {member.id for member in app_info.team.members}
+            else:
+                self.owner_ids = {app_info.owner.id}
+        logger.info(f"👑 Bot owner resolved: {', '.join(str(owner_id) for owner_id in self.owner_ids)}")
     
     def get_role_info(self, role_name: str) -> Optional[dict]:
         """Get role information"""
         return self.role_hierarchy.get(role_name)
+    
+    def get_stats(self) -> dict:
+        """Permission cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "cached": len(self._permission_cache),
+            "max_size": self._cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
 
 # Global permission manager
 perm_manager = PermissionManager()
@@ -130,7 +203,7 @@ def is_forgotten_one():
                 logger.warning("FORGOTTEN_ONE_ROLE_ID not configured")
                 return False
             
-            return any(role.id == forgotten_one_role_id for role in interaction.user.roles)
+            return interaction.user.get_role(forgotten_one_role_id) is not None
         except Exception as e:
             logger.error(f"Error checking forgotten one permission: {e}")
             return False
@@ -220,7 +293,7 @@ def requires_role(role_name: str, allow_higher: bool = True):
             else:
                 # Exact role match required
                 role_id = role_info["role_id"]
-                return role_id and any(role.id == role_id for role in interaction.user.roles)
+                return bool(role_id) and interaction.user.get_role(role_id) is not None
         except Exception as e:
             logger.error(f"Error checking role {role_name}: {e}")
             return False
@@ -237,7 +310,7 @@ def requires_any_role(*role_names: str):
             for role_name in role_names:
                 role_info = perm_manager.get_role_info(role_name)
                 if role_info and role_info["role_id"]:
-                    if any(role.id == role_info["role_id"] for role in interaction.user.roles):
+                    if interaction.user.get_role(role_info["role_id"]) is not None:
                         return True
             
             return False
@@ -265,8 +338,9 @@ def is_bot_owner():
     """Check if user is the bot owner"""
     async def predicate(interaction: discord.Interaction) -> bool:
         try:
-            app_info = await interaction.client.application_info()
-            return interaction.user.id == app_info.owner.id
+            if perm_manager.owner_ids is None:
+                await perm_manager.load_owner(interaction.client)
+            return interaction.user.id in perm_manager.owner_ids
         except Exception as e:
             logger.error(f"Error checking bot owner: {e}")
             return False
@@ -302,7 +376,7 @@ async def check_forgotten_one(interaction: discord.Interaction) -> bool:
         if not forgotten_one_role_id:
             return False
         
-        return any(role.id == forgotten_one_role_id for role in interaction.user.roles)
+        return interaction.user.get_role(forgotten_one_role_id) is not None
     except Exception as e:
         logger.error(f"Error in check_forgotten_one: {e}")
         return False
@@ -323,7 +397,7 @@ async def get_user_permissions(user: discord.Member) -> dict:
         
         # Get role names
         for role_name, role_data in perm_manager.role_hierarchy.items():
-            if role_data["role_id"] and any(role.id == role_data["role_id"] for role in user.roles):
+            if role_data["role_id"] and user.get_role(role_data["role_id"]) is not None:
                 permissions["roles"].append(role_name)
         
         return permissions
@@ -429,7 +503,7 @@ class PermissionCommands(commands.Cog):
                 embed.add_field(name="Special Roles", value=roles_text, inline=False)
             
             embed.set_thumbnail(url=interaction.user.display_avatar.url)
-            embed.set_footer(text="Permissions are cached for 5 minutes")
+            embed.set_footer(text="Permissions update as soon as your roles change")
             
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
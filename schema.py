@@ -0,0 +1,84 @@
+"""
+Sparse user documents
+- Only fields that differ from the defaults are stored in MongoDB
+- Defaults are overlaid again when a document is read
+"""
+
+from typing import Dict, Any
+
+
+class UserSchema:
+    """Sparse user documents: only non-default fields are stored, defaults overlaid on read"""
+    
+    # Always stored: coins is queried by leaderboards and defaults to non-zero
+    MATERIALISED_FIELDS = {"user_id", "coins"}
+    # Defaults derived from the current time are never treated as defaults
+    VOLATILE_FIELDS = {"last_interest", "created_at", "last_seen", "last_updated"}
+    
+    _MISSING = object()
+    
+    def __init__(self, defaults):
+        self.defaults = defaults
+        self.template = defaults(0)
+    
+    def _default_at(self, field: str) -> Any:
+        current = self.template
+        for key in field.split('.'):
+            if not isinstance(current, dict) or key not in current:
+                return self._MISSING
+            current = current[key]
+        return current
+    
+    def _strip(self, value: Dict[str, Any], default: Dict[str, Any]) -> Dict[str, Any]:
+        stripped = {}
+        for key, item in value.items():
+            if key not in default:
+                stripped[key] = item
+            elif isinstance(item, dict) and isinstance(default[key], dict):
+                nested = self._strip(item, default[key])
+                if nested:
+                    stripped[key] = nested
+            elif item != default[key]:
+                stripped[key] = item
+        return stripped
+    
+    def _merge(self, target: Dict[str, Any], source: Dict[str, Any]):
+        for key, value in source.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                self._merge(target[key], value)
+            else:
+                target[key] = value
+    
+    def expand(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Full user document from a sparse one (takes ownership of document)"""
+        full = self.defaults(document.get("user_id", 0))
+        self._merge(full, document)
+        return full
+    
+    def compact_fields(self, data: Dict[str, Any]) -> tuple:
+        """Split (dot-notation) written fields into ($set fields, $unset paths)"""
+        sets, unsets = {}, []
+        for field, value in data.items():
+            default = self._default_at(field)
+            if (field in self.MATERIALISED_FIELDS or field.split('.')[0] in self.VOLATILE_FIELDS
+                    or default is self._MISSING):
+                sets[field] = value
+            elif isinstance(value, dict) and isinstance(default, dict):
+                stripped = self._strip(value, default)
+                if stripped:
+                    sets[field] = stripped
+                else:
+                    unsets.append(field)
+            elif value == default:
+                unsets.append(field)
+            else:
+                sets[field] = value
+        return sets, unsets
+    
+    def compact(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Sparse copy of a whole user document"""
+        sets, _ = self.compact_fields({k: v for k, v in document.items() if k != "_id"})
+        for field in self.MATERIALISED_FIELDS:
+            if field not in sets:
+                sets[field] = document.get(field, self.template[field])
+        return sets
@@ -0,0 +1,6 @@
+"""Durable local stores under the memory backend"""
+
+from storage.journal import LocalJournal
+from storage.sqlite_store import SQLiteStore
+
+__all__ = ["LocalJournal", "SQLiteStore"]
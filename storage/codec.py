@@ -0,0 +1,31 @@
+"""
+Compact JSON codec shared by SQLiteStore and SharedCache
+- datetimes round-trip as {"$date": isoformat}
+- sets and tuples are stored as lists
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Any
+
+
+def _default(value: Any):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+def _object_hook(value: Dict[str, Any]):
+    if len(value) == 1 and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def dumps(value: Any) -> str:
+    return json.dumps(value, default=_default, separators=(",", ":"))
+
+
+def loads(data) -> Any:
+    return json.loads(data, object_hook=_object_hook)
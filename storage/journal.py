@@ -0,0 +1,328 @@
+"""
+Local journal for the memory backend
+- Group-committed, fsynced append-only journal of record post-images
+- Periodic compacted snapshots, loaded through mmap on recovery
+"""
+
+import os
+import mmap
+import pickle
+import struct
+import zlib
+import asyncio
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+
+if TYPE_CHECKING:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class LocalJournal:
+    """Durable memory backend: post-images appended to a group-committed journal, compacted into snapshots"""
+    
+    HEADER = struct.Struct("<IIQ")  # payload length, crc32, sequence number
+    
+    def __init__(self, manager: "DatabaseManager"):
+        self.manager = manager
+        self.enabled = os.getenv('LOCAL_STORE', 'true').lower() in ('1', 'true', 'yes')
+        self.directory = os.getenv('LOCAL_STORE_DIR', 'data')
+        self.commit_interval = float(os.getenv('JOURNAL_COMMIT_INTERVAL', 0.01))
+        self.snapshot_every = int(os.getenv('JOURNAL_SNAPSHOT_EVERY', 100000))
+        
+        self.lock = threading.Lock()      # guards buffer/seq (taken under memory_lock)
+        self.io_lock = asyncio.Lock()     # one flush/snapshot/reset at a time
+        self.wake = asyncio.Event()
+        self.task = None
+        self.buffer: List[bytes] = []
+        self.waiters: List[tuple] = []
+        self.segment = None
+        
+        self.seq = 0
+        self.synced_seq = 0
+        self.snapshot_seq = 0
+        self.records_since_snapshot = 0
+        self.recovered = False
+        
+        self.group_commits = 0
+        self.records_written = 0
+        self.bytes_written = 0
+        self.snapshots = 0
+    
+    # ---- file layout ----
+    
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, "snapshot.pkl")
+    
+    def _segment_path(self, start: int) -> str:
+        return os.path.join(self.directory, f"journal-{start:020d}.log")
+    
+    def _segments(self) -> List[tuple]:
+        """(first sequence number, path) of every journal segment, oldest first"""
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith("journal-") and name.endswith(".log"):
+                segments.append((int(name[8:-4]), os.path.join(self.directory, name)))
+        return sorted(segments)
+    
+    def _open_segment(self, start: int):
+        if self.segment:
+            self.segment.close()
+        self.segment = open(self._segment_path(start), "ab")
+    
+    # ---- recovery ----
+    
+    def recover(self) -> int:
+        """Load snapshot + journal into the memory backend; returns records replayed"""
+        if not self.enabled:
+            return 0
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            manager = self.manager
+            
+            if os.path.exists(self.snapshot_path) and os.path.getsize(self.snapshot_path):
+                with open(self.snapshot_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    state = pickle.loads(data)
+                manager.memory_users = state["users"]
+                manager.memory_guilds = state["guilds"]
+                for kind, lists in state["items"].items():
+                    manager.memory_items[kind] = lists
+                manager.memory_timers = state.get("timers", {})
+                manager.dirty.load(state.get("dirty"))
+                self.snapshot_seq = self.seq = state["seq"]
+            
+            replayed = 0
+            segments = self._segments()
+            for _, path in segments:
+                replayed += self._replay(path)
+            
+            for user_id, user_data in manager.memory_users.items():
+                manager.memory_leaderboards.update(user_id, user_data)
+            
+            self.synced_seq = self.seq
+            self.records_since_snapshot = replayed
+            self._open_segment(segments[-1][0] if segments else self.seq + 1)
+            # Changes still owed to MongoDB from before the restart
+            self.recovered = len(manager.dirty) > 0
+            
+            if manager.memory_users or manager.memory_guilds:
+                logger.info(f"💾 Recovered {len(manager.memory_users)} users and "
+                            f"{len(manager.memory_guilds)} guilds from local store ({replayed} journal records)")
+            return replayed
+            
+        except Exception as e:
+            logger.error(f"Local store unavailable, memory mode will not be durable: {e}")
+            self.enabled = False
+            return 0
+    
+    def _replay(self, path: str) -> int:
+        """Apply one segment's records; a torn tail is truncated"""
+        manager = self.manager
+        replayed = 0
+        with open(path, "rb") as f:
+            data = f.read()
+        
+        offset = 0
+        while offset + self.HEADER.size <= len(data):
+            length, checksum, seq = self.HEADER.unpack_from(data, offset)
+            payload = data[offset + self.HEADER.size:offset + self.HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            offset += self.HEADER.size + length
+            if seq <= self.seq:
+                continue
+            
+            collection, key, value = pickle.loads(payload)
+            if collection == "items":
+                kind, user_id = key
+                manager.memory_items[kind][user_id] = value
+            elif collection == "dirty":
+                manager.dirty.restore(key, value)
+            elif collection == "timers":
+                if value is None:
+                    manager.memory_timers.pop(key, None)
+                else:
+                    manager.memory_timers[key] = value
+            else:
+                target = manager.memory_users if collection == "users" else manager.memory_guilds
+                target[key] = value
+            self.seq = seq
+            replayed += 1
+        
+        if offset < len(data):
+            logger.warning(f"Truncating torn journal tail in {path} at byte {offset}")
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        return replayed
+    
+    # ---- writing ----
+    
+    def record(self, collection: str, key: Any, value: Any):
+        """Append a record's post-image (caller holds memory_lock)"""
+        if not self.enabled:
+            return
+        payload = pickle.dumps((collection, key, value), pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.seq += 1
+            self.buffer.append(self.HEADER.pack(len(payload), zlib.crc32(payload), self.seq) + payload)
+            self.records_since_snapshot += 1
+    
+    async def commit(self) -> bool:
+        """Wait until every record appended so far has been fsynced"""
+        if not self.enabled:
+            return True
+        with self.lock:
+            target = self.seq
+        if self.synced_seq >= target:
+            return True
+        
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append((target, future))
+        self.wake.set()
+        try:
+            await future
+            return True
+        except Exception as e:
+            logger.error(f"Journal commit failed: {e}")
+            return False
+    
+    async def _run(self):
+        """Group-commit loop"""
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            # Let concurrent writers join this group
+            await asyncio.sleep(self.commit_interval)
+            try:
+                async with self.io_lock:
+                    await self._flush()
+                    if self.records_since_snapshot >= self.snapshot_every:
+                        await self._snapshot()
+            except Exception as e:
+                logger.error(f"Journal write failed: {e}")
+                self._release_waiters(error=e)
+    
+    def _write(self, chunks: List[bytes]):
+        self.segment.write(b"".join(chunks))
+        self.segment.flush()
+        os.fsync(self.segment.fileno())
+    
+    async def _flush(self):
+        with self.lock:
+            chunks, self.buffer = self.buffer, []
+            target = self.seq
+        if chunks:
+            await asyncio.to_thread(self._write, chunks)
+            self.group_commits += 1
+            self.records_written += len(chunks)
+            self.bytes_written += sum(len(chunk) for chunk in chunks)
+        self.synced_seq = target
+        self._release_waiters()
+    
+    def _release_waiters(self, error: Optional[Exception] = None):
+        remaining = []
+        for target, future in self.waiters:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            elif target <= self.synced_seq:
+                future.set_result(True)
+            else:
+                remaining.append((target, future))
+        self.waiters = remaining
+    
+    def _write_snapshot(self, state: Dict[str, Any]) -> int:
+        try:
+            data = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        except RuntimeError:
+            # A document was resized while we pickled it; pickle under the lock instead
+            with self.manager.memory_lock:
+                data = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        temporary = self.snapshot_path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.snapshot_path)
+        return len(data)
+    
+    async def _snapshot(self):
+        """Write a compacted snapshot and drop the journal segments it covers"""
+        manager = self.manager
+        with manager.memory_lock:
+            with self.lock:
+                chunks, self.buffer = self.buffer, []
+                seq = self.seq
+                self.records_since_snapshot = 0
+            # Only the top-level maps are copied here; documents changed while the thread
+            # pickles them are newer than seq, and their journal records replay over them
+            state = {
+                "seq": seq,
+                "users": dict(manager.memory_users),
+                "guilds": dict(manager.memory_guilds),
+                "items": {kind: dict(lists) for kind, lists in manager.memory_items.items()},
+                "timers": dict(manager.memory_timers),
+                "dirty": {collection: dict(entries) for collection, entries in manager.dirty.export().items()}
+            }
+        
+        # Finish the current segment, then start the one for records after seq
+        if chunks:
+            await asyncio.to_thread(self._write, chunks)
+        self.synced_seq = seq
+        self._release_waiters()
+        self._open_segment(seq + 1)
+        
+        size = await asyncio.to_thread(self._write_snapshot, state)
+        for start, path in self._segments():
+            if start <= seq:
+                os.remove(path)
+        self.snapshot_seq = seq
+        self.snapshots += 1
+        logger.info(f"💾 Local store snapshot written at record {seq} ({size // 1024} KiB)")
+    
+    async def reset(self):
+        """Discard local state once it has been synced to MongoDB"""
+        if not self.enabled:
+            return
+        async with self.io_lock:
+            with self.lock:
+                self.buffer = []
+                seq = self.seq
+                self.records_since_snapshot = 0
+            self.synced_seq = seq
+            self._release_waiters()
+            self._open_segment(seq + 1)
+            for start, path in self._segments():
+                if start <= seq:
+                    os.remove(path)
+            if os.path.exists(self.snapshot_path):
+                os.remove(self.snapshot_path)
+            self.snapshot_seq = seq
+            self.recovered = False
+    
+    def close(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+        if self.segment:
+            self.segment.close()
+            self.segment = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for get_database_stats"""
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "last_record": self.seq,
+            "last_synced_record": self.synced_seq,
+            "snapshot_record": self.snapshot_seq,
+            "group_commits": self.group_commits,
+            "records_written": self.records_written,
+            "bytes_written": self.bytes_written,
+            "snapshots": self.snapshots
+        }
@@ -0,0 +1,426 @@
+"""
+SQLite storage backend (STORAGE_BACKEND=sqlite)
+- WAL mode, one writer thread applying queued post-images in transactions
+- Users load on first use; leaderboards, ranks and totals are read from SQL
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+
+from storage import codec
+
+if TYPE_CHECKING:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteStore:
+    """SQLite system of record (STORAGE_BACKEND=sqlite); users load on first use, rankings come from SQL"""
+    
+    SCORE_FIELDS = ("xp", "coins", "cookies", "daily_streak", "work_count", "level")
+    
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL,
+            xp INTEGER NOT NULL DEFAULT 0,
+            coins INTEGER NOT NULL DEFAULT 0,
+            cookies INTEGER NOT NULL DEFAULT 0,
+            daily_streak INTEGER NOT NULL DEFAULT 0,
+            work_count INTEGER NOT NULL DEFAULT 0,
+            level INTEGER NOT NULL DEFAULT 1,
+            next_expiry_at REAL
+        )""",
+        """CREATE TABLE IF NOT EXISTS guilds (
+            guild_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS items (
+            kind TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            expires_at REAL,
+            PRIMARY KEY (kind, user_id, position)
+        )""",
+        """CREATE TABLE IF NOT EXISTS timers (
+            timer_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            fire_at REAL NOT NULL,
+            data TEXT NOT NULL
+        )""",
+    ]
+    # Columns added after the first release: name -> (definition, backfill expression)
+    MIGRATIONS = {
+        "next_expiry_at": ("REAL", "json_extract(data, '$.next_expiry_at')"),
+    }
+    INDEXES = [
+        "CREATE INDEX IF NOT EXISTS items_expiry ON items (kind, expires_at) WHERE expires_at IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS users_expiry ON users (next_expiry_at) WHERE next_expiry_at IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS timers_fire_at ON timers (fire_at)",
+    ] + [
+        f"CREATE INDEX IF NOT EXISTS users_{field} ON users ({field} DESC, user_id)"
+        for field in ("xp", "coins", "cookies", "daily_streak", "work_count")
+    ]
+    
+    UPSERT_USER = (
+        "INSERT INTO users (user_id, data, xp, coins, cookies, daily_streak, work_count, level, next_expiry_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(user_id) DO UPDATE SET "
+        "data = excluded.data, xp = excluded.xp, coins = excluded.coins, cookies = excluded.cookies, "
+        "daily_streak = excluded.daily_streak, work_count = excluded.work_count, level = excluded.level, "
+        "next_expiry_at = excluded.next_expiry_at"
+    )
+    UPSERT_GUILD = (
+        "INSERT INTO guilds (guild_id, data) VALUES (?, ?) "
+        "ON CONFLICT(guild_id) DO UPDATE SET data = excluded.data"
+    )
+    TOTALS = "SELECT COUNT(*), TOTAL(coins), TOTAL(xp), TOTAL(level) FROM users"
+    DELETE_ITEMS = "DELETE FROM items WHERE kind = ? AND user_id = ?"
+    INSERT_ITEM = "INSERT INTO items (kind, user_id, position, data, expires_at) VALUES (?, ?, ?, ?, ?)"
+    UPSERT_TIMER = (
+        "INSERT INTO timers (timer_id, kind, fire_at, data) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(timer_id) DO UPDATE SET kind = excluded.kind, fire_at = excluded.fire_at, data = excluded.data"
+    )
+    DELETE_TIMER = "DELETE FROM timers WHERE timer_id = ?"
+    
+    def __init__(self, manager: "DatabaseManager"):
+        self.manager = manager
+        self.enabled = True
+        self.path = os.getenv('SQLITE_PATH', os.path.join(os.getenv('LOCAL_STORE_DIR', 'data'), 'blackops.db'))
+        self.directory = os.path.dirname(self.path) or "."
+        
+        self.lock = threading.Lock()      # guards pending/seq/waiters
+        self.ready = threading.Condition(self.lock)
+        self.pending: Dict[tuple, Any] = {}  # (collection, key) -> statement parameters
+        self.waiters: List[tuple] = []
+        self.thread = None
+        self.stopping = False
+        # Reads on the event loop thread use their own connection (WAL readers never block the writer)
+        self.read_lock = threading.Lock()
+        self.reader = None
+        
+        self.seq = 0
+        self.synced_seq = 0
+        self.recovered = False  # never synced to MongoDB; SQLite is the system of record
+        
+        self.transactions = 0
+        self.rows_written = 0
+        self.coalesced = 0
+        self.write_errors = 0
+    
+    # ---- encoding ----
+    
+    def encode(self, value: Any) -> str:
+        return codec.dumps(value)
+    
+    def decode(self, data: str) -> Any:
+        return codec.loads(data)
+    
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+    
+    # ---- recovery ----
+    
+    def recover(self) -> int:
+        """Load guilds and items into the memory backend and start the writer; returns rows loaded"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            manager = self.manager
+            connection = self._connect()
+            with connection:
+                for statement in self.SCHEMA:
+                    connection.execute(statement)
+                self._migrate(connection)
+                for statement in self.INDEXES:
+                    connection.execute(statement)
+            
+            # Users stay on disk until first used (see DatabaseManager._memory_user)
+            loaded = 0
+            for guild_id, data in connection.execute("SELECT guild_id, data FROM guilds"):
+                manager.memory_guilds[guild_id] = self.decode(data)
+                loaded += 1
+            for kind, user_id, data in connection.execute(
+                "SELECT kind, user_id, data FROM items ORDER BY kind, user_id, position"
+            ):
+                if kind in manager.memory_items:
+                    manager.memory_items[kind].setdefault(user_id, []).append(self.decode(data))
+                    loaded += 1
+            for timer_id, data in connection.execute("SELECT timer_id, data FROM timers"):
+                manager.memory_timers[timer_id] = self.decode(data)
+                loaded += 1
+            totals = self._totals(connection.execute(self.TOTALS).fetchone())
+            manager.memory_aggregates.values.update(totals)
+            connection.close()
+            
+            self.thread = threading.Thread(target=self._writer, name="sqlite-writer", daemon=True)
+            self.thread.start()
+            logger.info(f"🗄️ SQLite store {self.path}: {totals['users']} users on disk, "
+                        f"loaded {len(manager.memory_guilds)} guilds")
+            return loaded
+            
+        except Exception as e:
+            logger.error(f"SQLite store unavailable, memory mode will not be durable: {e}")
+            self.enabled = False
+            return 0
+    
+    def _migrate(self, connection: sqlite3.Connection):
+        """Add and backfill columns missing from databases created by older versions"""
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(users)")}
+        for column, (definition, backfill) in self.MIGRATIONS.items():
+            if column not in columns:
+                connection.execute(f"ALTER TABLE users ADD COLUMN {column} {definition}")
+                connection.execute(f"UPDATE users SET {column} = {backfill}")
+                logger.info(f"🗄️ SQLite store: added users.{column}")
+    
+    # ---- reading ----
+    
+    def _read(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self.read_lock:
+            if self.reader is None:
+                self.reader = self._connect()
+            return self.reader.execute(sql, params).fetchall()
+    
+    def _column(self, field: str) -> str:
+        if field not in self.SCORE_FIELDS:
+            raise ValueError(f"{field} is not an indexed SQLite field")
+        return field
+    
+    def load_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Primary-key lookup of one stored user document (None when absent)"""
+        if not self.enabled:
+            return None
+        rows = self._read("SELECT data FROM users WHERE user_id = ?", (user_id,))
+        return self.decode(rows[0][0]) if rows else None
+    
+    def expiring_users(self, now: float) -> List[int]:
+        """Users whose earliest temporary role expiry is due, from users_expiry"""
+        rows = self._read("SELECT user_id FROM users WHERE next_expiry_at <= ?", (now,))
+        return [user_id for (user_id,) in rows]
+    
+    async def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Read once every queued post-image is committed, off the event loop"""
+        await self.commit()
+        return await asyncio.to_thread(self._read, sql, params)
+    
+    async def count_ranked(self, field: str) -> int:
+        """Users with a positive score in field"""
+        column = self._column(field)
+        rows = await self.query(f"SELECT COUNT(*) FROM users WHERE {column} > 0")
+        return rows[0][0]
+    
+    async def count_ahead(self, field: str, score: Any, user_id: int) -> int:
+        """Users ranked above (score, user_id)"""
+        column = self._column(field)
+        rows = await self.query(
+            f"SELECT COUNT(*) FROM users WHERE {column} > ? OR ({column} = ? AND user_id < ?)",
+            (score, score, user_id)
+        )
+        return rows[0][0]
+    
+    async def ranked(self, field: str, limit: int, offset: int = 0, after: Optional[tuple] = None,
+                     before: Optional[tuple] = None, inclusive: bool = False) -> List[Dict[str, Any]]:
+        """Leaderboard entries in rank order (score desc, user_id asc), read from users_<field>"""
+        column = self._column(field)
+        where, params = f"{column} > 0", []
+        if after is not None:
+            where += f" AND ({column} < ? OR ({column} = ? AND user_id {'>=' if inclusive else '>'} ?))"
+            params += [after[0], after[0], after[1]]
+        if before is not None:
+            # Walk upwards from the cursor, then restore rank order
+            where += f" AND ({column} > ? OR ({column} = ? AND user_id < ?))"
+            params += [before[0], before[0], before[1]]
+            rows = await self.query(
+                f"SELECT user_id, {column}, level FROM users WHERE {where} "
+                f"ORDER BY {column}, user_id DESC LIMIT ?", (*params, limit)
+            )
+            rows.reverse()
+        else:
+            rows = await self.query(
+                f"SELECT user_id, {column}, level FROM users WHERE {where} "
+                f"ORDER BY {column} DESC, user_id LIMIT ? OFFSET ?", (*params, limit, offset)
+            )
+        return [{"user_id": user_id, field: score, "level": level} for user_id, score, level in rows]
+    
+    @staticmethod
+    def _totals(row: tuple) -> Dict[str, int]:
+        users, coins, xp, levels = row
+        return {"users": users, "total_coins": int(coins), "total_xp": int(xp), "level_sum": int(levels)}
+    
+    async def totals(self) -> Dict[str, int]:
+        """RunningAggregates values computed in SQL"""
+        rows = await self.query(self.TOTALS)
+        return self._totals(rows[0])
+    
+    # ---- writing ----
+    
+    def record(self, collection: str, key: Any, value: Any):
+        """Queue a record's post-image (caller holds memory_lock)"""
+        if not self.enabled or collection == "dirty":
+            return
+        if collection == "users":
+            params = (key, self.encode(value)) + tuple(
+                int(value.get(field, 1 if field == "level" else 0) or 0) for field in self.SCORE_FIELDS
+            ) + (value.get("next_expiry_at"),)
+        elif collection == "guilds":
+            params = (key, self.encode(value))
+        elif collection == "timers":
+            params = None if value is None else (key, value["kind"], value["fire_at"], self.encode(value))
+        else:
+            kind, user_id = key
+            expiry_fields = self.manager.USER_ITEM_KINDS.get(kind)
+            params = [
+                (kind, user_id, position, self.encode(item),
+                 item.get(expiry_fields[0]) if expiry_fields and isinstance(item, dict) else None)
+                for position, item in enumerate(value)
+            ]
+        
+        with self.lock:
+            self.seq += 1
+            if (collection, key) in self.pending:
+                self.coalesced += 1
+            self.pending[(collection, key)] = params
+            self.ready.notify()
+    
+    async def commit(self) -> bool:
+        """Wait until every record queued so far is committed to SQLite"""
+        if not self.enabled or self.thread is None:
+            return True
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.lock:
+            if self.synced_seq >= self.seq:
+                return True
+            self.waiters.append((self.seq, future, loop))
+        try:
+            await future
+            return True
+        except Exception as e:
+            logger.error(f"SQLite commit failed: {e}")
+            return False
+    
+    def _writer(self):
+        """Writer thread: one transaction per batch of queued post-images"""
+        connection = self._connect()
+        while True:
+            with self.lock:
+                while not self.pending and not self.stopping:
+                    self.ready.wait()
+                if not self.pending and self.stopping:
+                    break
+                batch, self.pending = self.pending, {}
+                target = self.seq
+            
+            try:
+                self._apply(connection, batch)
+                error = None
+            except Exception as e:
+                logger.error(f"SQLite write failed, retrying: {e}")
+                self.write_errors += 1
+                error = e
+                with self.lock:
+                    # Keep newer post-images queued since the batch was taken
+                    batch.update(self.pending)
+                    self.pending = batch
+            
+            with self.lock:
+                if error is None:
+                    self.synced_seq = target
+                remaining = []
+                for waiter_target, future, loop in self.waiters:
+                    if error is not None:
+                        loop.call_soon_threadsafe(self._resolve, future, error)
+                    elif waiter_target <= self.synced_seq:
+                        loop.call_soon_threadsafe(self._resolve, future, None)
+                    else:
+                        remaining.append((waiter_target, future, loop))
+                self.waiters = remaining
+            
+            if error is not None:
+                time.sleep(1)
+        connection.close()
+    
+    @staticmethod
+    def _resolve(future: asyncio.Future, error: Optional[Exception]):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(True)
+    
+    def _apply(self, connection: sqlite3.Connection, batch: Dict[tuple, Any]):
+        users, guilds, item_keys, items, timers, removed_timers = [], [], [], [], [], []
+        for (collection, key), params in batch.items():
+            if collection == "users":
+                users.append(params)
+            elif collection == "guilds":
+                guilds.append(params)
+            elif collection == "timers":
+                if params is None:
+                    removed_timers.append((key,))
+                else:
+                    timers.append(params)
+            else:
+                item_keys.append(key)
+                items.extend(params)
+        
+        with connection:
+            if users:
+                connection.executemany(self.UPSERT_USER, users)
+            if guilds:
+                connection.executemany(self.UPSERT_GUILD, guilds)
+            if item_keys:
+                connection.executemany(self.DELETE_ITEMS, item_keys)
+                connection.executemany(self.INSERT_ITEM, items)
+            if timers:
+                connection.executemany(self.UPSERT_TIMER, timers)
+            if removed_timers:
+                connection.executemany(self.DELETE_TIMER, removed_timers)
+        
+        self.transactions += 1
+        self.rows_written += len(users) + len(guilds) + len(items) + len(timers) + len(removed_timers)
+    
+    async def reset(self):
+        """Nothing to discard; SQLite is never replaced by MongoDB"""
+        return
+    
+    def close(self):
+        """Drain the queue and stop the writer thread"""
+        if self.thread is None:
+            return
+        with self.lock:
+            self.stopping = True
+            self.ready.notify()
+        self.thread.join(timeout=10)
+        self.thread = None
+        with self.read_lock:
+            if self.reader is not None:
+                self.reader.close()
+                self.reader = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for get_database_stats"""
+        with self.lock:
+            queued = len(self.pending)
+        return {
+            "enabled": self.enabled,
+            "backend": "sqlite",
+            "path": self.path,
+            "last_record": self.seq,
+            "last_synced_record": self.synced_seq,
+            "queued": queued,
+            "transactions": self.transactions,
+            "rows_written": self.rows_written,
+            "coalesced": self.coalesced,
+            "write_errors": self.write_errors
+        }
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The module-level DatabaseManager must not try to reach a real MongoDB
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("LOCAL_STORE", "false")
+os.environ.setdefault("MONGODB_URI", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+pymongo_errors = pytest.importorskip("pymongo.errors")
+
+import database
+
+
+class FlakyUsersCollection:
+    """users collection whose bulk_write fails on a chosen call"""
+
+    def __init__(self, fail_on_call, error):
+        self.fail_on_call = fail_on_call
+        self.error = error
+        self.calls = 0
+        # user_id -> number of times an update for the user was applied
+        self.applied = {}
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls += 1
+        failed = set()
+        if self.calls == self.fail_on_call:
+            if not isinstance(self.error, pymongo_errors.BulkWriteError):
+                raise self.error
+            failed = {error["index"] for error in self.error.details["writeErrors"]}
+        for index, operation in enumerate(operations):
+            if index not in failed:
+                user_id = operation._filter["user_id"]
+                self.applied[user_id] = self.applied.get(user_id, 0) + 1
+        if failed:
+            raise self.error
+
+        class Result:
+            upserted_count = 0
+        return Result()
+
+
+async def flush_with(collection, users=6):
+    db = database.DatabaseManager()
+    db.BULK_CHUNK = 2
+    for user_id in range(1, users + 1):
+        await db.activity.record(user_id, 5)
+
+    db.connected_to_mongodb = True
+    db.users_collection = collection
+    xp_before = db.aggregates.values["total_xp"]
+
+    first = await db.activity.flush()
+    second = await db.activity.flush()
+    return db, first, second, db.aggregates.values["total_xp"] - xp_before
+
+
+def test_partial_bulk_write_error_requeues_only_failed_updates():
+    error = pymongo_errors.BulkWriteError({
+        "writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}],
+        "nUpserted": 0
+    })
+    collection = FlakyUsersCollection(fail_on_call=2, error=error)
+
+    db, first, second, xp_added = asyncio.run(flush_with(collection))
+
+    assert (first, second) == (5, 1)
+    assert collection.applied == {user_id: 1 for user_id in range(1, 7)}
+    assert xp_added == 6 * 5
+    assert not db.activity.pending
+
+
+def test_failed_chunk_requeues_it_and_the_chunks_after_it():
+    collection = FlakyUsersCollection(fail_on_call=2, error=pymongo_errors.AutoReconnect("connection lost"))
+
+    db, first, second, xp_added = asyncio.run(flush_with(collection))
+
+    assert (first, second) == (2, 4)
+    assert collection.applied == {user_id: 1 for user_id in range(1, 7)}
+    assert xp_added == 6 * 5
+    assert not db.activity.pending
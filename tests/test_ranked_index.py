@@ -0,0 +1,45 @@
+"""RankedIndex (the memory-backend leaderboard skip list) against a sorted list."""
+
+import bisect
+import random
+
+import leaderboards
+from leaderboards import RankedIndex
+
+
+def test_matches_sorted_list_under_random_operations(monkeypatch):
+    # Deterministic skip-list levels
+    monkeypatch.setattr(leaderboards, "random", random.Random(4321))
+    rng = random.Random(1234)
+    index, model = RankedIndex(), []
+
+    for step in range(5000):
+        # Keys as the leaderboards use them: (-score, user_id)
+        key = (-rng.randint(0, 50), rng.randint(1, 300))
+        position = bisect.bisect_left(model, key)
+        present = position < len(model) and model[position] == key
+        if rng.random() < 0.6:
+            if not present:
+                index.insert(key)
+                bisect.insort(model, key)
+        else:
+            assert index.remove(key) == present
+            if present:
+                model.remove(key)
+
+        assert len(index) == len(model)
+        assert index.rank(key) == bisect.bisect_left(model, key)
+        assert index.slice(index.rank(key), 1) == model[bisect.bisect_left(model, key):][:1]
+        if step % 50 == 0:
+            for probe in rng.sample(model, min(20, len(model))):
+                assert index.rank(probe) == model.index(probe)
+            start, count = rng.randint(-2, len(model) + 2), rng.randint(0, 40)
+            expected = model[start:start + count] if 0 <= start else []
+            assert index.slice(start, count) == expected
+            assert index.slice(0, len(model) + 5) == model
+
+    while model:
+        key = model.pop(rng.randrange(len(model)))
+        assert index.remove(key)
+        assert not index.remove(key)
+    assert len(index) == 0 and index.slice(0, 10) == []
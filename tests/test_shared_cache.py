@@ -0,0 +1,244 @@
+"""SharedCache against a real redis-server.
+
+Uses REDIS_TEST_URL when set, otherwise starts a throwaway redis-server
+from PATH; skipped when neither is available.
+"""
+
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+aioredis = pytest.importorskip("redis.asyncio")
+
+import database
+from cache import shared_cache
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    url = os.getenv("REDIS_TEST_URL")
+    if url:
+        yield url
+        return
+
+    binary = shutil.which("redis-server")
+    if not binary:
+        pytest.skip("redis-server not available (set REDIS_TEST_URL to use a running one)")
+    port = _free_port()
+    process = subprocess.Popen(
+        [binary, "--port", str(port), "--bind", "127.0.0.1", "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                pytest.skip("redis-server did not start")
+            time.sleep(0.05)
+    yield f"redis://127.0.0.1:{port}/0"
+    process.terminate()
+    process.wait(timeout=10)
+
+
+@pytest.fixture
+def redis_env(redis_url, monkeypatch):
+    monkeypatch.setattr(shared_cache, "REDIS_AVAILABLE", True)
+    monkeypatch.setenv("REDIS_URL", redis_url)
+    monkeypatch.setenv("REDIS_PREFIX", f"test-{uuid.uuid4().hex[:8]}")
+    return monkeypatch
+
+
+async def wait_until(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.02)
+
+
+async def connected_manager() -> database.DatabaseManager:
+    manager = database.DatabaseManager()
+    manager.shared_cache.start()
+    await wait_until(lambda: manager.shared_cache.connected)
+    return manager
+
+
+async def shutdown(*managers):
+    for manager in managers:
+        manager.close()
+    await asyncio.sleep(0.05)
+
+
+def test_put_get_round_trip(redis_env):
+    async def run():
+        manager = await connected_manager()
+        cache = manager.shared_cache
+        try:
+            small = {"user_id": 1, "coins": 1500, "last_seen": datetime(2024, 5, 1, tzinfo=timezone.utc)}
+            large = {"user_id": 2, "bio": "x" * 2000, "stats": {"messages_sent": 7}}
+
+            await cache.put("users", 1, small, cache.seq)
+            await cache.put("users", 2, large, cache.seq)
+
+            assert await cache.get("users", 1) == small
+            assert await cache.get("users", 2) == large
+            assert await cache.get("users", 3) is None
+            assert (cache.hits, cache.misses, cache.stores) == (2, 1, 2)
+        finally:
+            await shutdown(manager)
+
+    asyncio.run(run())
+
+
+def test_put_skipped_after_overlapping_invalidation(redis_env):
+    async def run():
+        manager = await connected_manager()
+        cache = manager.shared_cache
+        try:
+            loaded_seq = cache.seq
+            cache.invalidate("users", 1)
+            await cache.put("users", 1, {"user_id": 1, "coins": 10}, loaded_seq)
+
+            assert cache.skipped_stores == 1
+            assert await cache.get("users", 1) is None
+        finally:
+            await shutdown(manager)
+
+    asyncio.run(run())
+
+
+def test_ttl_expiry(redis_env):
+    redis_env.setenv("REDIS_CACHE_TTL", "1")
+
+    async def run():
+        manager = await connected_manager()
+        cache = manager.shared_cache
+        try:
+            await cache.put("users", 1, {"user_id": 1}, cache.seq)
+            assert await cache.get("users", 1) == {"user_id": 1}
+            await asyncio.sleep(1.5)
+            assert await cache.get("users", 1) is None
+        finally:
+            await shutdown(manager)
+
+    asyncio.run(run())
+
+
+def test_invalidation_reaches_other_manager(redis_env):
+    async def run():
+        writer, reader = await connected_manager(), await connected_manager()
+        try:
+            await writer.shared_cache.put("users", 5, {"user_id": 5, "coins": 1}, writer.shared_cache.seq)
+            reader.user_cache.put(5, {"user_id": 5, "coins": 1})
+            reader.user_cache.put(6, {"user_id": 6, "coins": 1})
+
+            writer.shared_cache.invalidate("users", 5)
+
+            await wait_until(lambda: reader.user_cache.get(5) is None)
+            assert reader.user_cache.get(6) is not None
+            assert await reader.shared_cache.get("users", 5) is None
+            assert reader.shared_cache.invalidations_received == 1
+            # Our own messages are ignored
+            assert writer.shared_cache.invalidations_received == 0
+        finally:
+            await shutdown(writer, reader)
+
+    asyncio.run(run())
+
+
+def test_guild_invalidation_refreshes_settings(redis_env):
+    async def run():
+        writer, reader = await connected_manager(), await connected_manager()
+        # Stand-in for the database both processes would share
+        reader.memory_guilds = writer.memory_guilds
+        try:
+            await reader.get_guild_data(7)
+            assert not reader.get_guild_settings(7).logging_enabled
+
+            await writer.update_guild_data(7, {"settings.logging_enabled": True})
+            # Memory-mode writes are process-local; publish as a MongoDB write would
+            writer.shared_cache.invalidate("guilds", 7)
+
+            await wait_until(lambda: reader.get_guild_settings(7).logging_enabled)
+            await wait_until(lambda: not reader.guild_refreshes)
+        finally:
+            await shutdown(writer, reader)
+
+    asyncio.run(run())
+
+
+def test_reconnects_after_connection_drop(redis_env):
+    async def run():
+        writer, reader = await connected_manager(), await connected_manager()
+        admin = aioredis.from_url(os.environ["REDIS_URL"])
+        try:
+            reader.user_cache.put(1, {"user_id": 1})
+            await admin.execute_command("CLIENT", "KILL", "TYPE", "pubsub")
+
+            await wait_until(lambda: not reader.shared_cache.connected)
+            await wait_until(lambda: reader.shared_cache.connected)
+            await wait_until(lambda: writer.shared_cache.connected)
+            # Invalidations may have been missed while disconnected
+            assert reader.user_cache.get(1) is None
+
+            # The new subscription receives invalidations again
+            reader.user_cache.put(2, {"user_id": 2})
+            writer.shared_cache.invalidate("users", 2)
+            await wait_until(lambda: reader.user_cache.get(2) is None)
+        finally:
+            await (getattr(admin, "aclose", None) or admin.close)()
+            await shutdown(writer, reader)
+
+    asyncio.run(run())
+
+
+def test_late_remote_invalidation_deletes_our_stale_store(redis_env):
+    async def run():
+        manager = await connected_manager()
+        cache = manager.shared_cache
+        try:
+            # Loaded before another process wrote; its DEL ran before our SET
+            loaded_seq = cache.seq
+            await cache.put("users", 1, {"user_id": 1, "coins": 10}, loaded_seq)
+            await cache.put("users", 2, {"user_id": 2, "coins": 20}, loaded_seq)
+            assert await cache.get("users", 1) is not None
+
+            # ...and its invalidation reaches us only now
+            cache._receive(f"{uuid.uuid4().hex} users:1".encode())
+
+            await wait_until(lambda: cache.stale_deletes == 1)
+            assert await cache.get("users", 1) is None
+            assert await cache.get("users", 2) is not None
+
+            # The same key landing while the SET is in flight is caught by put itself
+            set_key = cache.client.set
+
+            async def racing_set(*args, **kwargs):
+                result = await set_key(*args, **kwargs)
+                cache._receive(f"{uuid.uuid4().hex} users:3".encode())
+                return result
+
+            cache.client.set = racing_set
+            await cache.put("users", 3, {"user_id": 3}, cache.seq)
+            assert await cache.get("users", 3) is None
+        finally:
+            await shutdown(manager)
+
+    asyncio.run(run())
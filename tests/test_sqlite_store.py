@@ -0,0 +1,144 @@
+"""STORAGE_BACKEND=sqlite: rankings from the score indexes, users loaded on first use."""
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def sqlite_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "blackops.db"))
+    return tmp_path / "blackops.db"
+
+
+async def open_manager() -> database.DatabaseManager:
+    manager = database.DatabaseManager()
+    await manager.initialize()
+    return manager
+
+
+async def seed(manager, scores):
+    for user_id, xp in scores.items():
+        await manager.update_user_data(user_id, {"xp": xp})
+    await manager.flush_pending_writes()
+
+
+# user_id -> xp; ties on 50 are ordered by user_id
+SCORES = {1: 10, 2: 50, 3: 30, 4: 50, 5: 0, 6: 70, 7: 20}
+ORDER = [6, 2, 4, 3, 7, 1]
+
+
+def test_leaderboard_served_from_sql(sqlite_env):
+    async def run():
+        manager = await open_manager()
+        try:
+            await seed(manager, SCORES)
+            assert manager.sql_backed
+            assert not manager.memory_leaderboards.indexes["xp"]
+
+            first = await manager.get_paginated_leaderboard("xp", 1, 4)
+            assert [u["user_id"] for u in first["users"]] == ORDER[:4]
+            assert (first["total_users"], first["total_pages"]) == (6, 2)
+
+            second = await manager.get_paginated_leaderboard("xp", 2, 4, after=first["last_cursor"])
+            assert [u["user_id"] for u in second["users"]] == ORDER[4:]
+            back = await manager.get_paginated_leaderboard("xp", 1, 4, before=second["first_cursor"])
+            assert [u["user_id"] for u in back["users"]] == ORDER[:4]
+            last = await manager.get_paginated_leaderboard("xp", 2, 4)
+            assert [u["user_id"] for u in last["users"]] == ORDER[4:]
+
+            assert [await manager.leaderboards.rank("xp", uid) for uid in ORDER] == [1, 2, 3, 4, 5, 6]
+            assert await manager.leaderboards.rank("xp", 5) is None
+            around = await manager.leaderboards.around("xp", 4, radius=1)
+            assert [(u["user_id"], u["rank"]) for u in around["users"]] == [(2, 2), (4, 3), (3, 4)]
+
+            top = await manager.get_leaderboard("xp", 3)
+            assert [u["user_id"] for u in top] == ORDER[:3]
+        finally:
+            manager.close()
+
+    asyncio.run(run())
+
+
+def test_users_load_on_first_use(sqlite_env):
+    async def run():
+        manager = await open_manager()
+        await seed(manager, SCORES)
+        manager.close()
+
+        manager = await open_manager()
+        try:
+            assert manager.memory_users == {}
+            stats = await manager.get_database_stats()
+            assert (stats["users"], stats["total_xp"]) == (7, sum(SCORES.values()))
+
+            assert (await manager.get_user_data(3))["xp"] == 30
+            assert list(manager.memory_users) == [3]
+
+            # Writes to a loaded user keep the totals exact
+            await manager.update_user_data(3, {"xp": 35})
+            await manager.update_user_data(99, {"xp": 1})
+            assert manager.memory_aggregates.values["users"] == 8
+            assert manager.memory_aggregates.values["total_xp"] == sum(SCORES.values()) + 6
+            assert await manager.recompute_aggregates()
+            assert not any(manager.memory_aggregates.last_drift.values())
+        finally:
+            manager.close()
+
+    asyncio.run(run())
+
+
+def test_expiry_sweep_loads_due_users(sqlite_env):
+    async def run():
+        manager = await open_manager()
+        past = time.time() - 10
+        await manager.update_user_data(1, {
+            "temporary_roles": [{"role_id": 5, "expires_at": past}], "next_expiry_at": past
+        })
+        await manager.update_user_data(2, {"xp": 5})
+        await manager.flush_pending_writes()
+        manager.close()
+
+        manager = await open_manager()
+        try:
+            await manager.cleanup_expired_data()
+            assert list(manager.memory_users) == [1]
+            assert manager.memory_users[1]["temporary_roles"] == []
+        finally:
+            manager.close()
+
+        connection = sqlite3.connect(sqlite_env)
+        assert connection.execute("SELECT next_expiry_at FROM users WHERE user_id = 1").fetchone() == (None,)
+        connection.close()
+
+    asyncio.run(run())
+
+
+def test_adds_columns_to_older_databases(sqlite_env):
+    connection = sqlite3.connect(sqlite_env)
+    connection.execute(
+        "CREATE TABLE users (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL, xp INTEGER NOT NULL DEFAULT 0, "
+        "coins INTEGER NOT NULL DEFAULT 0, cookies INTEGER NOT NULL DEFAULT 0, daily_streak INTEGER NOT NULL DEFAULT 0, "
+        "work_count INTEGER NOT NULL DEFAULT 0, level INTEGER NOT NULL DEFAULT 1)"
+    )
+    connection.execute(
+        "INSERT INTO users (user_id, data, xp) VALUES (1, ?, 40)",
+        ('{"user_id":1,"xp":40,"next_expiry_at":12.5}',)
+    )
+    connection.commit()
+    connection.close()
+
+    async def run():
+        manager = await open_manager()
+        try:
+            assert manager.local_store.expiring_users(20) == [1]
+            assert await manager.leaderboards.rank("xp", 1) == 1
+        finally:
+            manager.close()
+
+    asyncio.run(run())
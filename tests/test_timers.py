@@ -0,0 +1,132 @@
+"""TimerService records live in their own store, not in user item lists."""
+
+import asyncio
+import math
+import random
+import sqlite3
+import time
+
+import pytest
+
+import database
+from timers import TimingWheel
+
+
+@pytest.fixture(params=["journal", "sqlite"])
+def backend(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMER_TICK", "0.05")
+    if request.param == "journal":
+        monkeypatch.setenv("LOCAL_STORE", "true")
+        monkeypatch.setenv("LOCAL_STORE_DIR", str(tmp_path))
+    else:
+        monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+        monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "blackops.db"))
+    return request.param
+
+
+async def open_manager() -> database.DatabaseManager:
+    manager = database.DatabaseManager()
+    await manager.initialize()
+    return manager
+
+
+def test_timers_survive_restart_and_fire_once(backend, tmp_path):
+    async def run():
+        manager = await open_manager()
+        soon = await manager.timers.schedule("test_kind", time.time() + 0.2, {"n": 1})
+        later = await manager.timers.schedule("test_kind", time.time() + 3600, {"n": 2})
+        await manager.timers.update(later, {"n": 3})
+        assert "timers" not in manager.memory_items
+        assert set(manager.memory_timers) == {soon, later}
+        manager.close()
+
+        manager = await open_manager()
+        fired = []
+
+        async def handler(timer):
+            fired.append(timer["payload"]["n"])
+
+        manager.timers.register("test_kind", handler)
+        try:
+            await manager.timers.start()
+            assert manager.timers.get(later)["payload"] == {"n": 3}
+            deadline = time.monotonic() + 5
+            while not fired and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.1)
+
+            assert fired == [1]
+            assert list(manager.memory_timers) == [later]
+            assert await manager.timers.cancel(later)
+            assert await manager.load_timers() == []
+        finally:
+            manager.close()
+
+        if backend == "sqlite":
+            connection = sqlite3.connect(tmp_path / "blackops.db")
+            assert connection.execute("SELECT COUNT(*) FROM timers").fetchone() == (0,)
+            assert connection.execute("SELECT COUNT(*) FROM items").fetchone() == (0,)
+            connection.close()
+
+    asyncio.run(run())
+
+
+def test_memory_timer_changes_are_tracked_for_mongodb(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOCAL_STORE_DIR", str(tmp_path))
+
+    async def run():
+        manager = database.DatabaseManager()
+        timer_id = await manager.timers.schedule("test_kind", time.time() + 60)
+        assert manager.dirty.timers[timer_id]["document"]["kind"] == "test_kind"
+        await manager.timers.cancel(timer_id)
+        assert manager.dirty.timers[timer_id] == {"document": None}
+        assert not manager.dirty.users and not manager.dirty.items
+        manager.close()
+
+    asyncio.run(run())
+
+
+def test_timing_wheel_cascades_overflow_and_cancellation():
+    # 4 slots x 2 levels cover 16 ticks; later timers start in the overflow
+    wheel = TimingWheel(tick=1.0, slots=4, levels=2, now=0)
+    rng = random.Random(7)
+    expected = {}
+    for n in range(200):
+        due = rng.uniform(0, 70)
+        wheel.add(f"t{n}", due)
+        expected[f"t{n}"] = max(1, math.ceil(due))
+    wheel.add("cancel_late", 30)
+    assert wheel.overflow and len(wheel) == 201
+
+    # Rescheduling replaces the old deadline; cancelled timers never fire
+    wheel.add("t0", 50.5)
+    expected["t0"] = 51
+    for timer_id in [f"t{n}" for n in range(1, 200, 3)]:
+        assert wheel.cancel(timer_id)
+        del expected[timer_id]
+    assert not wheel.cancel("t1")
+    assert len(wheel) == len(expected) + 1
+
+    fired = {}
+    for now in range(1, 80):
+        for timer_id in wheel.advance(now):
+            assert timer_id not in fired
+            fired[timer_id] = now
+        # Cancelling after the timer left the overflow still removes it
+        if now == 20:
+            assert wheel.cancel("cancel_late")
+
+    assert fired == expected
+    assert wheel.cascaded > 0
+    assert len(wheel) == 0 and not wheel.overflow
+
+    # Past-due timers fire on the next tick; an idle wheel can jump ahead
+    wheel.add("late", 10)
+    assert wheel.next_deadline() == 80
+    assert wheel.advance(80) == ["late"]
+    wheel.reset(1000.5)
+    assert wheel.current == 1000
+    assert wheel.next_deadline() == 1004
+    wheel.add("next", 1003)
+    assert wheel.next_deadline() == 1001
+    assert wheel.advance(1002) == [] and wheel.advance(1003) == ["next"]
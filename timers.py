@@ -0,0 +1,254 @@
+"""
+Persistent timers (giveaways, event starts, boost expiry)
+- Records are stored by the DatabaseManager in their own timers store
+- One driver task ticks a hierarchical timing wheel
+"""
+
+import os
+import math
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+
+if TYPE_CHECKING:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class TimingWheel:
+    """Hierarchical timing wheel: O(1) add and cancel, amortised O(1) per tick"""
+    
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, now: Optional[float] = None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self.overflow: Dict[str, int] = {}
+        # timer_id -> bucket holding it (bucket maps timer_id -> due tick)
+        self.where: Dict[str, Dict[str, int]] = {}
+        self.current = int((time.time() if now is None else now) // tick)
+        self.cascaded = 0
+    
+    def __len__(self) -> int:
+        return len(self.where)
+    
+    def reset(self, now: float):
+        """Jump an empty wheel to ``now`` instead of ticking through idle time"""
+        if not self.where:
+            self.current = int(now // self.tick)
+    
+    def add(self, timer_id: str, due: float):
+        """Schedule (or reschedule) a timer; past-due timers fire on the next tick"""
+        self.cancel(timer_id)
+        self._place(timer_id, max(self.current + 1, math.ceil(due / self.tick)))
+    
+    def _place(self, timer_id: str, at: int):
+        delta = at - self.current
+        span = 1
+        for level in range(self.levels):
+            if delta < span * self.slots:
+                bucket = self.wheels[level][(at // span) % self.slots]
+                break
+            span *= self.slots
+        else:
+            bucket = self.overflow
+        bucket[timer_id] = at
+        self.where[timer_id] = bucket
+    
+    def cancel(self, timer_id: str) -> bool:
+        bucket = self.where.pop(timer_id, None)
+        if bucket is None:
+            return False
+        del bucket[timer_id]
+        return True
+    
+    def _step(self) -> List[str]:
+        self.current += 1
+        if self.current % self.slots ** self.levels == 0:
+            overflow, self.overflow = self.overflow, {}
+            for timer_id, at in overflow.items():
+                self._place(timer_id, at)
+        for level in range(self.levels - 1, 0, -1):
+            span = self.slots ** level
+            if self.current % span == 0:
+                bucket = self.wheels[level][(self.current // span) % self.slots]
+                entries = list(bucket.items())
+                bucket.clear()
+                self.cascaded += len(entries)
+                for timer_id, at in entries:
+                    self._place(timer_id, at)
+        
+        bucket = self.wheels[0][self.current % self.slots]
+        due = list(bucket)
+        bucket.clear()
+        for timer_id in due:
+            del self.where[timer_id]
+        return due
+    
+    def advance(self, now: float) -> List[str]:
+        """Tick up to ``now``; returns the timers that came due"""
+        due = []
+        target = int(now // self.tick)
+        while self.current < target:
+            due.extend(self._step())
+        return due
+    
+    def next_deadline(self) -> float:
+        """When advance() next has work: the next tick, or the next wrap if level 0 is empty"""
+        if any(self.wheels[0]):
+            return (self.current + 1) * self.tick
+        return (self.current // self.slots + 1) * self.slots * self.tick
+
+class TimerService:
+    """Persistent one-shot timers (own collection/table, indexed on fire_at) driven by one TimingWheel task"""
+    
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = 60
+    
+    def __init__(self, manager: "DatabaseManager"):
+        self.manager = manager
+        self.wheel = TimingWheel(tick=float(os.getenv('TIMER_TICK', 1)))
+        self.handlers: Dict[str, Any] = {}
+        # timer_id -> stored record (kind, fire_at, payload)
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.attempts: Dict[str, int] = {}
+        # Fired ids, so a reload racing reconciliation cannot re-arm them
+        self.fired_ids: "OrderedDict[str, None]" = OrderedDict()
+        self.running: set = set()
+        self.wake = asyncio.Event()
+        self.task = None
+        
+        self.scheduled = 0
+        self.fired = 0
+        self.failed = 0
+    
+    def register(self, kind: str, handler):
+        """``handler(timer)`` is awaited when a timer of this kind fires"""
+        self.handlers[kind] = handler
+    
+    def _arm(self, record: Dict[str, Any]):
+        self.records[record["_id"]] = record
+        self.wheel.add(record["_id"], record["fire_at"])
+        self.wake.set()
+    
+    async def schedule(self, kind: str, fire_at: float, payload: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Persist and arm a timer; returns its id (None if it could not be stored)"""
+        record = {"_id": uuid.uuid4().hex, "kind": kind, "fire_at": fire_at, "payload": payload or {}}
+        if not await self.manager.save_timer(record):
+            return None
+        self._arm(record)
+        self.scheduled += 1
+        return record["_id"]
+    
+    async def cancel(self, timer_id: str) -> bool:
+        """Disarm a timer and delete its record"""
+        record = self.records.pop(timer_id, None)
+        self.wheel.cancel(timer_id)
+        if record is None:
+            return False
+        await self.manager.delete_timer(timer_id)
+        return True
+    
+    async def update(self, timer_id: str, payload: Dict[str, Any]) -> bool:
+        """Persist a changed payload (e.g. giveaway entrants)"""
+        record = self.records.get(timer_id)
+        if record is None:
+            return False
+        record["payload"] = payload
+        return await self.manager.save_timer(record)
+    
+    def get(self, timer_id: str) -> Optional[Dict[str, Any]]:
+        return self.records.get(timer_id)
+    
+    def find(self, kind: str, **payload) -> List[Dict[str, Any]]:
+        """Pending timers of a kind whose payload matches the given values"""
+        return [
+            record for record in self.records.values()
+            if record["kind"] == kind and all(record["payload"].get(k) == v for k, v in payload.items())
+        ]
+    
+    async def load(self) -> int:
+        """Arm every stored timer not already pending (boot, MongoDB connect)"""
+        loaded = 0
+        for record in await self.manager.load_timers():
+            if record["_id"] not in self.records and record["_id"] not in self.fired_ids:
+                self._arm(record)
+                loaded += 1
+        return loaded
+    
+    async def start(self):
+        """Re-arm stored timers and start the driver (after handlers are registered)"""
+        if self.task is not None and not self.task.done():
+            return
+        loaded = await self.load()
+        self.task = asyncio.create_task(self._run())
+        logger.info(f"⏲️ Timer service started with {loaded} stored timers")
+    
+    async def _run(self):
+        while True:
+            self.wake.clear()
+            if not self.wheel:
+                self.wheel.reset(time.time())
+                await self.wake.wait()
+                continue
+            
+            for timer_id in self.wheel.advance(time.time()):
+                record = self.records.get(timer_id)
+                if record is not None:
+                    task = asyncio.create_task(self._fire(record))
+                    self.running.add(task)
+                    task.add_done_callback(self.running.discard)
+            
+            try:
+                await asyncio.wait_for(self.wake.wait(), max(0.0, self.wheel.next_deadline() - time.time()))
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _fire(self, record: Dict[str, Any]):
+        timer_id = record["_id"]
+        handler = self.handlers.get(record["kind"])
+        try:
+            if handler is None:
+                raise LookupError(f"no handler registered for timer kind {record['kind']}")
+            await handler(record)
+        except Exception as e:
+            self.failed += 1
+            attempts = self.attempts[timer_id] = self.attempts.get(timer_id, 0) + 1
+            if attempts < self.MAX_ATTEMPTS and timer_id in self.records:
+                logger.warning(f"Timer {timer_id} ({record['kind']}) failed, retrying: {e}")
+                self.wheel.add(timer_id, time.time() + self.RETRY_DELAY)
+                self.wake.set()
+                return
+            logger.error(f"Timer {timer_id} ({record['kind']}) failed {attempts} times, dropping: {e}")
+        
+        self.fired += 1
+        self.attempts.pop(timer_id, None)
+        if self.records.get(timer_id) is record:
+            del self.records[timer_id]
+            self.fired_ids[timer_id] = None
+            while len(self.fired_ids) > 10000:
+                self.fired_ids.popitem(last=False)
+            await self.manager.delete_timer(timer_id)
+    
+    def close(self):
+        if self.task:
+            self.task.cancel()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for get_database_stats"""
+        kinds: Dict[str, int] = {}
+        for record in self.records.values():
+            kinds[record["kind"]] = kinds.get(record["kind"], 0) + 1
+        return {
+            "running": self.task is not None and not self.task.done(),
+            "pending": len(self.records),
+            "pending_by_kind": kinds,
+            "scheduled": self.scheduled,
+            "fired": self.fired,
+            "failed": self.failed,
+            "cascaded": self.wheel.cascaded
+        }
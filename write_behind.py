@@ -0,0 +1,204 @@
+"""
+Optional MongoDB write-behind (WRITE_BEHIND=true)
+- Changes to one document are merged into a single pending $set/$inc
+- Flushed as unordered bulk writes; failed writes are requeued
+"""
+
+import os
+import copy
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+
+try:
+    from pymongo import UpdateOne, errors as pymongo_errors
+except ImportError:
+    # Only reached with a MongoDB connection, which needs pymongo
+    UpdateOne = pymongo_errors = None
+
+if TYPE_CHECKING:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Optional write-behind: merged per-document changes flushed as unordered bulk writes"""
+    
+    KEY_FIELDS = {"users": "user_id", "guilds": "guild_id"}
+    
+    def __init__(self, manager: "DatabaseManager"):
+        self.manager = manager
+        self.enabled = os.getenv('WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+        self.flush_interval = float(os.getenv('WRITE_BEHIND_INTERVAL', 2))
+        self.max_pending = int(os.getenv('WRITE_BEHIND_MAX_PENDING', 500))
+        self.batch_size = 1000
+        
+        # (collection, key) -> {"$set": {...}, "$inc": {...}}
+        self.pending: Dict[tuple, Dict[str, Dict[str, Any]]] = {}
+        self.flush_lock = asyncio.Lock()
+        self._flush_scheduled = False
+        
+        self.writes_queued = 0
+        self.writes_coalesced = 0
+        self.flushes = 0
+        self.documents_written = 0
+        self.failed_flushes = 0
+    
+    def _entry(self, collection: str, key: int) -> Dict[str, Dict[str, Any]]:
+        self.writes_queued += 1
+        entry = self.pending.get((collection, key))
+        if entry is None:
+            entry = self.pending[(collection, key)] = {"$set": {}, "$inc": {}}
+        else:
+            self.writes_coalesced += 1
+        return entry
+    
+    def _merge_set(self, entry: Dict[str, Dict[str, Any]], fields: Dict[str, Any]):
+        """Merge $set fields so no two pending paths conflict"""
+        sets, incs = entry["$set"], entry["$inc"]
+        for field, value in fields.items():
+            value = copy.deepcopy(value)
+            prefix = field + "."
+            for existing in [k for k in sets if k.startswith(prefix)]:
+                del sets[existing]
+            for existing in [k for k in incs if k == field or k.startswith(prefix)]:
+                del incs[existing]
+            
+            parent = next((k for k in sets if field.startswith(k + ".")), None)
+            if parent is not None and isinstance(sets[parent], dict):
+                self.manager._memory_set_path(sets[parent], field[len(parent) + 1:], value)
+            else:
+                sets[field] = value
+    
+    def _merge_inc(self, entry: Dict[str, Dict[str, Any]], increments: Dict[str, int]):
+        """Merge $inc deltas, folding them into pending $set values where present"""
+        sets, incs = entry["$set"], entry["$inc"]
+        for field, delta in increments.items():
+            if field in sets:
+                sets[field] += delta
+                continue
+            parent = next((k for k in sets if field.startswith(k + ".")), None)
+            if parent is not None and isinstance(sets[parent], dict):
+                path = field[len(parent) + 1:]
+                current = self.manager._memory_get_path(sets[parent], path) if path.split('.')[0] in sets[parent] else 0
+                self.manager._memory_set_path(sets[parent], path, current + delta)
+            else:
+                incs[field] = incs.get(field, 0) + delta
+    
+    def mark_set(self, collection: str, key: int, fields: Dict[str, Any]):
+        """Queue $set fields for a document"""
+        self._merge_set(self._entry(collection, key), fields)
+        self._maybe_flush()
+    
+    def mark_inc(self, collection: str, key: int, increments: Dict[str, int]):
+        """Queue $inc deltas for a document"""
+        self._merge_inc(self._entry(collection, key), increments)
+        self._maybe_flush()
+    
+    def _maybe_flush(self):
+        if len(self.pending) >= self.max_pending and not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.create_task(self.flush())
+    
+    def has_pending(self, collection: str, key: int) -> bool:
+        return (collection, key) in self.pending
+    
+    def overlay(self, collection: str, key: int, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a document's unflushed changes to a copy read from MongoDB"""
+        entry = self.pending.get((collection, key))
+        if entry is None:
+            return document
+        for field, value in entry["$set"].items():
+            self.manager._memory_set_path(document, field, copy.deepcopy(value))
+        for field, delta in entry["$inc"].items():
+            self.manager._memory_set_path(document, field, self.manager._memory_get_path(document, field) + delta)
+        return document
+    
+    async def settle(self, collection: str, key: int):
+        """Write a document's pending changes before a write-through to it"""
+        if self.has_pending(collection, key) or self.flush_lock.locked():
+            await self.flush(only=[(collection, key)])
+    
+    def _operation(self, collection: str, key: int, entry: Dict[str, Dict[str, Any]]) -> "UpdateOne":
+        sets, unsets = entry["$set"], []
+        if collection == "users":
+            sets, unsets = self.manager.schema.compact_fields(sets)
+        
+        if entry["$inc"]:
+            # Pipeline form so increments start absent fields at their default
+            stage = {field: {"$literal": value} for field, value in sets.items()}
+            stage.update({field: "$$REMOVE" for field in unsets})
+            stage.update(self.manager._increment_stage(entry["$inc"]))
+            update = [{"$set": stage}]
+        else:
+            update = {"$set": sets}
+            if unsets:
+                update["$unset"] = {field: "" for field in unsets}
+            if collection == "users" and "coins" not in sets:
+                update["$setOnInsert"] = {"coins": self.manager.schema.template["coins"]}
+        return UpdateOne({self.KEY_FIELDS[collection]: key}, update, upsert=True)
+    
+    def _requeue(self, batch: Dict[tuple, Dict[str, Dict[str, Any]]]):
+        """Put failed changes back underneath anything queued since"""
+        for doc_key, entry in batch.items():
+            newer = self.pending.get(doc_key)
+            if newer is not None:
+                self._merge_set(entry, newer["$set"])
+                self._merge_inc(entry, newer["$inc"])
+            self.pending[doc_key] = entry
+    
+    async def flush(self, only: Optional[List[tuple]] = None) -> int:
+        """Write pending changes; returns the number of documents written"""
+        async with self.flush_lock:
+            self._flush_scheduled = False
+            if only is None:
+                batch, self.pending = self.pending, {}
+            else:
+                batch = {k: self.pending.pop(k) for k in only if k in self.pending}
+            if not batch:
+                return 0
+            
+            written = 0
+            for collection in self.KEY_FIELDS:
+                items = [(key, entry) for (coll, key), entry in batch.items() if coll == collection]
+                target = getattr(self.manager, f"{collection}_collection")
+                for start in range(0, len(items), self.batch_size):
+                    chunk = items[start:start + self.batch_size]
+                    operations = [self._operation(collection, key, entry) for key, entry in chunk]
+                    try:
+                        result = await target.bulk_write(operations, ordered=False)
+                        self.manager.aggregates.add(**{collection: result.upserted_count})
+                        written += len(chunk)
+                    except pymongo_errors.BulkWriteError as e:
+                        self.manager.aggregates.add(**{collection: e.details.get("nUpserted", 0)})
+                        failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                        logger.error(f"Write-behind flush: {len(failed)} {collection} writes failed")
+                        self._requeue({(collection, chunk[i][0]): chunk[i][1] for i in failed})
+                        written += len(chunk) - len(failed)
+                        self.failed_flushes += 1
+                    except Exception as e:
+                        logger.error(f"Write-behind flush of {len(chunk)} {collection} documents failed: {e}")
+                        self._requeue({(collection, key): entry for key, entry in items[start:]})
+                        self.failed_flushes += 1
+                        break
+                    finally:
+                        # Other processes may hold the pre-flush documents
+                        for key, _ in chunk:
+                            self.manager.shared_cache.invalidate(collection, key)
+            
+            self.flushes += 1
+            self.documents_written += written
+            return written
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for get_database_stats"""
+        return {
+            "enabled": self.enabled,
+            "pending_documents": len(self.pending),
+            "writes_queued": self.writes_queued,
+            "writes_coalesced": self.writes_coalesced,
+            "flushes": self.flushes,
+            "documents_written": self.documents_written,
+            "failed_flushes": self.failed_flushes
+        }